@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the JSON backends of hwrt.codec on the recordings of a raw data
+   pickle file."""
+
+from __future__ import print_function
+import sys
+import timeit
+
+# hwrt modules
+from hwrt import codec
+from hwrt import handwritten_data
+from hwrt import utils
+from hwrt.utils import is_valid_file
+
+# HandwrittenData is necessary because of pickle
+sys.modules['hwrt.HandwrittenData'] = handwritten_data
+sys.modules['HandwrittenData'] = handwritten_data
+
+
+def main(dataset, repeat):
+    """
+    Parameters
+    ----------
+    dataset : str
+        Path to a raw data pickle file or record stream
+    repeat : int
+        How often every step is measured. The best time is reported.
+    """
+    data = utils.load_dataset(dataset)
+    recordings = [raw_data['handwriting'].raw_data_json
+                  for raw_data in data['handwriting_datasets']]
+    pointlists = [codec.loads(recording) for recording in recordings]
+    print("%i recordings with %0.1f kB JSON on average" %
+          (len(recordings),
+           sum(len(recording) for recording in recordings) /
+           1000.0 / max(len(recordings), 1)))
+    steps = [('loads', lambda: [codec.loads(recording)
+                                for recording in recordings]),
+             ('loads_strokes',
+              lambda: [codec.loads_strokes(recording)
+                       for recording in recordings]),
+             ('dumps', lambda: [codec.dumps(pointlist)
+                                for pointlist in pointlists])]
+    print("%-10s %-14s %10s %14s" %
+          ("backend", "step", "total [s]", "per rec. [us]"))
+    default_backend = codec.get_backend()
+    for backend in codec.BACKENDS:
+        codec.set_backend(backend)
+        for step, function in steps:
+            seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+            print("%-10s %-14s %10.4f %14.1f" %
+                  (backend, step, seconds,
+                   seconds / max(len(recordings), 1) * 10**6))
+    codec.set_backend(default_backend)
+
+
+def get_parser():
+    from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+    parser = ArgumentParser(description=__doc__,
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-d", "--dataset",
+                        dest="dataset",
+                        type=lambda x: is_valid_file(parser, x),
+                        help="raw data pickle file, e.g. from 'hwrt download'",
+                        metavar="FILE",
+                        required=True)
+    parser.add_argument("-r", "--repeat",
+                        dest="repeat",
+                        type=int,
+                        default=5,
+                        help="how often each step is measured")
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    main(args.dataset, args.repeat)
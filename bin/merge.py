@@ -3,22 +3,42 @@
 
 """Merge two raw data pickle files."""
 
+import logging
 import pickle
 
+from hwrt import utils
 from hwrt.utils import is_valid_file
 
 
-def main(dataset1, dataset2, target):
+def main(dataset1, dataset2, target, deduplicate=False, batch_size=None):
     """
     Parameters
     ----------
     dataset1 : str
     dataset2 : str
     target : str
+    deduplicate : bool
+    batch_size : int, optional
+        If given, the datasets are read batch by batch and ``target`` is
+        written as record stream with batches of at most `batch_size`
+        recordings (see :func:`hwrt.utils.write_dataset_stream`).
     """
+    if batch_size is not None:
+        metadata1, batches1 = utils.iter_dataset(dataset1)
+        metadata2, batches2 = utils.iter_dataset(dataset2)
+        recordings = _merge_recordings(
+            (recording for batch in batches1 for recording in batch),
+            (recording for batch in batches2 for recording in batch),
+            deduplicate)
+        utils.write_dataset_stream(
+            target,
+            {'formula_id2latex': _merge_formula_id2latex(metadata1,
+                                                         metadata2)},
+            utils.regroup_recordings(recordings, batch_size))
+        return
     d1 = read_raw(dataset1)
     d2 = read_raw(dataset2)
-    merged = merge(d1, d2)
+    merged = merge(d1, d2, deduplicate)
     with open(target, 'wb') as f:
         pickle.dump(merged, f, protocol=pickle.HIGHEST_PROTOCOL)
 
@@ -29,33 +49,61 @@ def read_raw(data_path):
     ----------
     data_path : str
     """
-    with open(data_path, 'rb') as f:
-        data = pickle.load(f)
-    return data
+    return utils.load_dataset(data_path)
 
 
-def merge(d1, d2):
+def merge(d1, d2, deduplicate=False):
     """Merge two raw datasets into one.
 
     Parameters
     ----------
     d1 : dict
     d2 : dict
+    deduplicate : bool
+        If this is set, recordings of d2 with the same strokes as a recording
+        of d1 (see ``HandwrittenData.get_fingerprint``) are skipped.
 
     Returns
     -------
     dict
     """
+    handwriting_datasets = list(_merge_recordings(d1['handwriting_datasets'],
+                                                  d2['handwriting_datasets'],
+                                                  deduplicate))
+    return {'formula_id2latex': _merge_formula_id2latex(d1, d2),
+            'handwriting_datasets': handwriting_datasets}
+
+
+def _merge_formula_id2latex(d1, d2):
+    """Get the 'formula_id2latex' of d1 updated with the one of d2."""
     if d1['formula_id2latex'] is None:
         formula_id2latex = {}
     else:
         formula_id2latex = d1['formula_id2latex'].copy()
     formula_id2latex.update(d2['formula_id2latex'])
-    handwriting_datasets = d1['handwriting_datasets']
-    for dataset in d2['handwriting_datasets']:
-        handwriting_datasets.append(dataset)
-    return {'formula_id2latex': formula_id2latex,
-            'handwriting_datasets': handwriting_datasets}
+    return formula_id2latex
+
+
+def _merge_recordings(recordings1, recordings2, deduplicate=False):
+    """Yield the recordings of recordings1 and then the ones of recordings2.
+       With ``deduplicate``, recordings of recordings2 which are in
+       recordings1 are skipped. Only the fingerprints are kept in memory."""
+    fingerprints = set()
+    for dataset in recordings1:
+        if deduplicate:
+            fingerprints.add(dataset['handwriting'].get_fingerprint())
+        yield dataset
+    skipped = 0
+    for dataset in recordings2:
+        if deduplicate:
+            fingerprint = dataset['handwriting'].get_fingerprint()
+            if fingerprint in fingerprints:
+                skipped += 1
+                continue
+            fingerprints.add(fingerprint)
+        yield dataset
+    if deduplicate:
+        logging.info("Skipped %i duplicate recordings.", skipped)
 
 
 def get_parser():
@@ -79,9 +127,20 @@ def get_parser():
                         help="target",
                         metavar="FILE",
                         required=True)
+    parser.add_argument("--deduplicate",
+                        dest="deduplicate",
+                        action="store_true",
+                        default=False,
+                        help="skip recordings of dataset 2 which are in "
+                             "dataset 1")
+    parser.add_argument("-b", "--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        help="write a record stream and keep at most this "
+                             "many recordings in memory")
     return parser
 
 
 if __name__ == "__main__":
     args = get_parser().parse_args()
-    main(args.d1, args.d2, args.target)
+    main(args.d1, args.d2, args.target, args.deduplicate, args.batch_size)
@@ -9,10 +9,6 @@ from __future__ import print_function
 import os
 import logging
 import sys
-try:  # Python 2
-    import cPickle as pickle
-except ImportError:  # Python 3
-    import pickle
 import numpy
 
 # hwrt modules
@@ -94,7 +90,7 @@ def main(handwriting_datasets_file, analyze_features):
     """Start the creation of the wanted metric."""
     # Load from pickled file
     logging.info("Start loading data '%s' ...", handwriting_datasets_file)
-    loaded = pickle.load(open(handwriting_datasets_file))
+    loaded = utils.load_dataset(handwriting_datasets_file)
     raw_datasets = loaded['handwriting_datasets']
     logging.info("%i datasets loaded.", len(raw_datasets))
     logging.info("Start analyzing...")
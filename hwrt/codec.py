@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Encode and decode JSON, especially recordings as lists of strokes.
+
+The fastest installed JSON library is used. Currently this is `orjson
+<https://github.com/ijl/orjson>`_ if it is installed and the ``json`` module of
+the standard library otherwise. Both produce compact JSON without spaces,
+like the recordings of write-math.com::
+
+    >>> dumps([[{'x': 1, 'y': 2, 'time': 3}]])
+    '[[{"x":1,"y":2,"time":3}]]'
+
+:func:`loads_strokes` decodes a recording directly into the arrays which
+:class:`hwrt.handwritten_data.HandwrittenData` uses.
+"""
+
+import itertools
+import json
+import logging
+import numbers
+import operator
+import numpy
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ['json'] if orjson is None else ['orjson', 'json']
+_backend = BACKENDS[0]
+
+_get_coordinates = operator.itemgetter('x', 'y', 'time')
+_KEYS = frozenset(['x', 'y', 'time', 'pen_down'])
+# Larger integers are not always exactly representable as float64
+_MAX_EXACT_INTEGER = 2**53
+
+
+def get_backend():
+    """Get the name of the JSON library which is used."""
+    return _backend
+
+
+def set_backend(name):
+    """Use the JSON library ``name``. It has to be one of :data:`BACKENDS`.
+
+    This is mainly useful for benchmarks and tests.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError("JSON backend '%s' is not available. Use one of %s."
+                         % (name, BACKENDS))
+    _backend = name
+
+
+def loads(json_string):
+    """Decode the JSON string (or bytes) ``json_string``.
+
+    Raises
+    ------
+    ValueError
+        If ``json_string`` is not valid JSON.
+    """
+    if _backend == 'orjson':
+        try:
+            return orjson.loads(json_string)
+        except ValueError:
+            # The json module is less strict, e.g. it accepts NaN
+            pass
+    return json.loads(json_string)
+
+
+def dumps(obj):
+    """Encode ``obj`` as compact JSON string."""
+    if _backend == 'orjson':
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            # e.g. integers with more than 64 bit
+            logging.debug("orjson could not encode the object.")
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def loads_strokes(json_string):
+    """Decode a recording in JSON format directly into arrays.
+
+    Parameters
+    ----------
+    json_string : str
+        A JSON list of strokes. Each stroke is a list of objects
+        {"x": 123, "y": 42, "time": 1337}
+
+    Returns
+    -------
+    tuple :
+        The same as :func:`strokes_to_arrays`
+
+    Raises
+    ------
+    ValueError
+        If ``json_string`` is not a list of strokes in JSON format.
+    """
+    pointlist = loads(json_string)
+    if type(pointlist) is not list:
+        raise ValueError("The JSON string is not a list of strokes: %r" %
+                         json_string)
+    return strokes_to_arrays(pointlist)
+
+
+def strokes_to_arrays(pointlist):
+    """Convert a list of strokes to arrays.
+
+    Parameters
+    ----------
+    pointlist : list
+        A list of strokes. Each stroke is a list of dictionaries
+        {'x': 123, 'y': 42, 'time': 1337}
+
+    Returns
+    -------
+    tuple :
+        (points, stroke_offsets, pen_down, integral, extra) - ``points`` is
+        an ``(n, 3)`` float array with the columns ``x``, ``y`` and ``time``
+        where missing values are NaN. The points of stroke ``i`` are
+        ``points[stroke_offsets[i]:stroke_offsets[i + 1]]``. ``pen_down`` is
+        ``None`` if no point has this key and an array of 1, 0 and -1 (no
+        information) otherwise. ``integral`` tells for ``x``, ``y`` and
+        ``time`` if all values are integers. ``extra`` is ``None`` if the
+        arrays describe every point completely. Otherwise it is a list with
+        a copy of every point which has other keys, an integer in a column
+        which is not integral, an integer which is not exactly a float or a
+        ``pen_down`` value which is not a bool and ``None`` for all other
+        points.
+
+    Examples
+    --------
+    >>> points, offsets, pen_down, integral, extra = strokes_to_arrays(
+    ...     [[{'x': 1, 'y': 2.5, 'time': 3}], []])
+    >>> points.tolist(), offsets.tolist(), pen_down, integral, extra
+    ([[1.0, 2.5, 3.0]], [0, 1, 1], None, (True, False, True), None)
+    >>> strokes_to_arrays([[{'x': 1, 'y': 2, 'time': 3, 'id': 7},
+    ...                     {'x': 1.5, 'y': 2, 'time': 4}]])[4]
+    [{'x': 1, 'y': 2, 'time': 3, 'id': 7}, None]
+    """
+    stroke_offsets = numpy.zeros(len(pointlist) + 1, dtype=numpy.intp)
+    numpy.cumsum([len(stroke) for stroke in pointlist],
+                 out=stroke_offsets[1:])
+    points = list(itertools.chain.from_iterable(pointlist))
+    if len(points) == 0:
+        return (numpy.zeros((0, 3)), stroke_offsets, None,
+                (False, False, False), None)
+    irregular = numpy.array([not point.keys() <= _KEYS for point in points],
+                            dtype=bool)
+    columns, integral = [], []
+    for values in zip(*map(_get_coordinates, points)):
+        column = numpy.array(values)
+        if column.dtype.kind in 'iu':
+            integral.append(True)
+            if numpy.abs(column).max() > _MAX_EXACT_INTEGER:
+                irregular[numpy.abs(column) > _MAX_EXACT_INTEGER] = True
+        elif column.dtype.kind == 'f':
+            integral.append(False)
+            # Integers and bools are stored as integral floats
+            for i in numpy.flatnonzero(column == numpy.floor(column)):
+                if type(values[i]) is not float:
+                    irregular[i] = True
+        else:
+            # Missing values (None) or very large integers
+            integral.append(all(isinstance(value, numbers.Integral)
+                                for value in values if value is not None))
+            column = numpy.array(values, dtype=numpy.float64)
+            for i, value in enumerate(values):
+                if isinstance(value, numbers.Integral) and \
+                   (not integral[-1] or float(value) != value):
+                    irregular[i] = True
+        columns.append(column.astype(numpy.float64, copy=False))
+    pen_down = None
+    if any('pen_down' in point for point in points):
+        pen_down = numpy.array([point.get('pen_down', -1) for point in points],
+                               dtype=numpy.int8)
+        for i, point in enumerate(points):
+            if type(point.get('pen_down', True)) is not bool:
+                irregular[i] = True
+    extra = None
+    if irregular.any():
+        extra = [dict(point) if is_irregular else None
+                 for point, is_irregular in zip(points, irregular.tolist())]
+    return (numpy.column_stack(columns), stroke_offsets, pen_down,
+            tuple(integral), extra)
@@ -17,10 +17,9 @@ import os
 import yaml
 import csv
 try:  # Python 2
-    import cPickle as pickle
     from future.builtins import open
 except ImportError:  # Python 3
-    import pickle
+    pass
 import time
 import gc
 import numpy
@@ -141,7 +140,7 @@ def main(feature_folder, create_learning_curve=False):
                                                 formula_id2index,
                                                 feature_list,
                                                 is_traindata)
-        logging.info("%s length: %i", dataset_name, len(prepared))
+        logging.info("%s length: %i", dataset_name, len(prepared[1]))
         logging.info("start 'make_hdf5'x ...")
         make_hdf5(dataset_name,
                   input_features,
@@ -200,7 +199,8 @@ def get_sets(path_to_data):
     Parameters
     ----------
     path_to_data :
-        A pickle file that contains a list of datasets.
+        A pickle file that contains a list of datasets - either a single
+        pickled dictionary or a record stream.
 
     Returns
     -------
@@ -221,7 +221,7 @@ def get_sets(path_to_data):
             The index2latex maps the index of the neural network to the latex
             command.
     """
-    loaded = pickle.load(open(path_to_data, 'rb'))
+    loaded = utils.load_dataset(path_to_data)
     datasets = loaded['handwriting_datasets']
 
     training_set, validation_set, test_set = [], [], []
@@ -264,13 +264,10 @@ def get_sets(path_to_data):
             preprocessing_queue, index2latex)
 
 
-def _calculate_feature_stats(feature_list, prepared, serialization_file):  # pylint: disable=R0914
+def _calculate_feature_stats(feature_list, feats, serialization_file):  # pylint: disable=R0914
     """Calculate min, max and mean for each feature. Store it in object."""
-    # Create feature only list
-    feats = [x for x, _ in prepared]  # Label is not necessary
-
     # Calculate all means / mins / maxs
-    means = numpy.mean(feats, 0)
+    means = numpy.mean(feats, 0, dtype=numpy.float64)
     mins = numpy.min(feats, 0)
     maxs = numpy.max(feats, 0)
 
@@ -301,12 +298,28 @@ def _calculate_feature_stats(feature_list, prepared, serialization_file):  # pyl
 
 def _normalize_features(feature_list, prepared, is_traindata):
     """Normalize features (mean subtraction, division by variance or range).
+       `prepared` is either a tuple (feature matrix, labels) like it is
+       returned by :func:`prepare_dataset` or a list of (features, label)
+       tuples.
     """
+    if isinstance(prepared, tuple):
+        feats = prepared[0]
+    else:
+        feats = [x for x, _ in prepared]  # Label is not necessary
     if is_traindata:
         _calculate_feature_stats(feature_list,
-                                 prepared,
+                                 feats,
                                  "featurenormalization.csv")
 
+    if isinstance(prepared, tuple):
+        for feature, column in zip(feature_list,
+                                   features.get_feature_columns(feature_list)):
+            feature_range = feature.max - feature.min
+            feature_range[feature_range == 0] = 1
+            feats[:, column] = (feats[:, column] - feature.mean) / \
+                feature_range
+        return prepared
+
     start = 0
     for feature in feature_list:
         end = start + feature.get_dimension()
@@ -327,23 +340,35 @@ def prepare_dataset(dataset,
                     feature_list,
                     is_traindata,
                     do_normalization=False):
-    """Transform each instance of dataset to a (Features, Label) tuple."""
-    prepared = []
+    """Transform the dataset to a matrix of features with one row per
+       instance and a vector of labels.
+
+    Returns
+    -------
+    tuple :
+        ((features as (n, d) float32 matrix, n labels), translation)
+    """
+    feature_count = sum(feature.get_dimension() for feature in feature_list)
+    x = numpy.empty((len(dataset), feature_count), dtype=numpy.float32)
+    y = numpy.array([formula_id2index[data['formula_id']]  # Get label
+                     for data in dataset], dtype=numpy.int32)
+    translation = [(data['handwriting'].raw_data_id,
+                    data['handwriting'].formula_in_latex,
+                    data['handwriting'].formula_id)
+                   for data in dataset]
     start_time = time.time()
-    translation = []
-    for i, data in enumerate(dataset):
-        x = []
-        handwriting = data['handwriting']
-        x = handwriting.feature_extraction(feature_list)  # Feature selection
-        y = formula_id2index[data['formula_id']]  # Get label
-        translation.append((handwriting.raw_data_id,
-                            handwriting.formula_in_latex,
-                            handwriting.formula_id))
-        prepared.append((numpy.array(x), y))
-        if i % 100 == 0 and i > 0:
-            utils.print_status(len(dataset), i, start_time)
+    for start in range(0, len(dataset), 100):
+        if start > 0:
+            utils.print_status(len(dataset), start, start_time)
+        end = start + 100
+        # Feature selection
+        features.get_feature_matrix(feature_list,
+                                    [data['handwriting']
+                                     for data in dataset[start:end]],
+                                    out=x[start:end])
     sys.stdout.write("\r100%" + " "*80 + "\n")
     sys.stdout.flush()
+    prepared = (x, y)
 
     # Feature normalization
     if do_normalization:
@@ -362,8 +387,9 @@ def make_hdf5(dataset_name, feature_count, data,
         name of the file that hdf5_create will use to create the hdf5 file.
     feature_count : integer
         number of features
-    data : list of tuples
-         data format ('feature_string', 'label')
+    data : tuple
+         (features as (n, feature_count) matrix, n labels) like it is
+         returned by :func:`prepare_dataset`
     """
     # create raw data file for hdf5_create
     if dataset_name == "traindata" and create_learning_curve:
@@ -377,12 +403,14 @@ def make_hdf5(dataset_name, feature_count, data,
             output_filename = ".".join(map(str, tmp))
 
             # Make sure the data has not more than ``trainingexamples``
+            # of every symbol
             seen_symbols = defaultdict(int)
-            new_data = {}
-            for feature_string, label in data:
+            keep = numpy.zeros(len(data[1]), dtype=bool)
+            for i, label in enumerate(data[1].tolist()):
                 if seen_symbols[label] < trainingexamples:
                     seen_symbols[label] += 1
-                    new_data = (feature_string, label)
+                    keep[i] = True
+            new_data = (data[0][keep], data[1][keep])
 
             # Create the hdf5 file
             utils.create_hdf5(output_filename, feature_count, new_data)
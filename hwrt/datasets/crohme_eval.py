@@ -5,7 +5,6 @@
 
 import glob
 
-import json
 import logging
 import sys
 
@@ -14,6 +13,7 @@ logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s',
                     stream=sys.stdout)
 
 # HWRT modules
+from .. import codec
 from . import inkml
 from ..classify import classify_segmented_recording as evaluate
 
@@ -59,7 +59,7 @@ def evaluate_inkml(inkml_file_path):
     logging.info("Start evaluating '%s'...", inkml_file_path)
     ret = {'filename': inkml_file_path}
     recording = inkml.read(inkml_file_path)
-    results = evaluate(json.dumps(recording.get_sorted_pointlist()),
+    results = evaluate(codec.dumps(recording.get_sorted_pointlist()),
                        result_format='LaTeX')
     ret['results'] = results
     return ret
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import json
 import signal
 import sys
 import logging
@@ -111,8 +110,8 @@ def read(filepath):
     for annotation in annotations:
         if annotation.attrib['type'] == 'truth':
             formula_in_latex = annotation.text
-    hw = handwritten_data.HandwrittenData(json.dumps(recording),
-                                          formula_in_latex=formula_in_latex)
+    hw = handwritten_data.HandwrittenData.from_pointlist(
+        recording, formula_in_latex=formula_in_latex)
     for annotation in annotations:
         if annotation.attrib['type'] == 'writer':
             hw.writer = annotation.text
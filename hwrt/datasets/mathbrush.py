@@ -6,7 +6,6 @@
 import os
 from natsort import natsorted
 import glob
-import json
 import re
 
 import logging
@@ -229,9 +228,11 @@ def parse_scg_ink_file(filename):
                 recording.append(current_stroke)
                 stroke_count -= 1
                 current_stroke = []
-    hw = handwritten_data.HandwrittenData(json.dumps(recording),
-                                          formula_in_latex=formula_in_latex,
-                                          formula_id=datasets.formula_to_dbid(mathbrush_formula_fix(formula_in_latex)))
+    hw = handwritten_data.HandwrittenData.from_pointlist(
+        recording,
+        formula_in_latex=formula_in_latex,
+        formula_id=datasets.formula_to_dbid(
+            mathbrush_formula_fix(formula_in_latex)))
     hw.internal_id = "/".join(filename.split("/")[-2:])
     hw.segmentation, hw.symbol_stream = get_segmentation(recording,
                                                          annotations,
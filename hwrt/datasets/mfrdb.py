@@ -4,7 +4,6 @@
 import glob
 import logging
 import sys
-import json
 
 logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s',
                     level=logging.DEBUG,
@@ -147,8 +146,8 @@ def get_recordings(directory):
                     time += 20
                 time += 200
                 recording.append(stroke)
-            hw = handwritten_data.HandwrittenData(json.dumps(recording),
-                                                  formula_in_latex=name)
+            hw = handwritten_data.HandwrittenData.from_pointlist(
+                recording, formula_in_latex=name)
             info = {}
             if 'text' in example['FormulaInputInfo']['Username']:
                 uname = example['FormulaInputInfo']['Username']['text'].strip()
@@ -5,7 +5,6 @@
 
 import logging
 import sys
-import json
 import numpy
 
 logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s',
@@ -13,6 +12,7 @@ logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s',
                     stream=sys.stdout)
 
 # hwrt modules
+from .. import codec
 from ..classify import classify_segmented_recording as evaluate
 from ..datasets import mfrdb
 from ..utils import less_than
@@ -27,7 +27,7 @@ def main(directory):
     for latex, symbol_recording in recordings:
         score_place_symbol = []
         for recording in symbol_recording:
-            results = evaluate(json.dumps(recording.get_sorted_pointlist()),
+            results = evaluate(codec.dumps(recording.get_sorted_pointlist()),
                                result_format='LaTeX')
             for i, result in enumerate(results):
                 if result['semantics'] == recording.formula_in_latex:
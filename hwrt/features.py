@@ -16,19 +16,18 @@ this:
  >>> x = a.feature_extraction(feature_list)
 """
 
+import inspect
 import logging
 import sys
 from itertools import combinations_with_replacement as combinations_wr
 import numpy
 import abc
-import Image
-import ImageDraw
 
 # hwrt modules
 from . import handwritten_data
-from . import preprocessing
 from . import utils
 from . import geometry
+from . import raster
 
 
 def get_features(model_description_features):
@@ -78,6 +77,477 @@ def print_featurelist(feature_list):
     print("```")
 
 
+# Maps feature classes to whether their __call__ takes an ExtractionContext
+_accepts_context = {}
+
+
+def get_feature_values(feature, hwr_obj, context):
+    """
+    Get the values of ``feature`` for the recording ``hwr_obj``. The
+    ExtractionContext ``context`` of ``hwr_obj`` is only passed to features
+    which take it; features of plugins may only take the recording.
+
+    Parameters
+    ----------
+    feature : feature object
+    hwr_obj : HandwrittenData
+    context : ExtractionContext
+
+    Returns
+    -------
+    list :
+        ``feature.get_dimension()`` values
+    """
+    feature_class = type(feature)
+    if feature_class not in _accepts_context:
+        try:
+            inspect.signature(feature).bind(hwr_obj, context)
+            _accepts_context[feature_class] = True
+        except AttributeError:  # Python 2
+            argspec = inspect.getargspec(feature.__call__)
+            _accepts_context[feature_class] = \
+                len(argspec.args) > 2 or argspec.varargs is not None
+        except TypeError:
+            _accepts_context[feature_class] = False
+    if _accepts_context[feature_class]:
+        return feature(hwr_obj, context)
+    return feature(hwr_obj)
+
+
+def get_feature_columns(feature_list):
+    """
+    Get the columns which the features of ``feature_list`` occupy in a
+    feature vector.
+
+    Parameters
+    ----------
+    feature_list : list
+        feature objects
+
+    Returns
+    -------
+    list :
+        A slice for every feature
+
+    Examples
+    --------
+    >>> get_feature_columns([StrokeCount(), StrokeCenter(strokes=2)])
+    [slice(0, 1, None), slice(1, 5, None)]
+    """
+    columns = []
+    start = 0
+    for feature in feature_list:
+        end = start + feature.get_dimension()
+        columns.append(slice(start, end))
+        start = end
+    return columns
+
+
+def get_feature_matrix(feature_list, recordings, out=None):
+    """
+    Get the features of many recordings at once. Every feature writes its
+    values into its columns (see :func:`get_feature_columns`) of one
+    float32 matrix with a row per recording. Features with a
+    ``calculate_arrays`` method get the points of all recordings at once
+    (see :func:`get_recording_arrays`), all others one recording after the
+    other.
+
+    Parameters
+    ----------
+    feature_list : list
+        feature objects
+    recordings : list
+        HandwrittenData objects
+    out : numpy array, optional
+        ``(len(recordings), dimension)`` matrix the features are written to.
+        By default, a new matrix is allocated.
+
+    Returns
+    -------
+    numpy array :
+        The feature matrix
+    """
+    columns = get_feature_columns(feature_list)
+    dimension = columns[-1].stop if len(columns) > 0 else 0
+    if out is None:
+        out = numpy.empty((len(recordings), dimension), dtype=numpy.float32)
+    assert out.shape == (len(recordings), dimension), \
+        "Expected a %i x %i matrix, got %r" % (len(recordings), dimension,
+                                               out.shape)
+    array_features, single_features = [], []
+    for feature, column in zip(feature_list, columns):
+        if hasattr(feature, 'calculate_arrays'):
+            array_features.append((feature, column))
+        else:
+            single_features.append((feature, column))
+    if len(array_features) > 0 and len(recordings) > 0:
+        arrays = get_recording_arrays(recordings)
+        for feature, column in array_features:
+            values = feature.calculate_arrays(*arrays)
+            assert values.shape == (len(recordings),
+                                    column.stop - column.start), \
+                "Expected %i features from algorithm %s, got %r" % \
+                (column.stop - column.start, str(feature), values.shape)
+            out[:, column] = values
+    if len(single_features) == 0:
+        return out
+    for row, recording in zip(out, recordings):
+        context = ExtractionContext(recording)
+        for feature, column in single_features:
+            values = get_feature_values(feature, recording, context)
+            assert len(values) == column.stop - column.start, \
+                "Expected %i features from algorithm %s, got %i features" % \
+                (column.stop - column.start, str(feature), len(values))
+            row[column] = values
+    return out
+
+
+# Array kernels
+#
+# The kernels work on the points of many recordings at once. The points of
+# all strokes are stored in one ``(n, 3)`` array of ``x``, ``y`` and ``time``
+# values. ``stroke_offsets`` are the ``k + 1`` indices where the ``k`` strokes
+# start in it (see HandwrittenData.get_stroke_offsets) and
+# ``recording_offsets`` are the ``r + 1`` indices where the ``r`` recordings
+# start in the strokes. If ``recording_offsets`` is None, all strokes belong
+# to one recording. The kernels of features return one row per recording.
+
+
+def get_recording_arrays(recordings):
+    """
+    Get the arrays the kernels work on for many recordings.
+
+    Parameters
+    ----------
+    recordings : list
+        HandwrittenData objects
+
+    Returns
+    -------
+    tuple :
+        (points, stroke_offsets, recording_offsets)
+    """
+    point_arrays = [recording.get_point_array() for recording in recordings]
+    stroke_offset_arrays = [recording.get_stroke_offsets()
+                            for recording in recordings]
+    point_counts = [len(points) for points in point_arrays]
+    stroke_counts = [len(offsets) - 1 for offsets in stroke_offset_arrays]
+    point_starts = numpy.cumsum([0] + point_counts[:-1])
+    stroke_offsets = [offsets[:-1] + start
+                      for offsets, start in zip(stroke_offset_arrays,
+                                                point_starts)]
+    stroke_offsets = numpy.concatenate(stroke_offsets +
+                                       [[sum(point_counts)]])
+    recording_offsets = numpy.concatenate([[0], numpy.cumsum(stroke_counts)])
+    points = numpy.concatenate(point_arrays + [numpy.zeros((0, 3))])
+    return (points, stroke_offsets.astype(numpy.intp),
+            recording_offsets.astype(numpy.intp))
+
+
+def _get_recording_offsets(stroke_offsets, recording_offsets):
+    """Get the recording offsets with None meaning a single recording."""
+    if recording_offsets is None:
+        return numpy.array([0, len(stroke_offsets) - 1], dtype=numpy.intp)
+    return numpy.asarray(recording_offsets, dtype=numpy.intp)
+
+
+def _reduce_groups(ufunc, values, offsets, empty):
+    """Reduce ``values[offsets[i]:offsets[i + 1]]`` with ``ufunc`` for every
+       ``i``. Empty groups get the value ``empty``."""
+    result = numpy.full((len(offsets) - 1,) + values.shape[1:], empty,
+                        dtype=numpy.float64)
+    non_empty = offsets[1:] > offsets[:-1]
+    if numpy.any(non_empty):
+        result[non_empty] = ufunc.reduceat(values, offsets[:-1][non_empty],
+                                           axis=0)
+    return result
+
+
+def _get_first_strokes(stroke_offsets, recording_offsets, strokes):
+    """Get the index of the recording and the position within it for the
+       first ``strokes`` strokes of every recording.
+
+    Returns
+    -------
+    tuple :
+        (mask of the selected strokes, their recordings, their positions)
+    """
+    stroke_counts = numpy.diff(recording_offsets)
+    recording = numpy.repeat(numpy.arange(len(stroke_counts)), stroke_counts)
+    position = numpy.arange(len(recording)) - recording_offsets[recording]
+    selected = position < strokes
+    return selected, recording[selected], position[selected]
+
+
+def get_segment_vectors(points, stroke_offsets):
+    """
+    Get the vectors from every point to the next point of the same stroke.
+
+    Returns
+    -------
+    tuple :
+        (``(m, 2)`` array of vectors, ``k + 1`` offsets of the strokes in it)
+    """
+    in_stroke = numpy.ones(max(len(points) - 1, 0), dtype=bool)
+    stroke_starts = stroke_offsets[1:-1]
+    stroke_starts = stroke_starts[(stroke_starts > 0) &
+                                  (stroke_starts < len(points))]
+    in_stroke[stroke_starts - 1] = False
+    vectors = numpy.diff(points[:, :2], axis=0)[in_stroke]
+    segment_counts = numpy.maximum(numpy.diff(stroke_offsets) - 1, 0)
+    segment_offsets = numpy.concatenate([[0], numpy.cumsum(segment_counts)])
+    return vectors, segment_offsets.astype(numpy.intp)
+
+
+def get_stroke_lengths(points, stroke_offsets):
+    """Get the length of every stroke."""
+    vectors, segment_offsets = get_segment_vectors(points, stroke_offsets)
+    return _reduce_groups(numpy.add,
+                          numpy.hypot(vectors[:, 0], vectors[:, 1]),
+                          segment_offsets, 0)
+
+
+def get_stroke_bounding_boxes(points, stroke_offsets):
+    """Get a ``(k, 4)`` array with ``minx``, ``miny``, ``maxx`` and ``maxy``
+       of every stroke. Empty strokes get NaN values."""
+    return numpy.hstack([_reduce_groups(numpy.minimum, points[:, :2],
+                                        stroke_offsets, numpy.nan),
+                         _reduce_groups(numpy.maximum, points[:, :2],
+                                        stroke_offsets, numpy.nan)])
+
+
+def get_stroke_count(stroke_offsets, recording_offsets=None):
+    """Get the number of strokes of every recording as ``(r, 1)`` array."""
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    return numpy.diff(recording_offsets)[:, None]
+
+
+def get_ink(points, stroke_offsets, recording_offsets=None,
+            stroke_lengths=None):
+    """
+    Get the summed up length of the strokes of every recording as ``(r, 1)``
+    array.
+
+    Parameters
+    ----------
+    stroke_lengths : numpy array, optional
+        The result of :func:`get_stroke_lengths` if it is already known.
+    """
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    if stroke_lengths is None:
+        stroke_lengths = get_stroke_lengths(points, stroke_offsets)
+    return _reduce_groups(numpy.add, stroke_lengths, recording_offsets,
+                          0)[:, None]
+
+
+def get_extents(points, stroke_offsets, recording_offsets=None):
+    """Get the width, height and time of every recording as ``(r, 3)``
+       array. Recordings without points get NaN values."""
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    point_offsets = stroke_offsets[recording_offsets]
+    return _reduce_groups(numpy.maximum, points, point_offsets, numpy.nan) - \
+        _reduce_groups(numpy.minimum, points, point_offsets, numpy.nan)
+
+
+def get_aspect_ratio(points, stroke_offsets, recording_offsets=None,
+                     extents=None):
+    """
+    Get the aspect ratio of every recording as ``(r, 1)`` array.
+
+    Parameters
+    ----------
+    extents : numpy array, optional
+        The result of :func:`get_extents` if it is already known.
+    """
+    if extents is None:
+        extents = get_extents(points, stroke_offsets, recording_offsets)
+    return ((extents[:, 0] + 0.01) / (extents[:, 1] + 0.01))[:, None]
+
+
+def get_center_of_mass(points, stroke_offsets, recording_offsets=None):
+    """Get the mean of the ``x`` and ``y`` coordinates of every recording as
+       ``(r, 2)`` array. Recordings without points get NaN values."""
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    point_offsets = stroke_offsets[recording_offsets]
+    sums = _reduce_groups(numpy.add, points[:, :2], point_offsets, numpy.nan)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return sums / numpy.diff(point_offsets)[:, None]
+
+
+def get_stroke_centers(points, stroke_offsets, recording_offsets=None,
+                       strokes=4):
+    """Get the mean ``x`` and ``y`` coordinates of the first ``strokes``
+       strokes of every recording as ``(r, 2*strokes)`` array. Missing
+       strokes get 0 and empty strokes NaN values."""
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    sums = _reduce_groups(numpy.add, points[:, :2], stroke_offsets,
+                          numpy.nan)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        centers = sums / numpy.diff(stroke_offsets)[:, None]
+    selected, recording, position = _get_first_strokes(stroke_offsets,
+                                                       recording_offsets,
+                                                       strokes)
+    x = numpy.zeros((len(recording_offsets) - 1, strokes, 2))
+    x[recording, position] = centers[selected]
+    return x.reshape(len(x), -1)
+
+
+def get_recurvature(points, stroke_offsets, recording_offsets=None,
+                    strokes=4, stroke_lengths=None,
+                    stroke_bounding_boxes=None):
+    """
+    Get the ratio of the height and the length of the first ``strokes``
+    strokes of every recording as ``(r, strokes)`` array. Strokes with a
+    length of 0 have a ratio of 1 and missing strokes get 0.
+
+    Parameters
+    ----------
+    stroke_lengths : numpy array, optional
+        The result of :func:`get_stroke_lengths` if it is already known.
+    stroke_bounding_boxes : numpy array, optional
+        The result of :func:`get_stroke_bounding_boxes` if it is already
+        known.
+    """
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    if stroke_lengths is None:
+        stroke_lengths = get_stroke_lengths(points, stroke_offsets)
+    if stroke_bounding_boxes is None:
+        stroke_bounding_boxes = get_stroke_bounding_boxes(points,
+                                                          stroke_offsets)
+    heights = stroke_bounding_boxes[:, 3] - stroke_bounding_boxes[:, 1]
+    ratios = numpy.ones(len(stroke_lengths))
+    numpy.divide(heights, stroke_lengths, out=ratios,
+                 where=stroke_lengths != 0)
+    selected, recording, position = _get_first_strokes(stroke_offsets,
+                                                       recording_offsets,
+                                                       strokes)
+    x = numpy.zeros((len(recording_offsets) - 1, strokes))
+    x[recording, position] = ratios[selected]
+    return x
+
+
+def get_first_n_points(points, stroke_offsets, recording_offsets=None, n=81):
+    """Get the ``x`` and ``y`` coordinates of the first ``n`` points of every
+       recording as ``(r, 2*n)`` array. Missing points get 0."""
+    recording_offsets = _get_recording_offsets(stroke_offsets,
+                                               recording_offsets)
+    point_offsets = stroke_offsets[recording_offsets]
+    point_counts = numpy.diff(point_offsets)
+    recording = numpy.repeat(numpy.arange(len(point_counts)), point_counts)
+    position = numpy.arange(len(recording)) - point_offsets[recording]
+    selected = position < n
+    start = point_offsets[0]
+    x = numpy.zeros((len(point_counts), n, 2))
+    x[recording[selected], position[selected]] = \
+        points[start:start + len(recording)][selected, :2]
+    return x.reshape(len(x), -1)
+
+
+class ExtractionContext(object):
+
+    """Intermediate results of one recording which are shared by all features
+       of an extraction pass. Everything is calculated when it is requested
+       for the first time, so a recording gets decoded only once no matter
+       how many features need its points.
+
+       The returned arrays and lists must not be changed.
+
+    Parameters
+    ----------
+    hwr_obj : HandwrittenData
+    """
+
+    def __init__(self, hwr_obj):
+        self.hwr_obj = hwr_obj
+        self._cache = {}
+
+    def _get_cached(self, key, calculate):
+        """Get the intermediate result ``key``, calculate it if necessary."""
+        if key not in self._cache:
+            self._cache[key] = calculate()
+        return self._cache[key]
+
+    def get_point_array(self):
+        """Get the ``(n, 3)`` array of ``x``, ``y`` and ``time`` values."""
+        return self._get_cached('point_array', self.hwr_obj.get_point_array)
+
+    def get_stroke_offsets(self):
+        """Get the ``k + 1`` offsets of the ``k`` strokes in the point
+           array."""
+        return self.hwr_obj.get_stroke_offsets()
+
+    def get_stroke_count(self):
+        """Get the number of strokes."""
+        return len(self.get_stroke_offsets()) - 1
+
+    def get_pointlist(self):
+        """Get the strokes as lists of point dictionaries."""
+        return self._get_cached('pointlist', self.hwr_obj.get_pointlist)
+
+    def get_strokes(self):
+        """Get a list with the ``(n_i, 3)`` point array of every stroke."""
+        def calculate():
+            points = self.get_point_array()
+            offsets = self.get_stroke_offsets().tolist()
+            return [points[start:end]
+                    for start, end in zip(offsets, offsets[1:])]
+        return self._get_cached('strokes', calculate)
+
+    def get_bounding_box(self):
+        """Get the bounding box of the recording."""
+        return self._get_cached('bounding_box', self.hwr_obj.get_bounding_box)
+
+    def get_extents(self):
+        """Get the width, height and time of the recording."""
+        def calculate():
+            return get_extents(self.get_point_array(),
+                               self.get_stroke_offsets())[0]
+        return self._get_cached('extents', calculate)
+
+    def get_stroke_bounding_boxes(self):
+        """Get a ``(k, 4)`` array with ``minx``, ``miny``, ``maxx`` and
+           ``maxy`` of every stroke. Empty strokes get NaN values."""
+        def calculate():
+            return get_stroke_bounding_boxes(self.get_point_array(),
+                                             self.get_stroke_offsets())
+        return self._get_cached('stroke_bounding_boxes', calculate)
+
+    def _calculate_segments(self):
+        """Calculate the vectors between consecutive points of a stroke and
+           the offsets of the strokes in the array of those vectors."""
+        return get_segment_vectors(self.get_point_array(),
+                                   self.get_stroke_offsets())
+
+    def get_segment_vectors(self):
+        """Get a ``(m, 2)`` array of the vectors from every point to the next
+           point of the same stroke."""
+        return self._get_cached('segments', self._calculate_segments)[0]
+
+    def get_segment_offsets(self):
+        """Get the ``k + 1`` offsets of the strokes in the segment vectors."""
+        return self._get_cached('segments', self._calculate_segments)[1]
+
+    def get_segment_lengths(self):
+        """Get the length of every segment vector."""
+        def calculate():
+            vectors = self.get_segment_vectors()
+            return numpy.hypot(vectors[:, 0], vectors[:, 1])
+        return self._get_cached('segment_lengths', calculate)
+
+    def get_stroke_lengths(self):
+        """Get the length of every stroke."""
+        def calculate():
+            return _reduce_groups(numpy.add, self.get_segment_lengths(),
+                                  self.get_segment_offsets(), 0)
+        return self._get_cached('stroke_lengths', calculate)
+
+
 class Feature(object):
 
     """Abstract class which defines which methods to implement for features."""
@@ -85,13 +555,38 @@ class Feature(object):
     __metaclass__ = abc.ABCMeta
 
     @abc.abstractmethod
-    def __call__(self, hwr_obj):
+    def __call__(self, hwr_obj, context=None):
         """Get the features value for a given recording ``hwr_obj``.
+
+        Parameters
+        ----------
+        hwr_obj : HandwrittenData
+        context : ExtractionContext, optional
+            The intermediate results of ``hwr_obj`` which are shared with
+            other features.
+
+        Returns
+        -------
+        list :
+            ``get_dimension()`` feature values
         """
         assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
             "handwritten data is not of type HandwrittenData, but of %r" % \
             type(hwr_obj)
 
+    def _get_context(self, hwr_obj, context=None):
+        """Get the extraction context which ``__call__`` should take the
+           intermediate results of ``hwr_obj`` from: ``context`` or a new
+           one if it was not given."""
+        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
+            "handwritten data is not of type HandwrittenData, but of %r" % \
+            type(hwr_obj)
+        if context is None:
+            context = ExtractionContext(hwr_obj)
+        assert context.hwr_obj is hwr_obj, \
+            "The extraction context belongs to another recording"
+        return context
+
     @abc.abstractmethod
     def get_dimension(self):
         """Return the length of the list which __call__ will return."""
@@ -106,8 +601,14 @@ class Feature(object):
 # Every feature class must have a get_dimension function so that the total
 # number of features can be calculated and checked for consistency.
 #
-# * __call__ must take exactly one argument of type HandwrittenData
+# * __call__ must take an argument of type HandwrittenData and an optional
+#   ExtractionContext which it should get shared intermediate results from.
+#   Features which only take the HandwrittenData object (e.g. of plugins)
+#   work, too (see get_feature_values).
 # * __call__ must return a list of length get_dimension()
+# * a feature may have a calculate_arrays method which gets the arrays of many
+#   recordings (see get_recording_arrays) and returns the same values as
+#   __call__ as (recordings, get_dimension()) array
 # * get_dimension must return a positive number
 # * have a 'normalize' attribute that is either True or False
 
@@ -182,66 +683,78 @@ class ConstantPointCoordinates(Feature):
             else:
                 return 2*self.points_per_stroke
 
-    def _features_with_strokes(self, hwr_obj):
+    def _features_with_strokes(self, hwr_obj, context):
         """Calculate the ConstantPointCoordinates features for the case of
            a fixed number of strokes."""
-        x = []
-        img = Image.new('L', ((int(hwr_obj.get_width()*self.scaling_factor) + 2), (int(hwr_obj.get_height()*self.scaling_factor) + 2)), 'black')
-        draw = ImageDraw.Draw(img, 'L')
-        pointlist = hwr_obj.get_pointlist()
-        bb = hwr_obj.get_bounding_box()
-        for stroke_nr in range(self.strokes):
-            last_point = None
-            # make sure that the current symbol actually has that many
-            # strokes
-            if stroke_nr < len(pointlist):
-                for point_nr in range(self.points_per_stroke):
-                    if point_nr < len(pointlist[stroke_nr]):
-                        point = pointlist[stroke_nr][point_nr]
-                        x.append(pointlist[stroke_nr][point_nr]['x'])
-                        x.append(pointlist[stroke_nr][point_nr]['y'])
-                        if last_point is None:
-                            last_point = point
-                        y_from = int((-bb['miny'] + last_point['y'])*self.scaling_factor)
-                        x_from = int((-bb['minx'] + last_point['x'])*self.scaling_factor)
-                        y_to = int((-bb['miny'] + point['y'])*self.scaling_factor)
-                        x_to = int((-bb['minx'] + point['x'])*self.scaling_factor)
-                        draw.line([x_from, y_from, x_to, y_to], fill='#ffffff', width=1)
-                        if self.pixel_env > 0:
-                            pix = img.load()
-                            for x_offset in range(-self.pixel_env,
-                                                  self.pixel_env + 1):
-                                for y_offset in range(-self.pixel_env,
-                                                      self.pixel_env + 1):
-                                    xp = int((-bb['minx'] + point['x'])
-                                             * self.scaling_factor) + x_offset
-                                    yp = int((-bb['miny'] + point['y'])
-                                             * self.scaling_factor) + y_offset
-                                    xp = max(0, xp)
-                                    yp = max(0, yp)
-                                    x.append(pix[xp, yp])
-                        last_point = point
-                    else:
-                        x.append(self.fill_empty_with)
-                        x.append(self.fill_empty_with)
-                        if self.pixel_env > 0:
-                            for i in range((1 + 2 * self.pixel_env)**2):
-                                x.append(self.fill_empty_with)
-            else:
-                for _ in range(self.points_per_stroke):
-                    x.append(self.fill_empty_with)
-                    x.append(self.fill_empty_with)
-                    if self.pixel_env > 0:
-                        for i in range((1 + 2 * self.pixel_env)**2):
-                            x.append(self.fill_empty_with)
-        del draw
-        return x
-
-    def _features_without_strokes(self, hwr_obj):
+        env_size = (1 + 2*self.pixel_env)**2 if self.pixel_env > 0 else 0
+        x = numpy.full((self.strokes, self.points_per_stroke, 2 + env_size),
+                       self.fill_empty_with, dtype=numpy.float64)
+        # make sure that the current symbol actually has that many strokes
+        strokes = [stroke[:self.points_per_stroke, :2]
+                   for stroke in context.get_strokes()[:self.strokes]]
+        for stroke_nr, stroke in enumerate(strokes):
+            x[stroke_nr, :len(stroke), :2] = stroke
+        if self.pixel_env > 0 and sum(len(stroke) for stroke in strokes) > 0:
+            pixels = self._get_pixel_env(hwr_obj, context, strokes)
+            start = 0
+            for stroke_nr, stroke in enumerate(strokes):
+                end = start + len(stroke)
+                x[stroke_nr, :len(stroke), 2:] = pixels[start:end]
+                start = end
+        return x.ravel().tolist()
+
+    def _get_pixel_env(self, hwr_obj, context, strokes):
+        """Get the pixel maps around the points of ``strokes``.
+
+        The strokes are drawn point by point on a black canvas and the pixel
+        map around a point shows only the lines which were drawn up to this
+        point. Pixels left or above of the canvas are taken from its border.
+
+        Returns
+        -------
+        numpy array :
+            One row of ``(1 + 2*pixel_env)**2`` values (0 or 255) per point
+            with the ``x`` offset changing slower than the ``y`` offset.
+        """
+        bb = context.get_bounding_box()
+        width = int(hwr_obj.get_width()*self.scaling_factor) + 2
+        height = int(hwr_obj.get_height()*self.scaling_factor) + 2
+        points = numpy.concatenate(strokes)
+        # The canvas stores the first line which touched a pixel
+        canvas = numpy.full((height, width), len(points),
+                            dtype=numpy.min_scalar_type(len(points)))
+        xs = ((-bb['minx'] + points[:, 0])*self.scaling_factor).astype(int)
+        ys = ((-bb['miny'] + points[:, 1])*self.scaling_factor).astype(int)
+        # Every point gets connected to the point before in its stroke
+        stroke_starts = numpy.cumsum([0] + [len(stroke)
+                                            for stroke in strokes[:-1]])
+        is_first = numpy.zeros(len(points), dtype=bool)
+        is_first[stroke_starts[stroke_starts < len(points)]] = True
+        previous = numpy.arange(len(points)) - 1
+        previous[is_first] += 1
+        line_index, line_xs, line_ys = raster.get_line_pixels(xs[previous],
+                                                              ys[previous],
+                                                              xs, ys)
+        inside = (line_xs >= 0) & (line_xs < width) & \
+            (line_ys >= 0) & (line_ys < height)
+        numpy.minimum.at(canvas, (line_ys[inside], line_xs[inside]),
+                         line_index[inside].astype(canvas.dtype))
+        offsets = numpy.arange(-self.pixel_env, self.pixel_env + 1)
+        env_xs = numpy.maximum(0, xs[:, None, None] + offsets[None, :, None])
+        env_ys = numpy.maximum(0, ys[:, None, None] + offsets[None, None, :])
+        # Only the coordinates below 0 are clamped, as it was done when the
+        # pixels were read from a PIL image
+        if env_xs.max() >= width or env_ys.max() >= height:
+            raise IndexError("image index out of range")
+        drawn = canvas[env_ys, env_xs] <= \
+            numpy.arange(len(points))[:, None, None]
+        return numpy.where(drawn, 255, 0).reshape(len(points), -1)
+
+    def _features_without_strokes(self, context):
         """Calculate the ConstantPointCoordinates features for the case of
            a single (callapesed) stroke with pen_down features."""
         x = []
-        for point in hwr_obj.get_pointlist()[0]:
+        for point in context.get_pointlist()[0]:
             if len(x) >= 3*self.points_per_stroke or \
                (len(x) >= 2*self.points_per_stroke and not self.pen_down):
                 break
@@ -263,12 +776,12 @@ class ConstantPointCoordinates(Feature):
                 x.append(self.fill_empty_with)
         return x
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
         if self.strokes > 0:
-            x = self._features_with_strokes(hwr_obj)
+            x = self._features_with_strokes(hwr_obj, context)
         else:
-            x = self._features_without_strokes(hwr_obj)
+            x = self._features_without_strokes(context)
         assert self.get_dimension() == len(x), \
             "Dimension of %s should be %i, but was %i" % \
             (str(self), self.get_dimension(), len(x))
@@ -302,24 +815,21 @@ class FirstNPoints(Feature):
            of elements in the returned list of numbers."""
         return 2*self.n
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        x = []
-        pointlist = hwr_obj.get_pointlist()
-        left = self.n
-        for stroke in pointlist:
-            for point in stroke:
-                if left == 0:
-                    break
-                else:
-                    left -= 1
-                    x.append(point['x'])
-                    x.append(point['y'])
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        x = get_first_n_points(context.get_point_array(),
+                               context.get_stroke_offsets(),
+                               n=self.n)[0].tolist()
         assert self.get_dimension() == len(x), \
             "Dimension of %s should be %i, but was %i" % \
             (str(self), self.get_dimension(), len(x))
         return x
 
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_first_n_points(points, stroke_offsets, recording_offsets,
+                                  n=self.n)
+
 
 # Global features
 
@@ -343,8 +853,8 @@ class Bitmap(Feature):
            of elements in the returned list of numbers."""
         return self.size**2
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
         feat = hwr_obj.get_bitmap(size=self.size).flatten()
         return list(feat)
 
@@ -366,9 +876,13 @@ class StrokeCount(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        return [len(hwr_obj.get_pointlist())]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        return get_stroke_count(context.get_stroke_offsets())[0].tolist()
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_stroke_count(stroke_offsets, recording_offsets)
 
 
 class Ink(Feature):
@@ -390,18 +904,17 @@ class Ink(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        ink = 0.
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
         # calculate ink used for this symbol
         # TODO: What about dots? What about speed?
-        for stroke in hwr_obj.get_pointlist():
-            last_point = None
-            for point in stroke:
-                if last_point is not None:
-                    ink += preprocessing.euclidean_distance(last_point, point)
-                last_point = point
-        return [ink]
+        ink = get_ink(context.get_point_array(), context.get_stroke_offsets(),
+                      stroke_lengths=context.get_stroke_lengths())
+        return ink[0].tolist()
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_ink(points, stroke_offsets, recording_offsets)
 
 
 class AspectRatio(Feature):
@@ -421,11 +934,16 @@ class AspectRatio(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        width = float(hwr_obj.get_width()+0.01)
-        height = float(hwr_obj.get_height()+0.01)
-        return [width/height]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        aspect_ratio = get_aspect_ratio(context.get_point_array(),
+                                        context.get_stroke_offsets(),
+                                        extents=context.get_extents()[None])
+        return aspect_ratio[0].tolist()
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_aspect_ratio(points, stroke_offsets, recording_offsets)
 
 
 class Width(Feature):
@@ -451,9 +969,13 @@ class Width(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        return [float(hwr_obj.get_width())]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        return [float(context.get_extents()[0])]
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_extents(points, stroke_offsets, recording_offsets)[:, 0:1]
 
 
 class Height(Feature):
@@ -479,9 +1001,13 @@ class Height(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        return [float(hwr_obj.get_height())]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        return [float(context.get_extents()[1])]
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_extents(points, stroke_offsets, recording_offsets)[:, 1:2]
 
 
 class Time(Feature):
@@ -502,9 +1028,13 @@ class Time(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        return [float(hwr_obj.get_time())]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        return [float(context.get_extents()[2])]
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_extents(points, stroke_offsets, recording_offsets)[:, 2:3]
 
 
 class CenterOfMass(Feature):
@@ -524,15 +1054,15 @@ class CenterOfMass(Feature):
            of elements in the returned list of numbers."""
         return 2
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        xs = []
-        ys = []
-        for stroke in hwr_obj.get_pointlist():
-            for point in stroke:
-                xs.append(point['x'])
-                ys.append(point['y'])
-        return [float(sum(xs))/len(xs), float(sum(ys))/len(ys)]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        center = get_center_of_mass(context.get_point_array(),
+                                    context.get_stroke_offsets())
+        return center[0].tolist()
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_center_of_mass(points, stroke_offsets, recording_offsets)
 
 
 class StrokeCenter(Feature):
@@ -555,22 +1085,17 @@ class StrokeCenter(Feature):
            of elements in the returned list of numbers."""
         return self.strokes*2
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        feature_vector = []
-        for i, stroke in enumerate(hwr_obj.get_pointlist()):
-            if i >= self.strokes:
-                break
-            xs = []
-            ys = []
-            for point in stroke:
-                xs.append(point['x'])
-                ys.append(point['y'])
-            feature_vector.append(numpy.mean(xs))
-            feature_vector.append(numpy.mean(ys))
-        while len(feature_vector) < self.get_dimension():
-            feature_vector.append(0)
-        return feature_vector
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        centers = get_stroke_centers(context.get_point_array(),
+                                     context.get_stroke_offsets(),
+                                     strokes=self.strokes)
+        return centers[0].tolist()
+
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_stroke_centers(points, stroke_offsets, recording_offsets,
+                                  strokes=self.strokes)
 
 
 class DouglasPeuckerPoints(Feature):
@@ -595,45 +1120,12 @@ class DouglasPeuckerPoints(Feature):
            of elements in the returned list of numbers."""
         return 1
 
-    def _stroke_simplification(self, pointlist):
-        """The Douglas-Peucker line simplification takes a list of points as an
-           argument. It tries to simplifiy this list by removing as many points
-           as possible while still maintaining the overall shape of the stroke.
-           It does so by taking the first and the last point, connecting them
-           by a straight line and searchin for the point with the highest
-           distance. If that distance is bigger than 'epsilon', the point is
-           important and the algorithm continues recursively."""
-
-        # Find the point with the biggest distance
-        dmax = 0
-        index = 0
-        for i in range(1, len(pointlist)):
-            d = geometry.perpendicular_distance(pointlist[i],
-                                                pointlist[0],
-                                                pointlist[-1])
-            if d > dmax:
-                index = i
-                dmax = d
-
-        # If the maximum distance is bigger than the threshold 'epsilon', then
-        # simplify the pointlist recursively
-        if dmax >= self.epsilon:
-            # Recursive call
-            rec_results1 = self._stroke_simplification(pointlist[0:index])
-            rec_results2 = self._stroke_simplification(pointlist[index:])
-            result_list = rec_results1[:-1] + rec_results2
-        else:
-            result_list = [pointlist[0], pointlist[-1]]
-
-        return result_list
-
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        dp_points = 0
-        for stroke in hwr_obj.get_pointlist():
-            points = self._stroke_simplification(stroke)
-            dp_points += len(points)
-        return [dp_points]
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        indices, _ = geometry.douglas_peucker(context.get_point_array(),
+                                              self.epsilon,
+                                              context.get_stroke_offsets())
+        return [len(indices)]
 
 
 class StrokeIntersections(Feature):
@@ -655,6 +1147,11 @@ class StrokeIntersections(Feature):
     Returns values of upper triangular matrix (including diagonal)
     from left to right, top to bottom.
 
+    If ``sweep`` is set, the intersections are found with a sweep over
+    arrays of line segments (see :func:`geometry.count_selfintersections`
+    and :func:`geometry.count_intersections`). This is much faster, but it
+    counts differently for touching, collinear and repeated points.
+
     ..warning
 
         This method has an error. It should probably not be used.
@@ -662,8 +1159,9 @@ class StrokeIntersections(Feature):
 
     normalize = True
 
-    def __init__(self, strokes=4):
+    def __init__(self, strokes=4, sweep=False):
         self.strokes = strokes
+        self.sweep = sweep
 
     def __repr__(self):
         return "StrokeIntersections"
@@ -676,10 +1174,20 @@ class StrokeIntersections(Feature):
            of elements in the returned list of numbers."""
         return int(round(float(self.strokes**2)/2 + float(self.strokes)/2))
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        if self.sweep:
+            x = self._sweep_features(context)
+        else:
+            x = self._polygonal_chain_features(context)
+        assert self.get_dimension() == len(x), \
+            "Dimension of %s should be %i, but was %i" % \
+            (str(self), self.get_dimension(), len(x))
+        return x
 
-        pointlist = hwr_obj.get_pointlist()
+    def _polygonal_chain_features(self, context):
+        """Count the intersections with geometry.PolygonalChain."""
+        pointlist = context.get_pointlist()
         polygonal_chains = []
 
         # Make sure the dimension is correct
@@ -695,10 +1203,27 @@ class StrokeIntersections(Feature):
                 x.append(chainA.count_selfintersections())
             else:
                 x.append(chainA.count_intersections(chainB))
+        return x
 
-        assert self.get_dimension() == len(x), \
-            "Dimension of %s should be %i, but was %i" % \
-            (str(self), self.get_dimension(), len(x))
+    def _sweep_features(self, context):
+        """Count the intersections with a sweep over segment arrays."""
+        strokes = context.get_strokes()
+        polylines = []
+
+        # Make sure the dimension is correct
+        for i in range(self.strokes):
+            if i < len(strokes):
+                polylines.append(geometry.get_polyline_segments(strokes[i]))
+            else:
+                polylines.append(numpy.zeros((0, 2, 2)))
+
+        x = []
+        for i, j in combinations_wr(range(self.strokes), 2):
+            if i == j:
+                x.append(geometry.count_selfintersections(polylines[i]))
+            else:
+                x.append(geometry.count_intersections(polylines[i],
+                                                      polylines[j]))
         return x
 
 
@@ -729,29 +1254,24 @@ class ReCurvature(Feature):
            of elements in the returned list of numbers."""
         return self.strokes
 
-    def __call__(self, hwr_obj):
-        super(self.__class__, self).__call__(hwr_obj)
-        x = []
-        for stroke in hwr_obj.get_pointlist():
-            stroke_y = [point['y'] for point in stroke]
-            height = max(stroke_y) - min(stroke_y)
-            length = 0.0
-            for last_point, point in zip(stroke, stroke[1:]):
-                length += preprocessing.euclidean_distance(point, last_point)
-
-            if length == 0:
-                x.append(1)
-            else:
-                x.append(height/length)
-            if len(x) == self.strokes:
-                break
-        while len(x) < self.strokes:
-            x.append(0)
+    def __call__(self, hwr_obj, context=None):
+        context = self._get_context(hwr_obj, context)
+        x = get_recurvature(
+            context.get_point_array(), context.get_stroke_offsets(),
+            strokes=self.strokes,
+            stroke_lengths=context.get_stroke_lengths(),
+            stroke_bounding_boxes=context.get_stroke_bounding_boxes())
+        x = x[0].tolist()
         assert self.get_dimension() == len(x), \
             "Dimension of %s should be %i, but was %i" % \
             (str(self), self.get_dimension(), len(x))
         return x
 
+    def calculate_arrays(self, points, stroke_offsets, recording_offsets):
+        """Get the feature of many recordings at once."""
+        return get_recurvature(points, stroke_offsets, recording_offsets,
+                               strokes=self.strokes)
+
 
 if __name__ == '__main__':
     import doctest
@@ -3,12 +3,8 @@
 
 """Features in development."""
 
-import urllib
-import os
-
 # hwrt modules
 from . import handwritten_data
-from . import utils
 
 
 class Bitmap(object):
@@ -31,34 +27,12 @@ class Bitmap(object):
            of elements in the returned list of numbers."""
         return self.n**2
 
-    def __call__(self, hwr_obj):
+    def __call__(self, hwr_obj, context=None):
         assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
             "handwritten data is not of type HandwrittenData, but of %r" % \
             type(hwr_obj)
-        x = []
-        url = "http://localhost/write-math/website/raw-data/"
-        raw_data_id = hwr_obj.raw_data_id
-        project_root = utils.get_project_root()
-        foldername = os.path.jon(project_root, "bitmaps")
-        f = urllib.urlopen("{url}{id}.svg".format(url=url, id=raw_data_id))
-        with open("%s%i.svg" % (foldername, raw_data_id), "wb") as imgFile:
-            imgFile.write(f.read())
-
-        command = ("convert -size 28x28 {folder}{id}.svg  -resize {n}x{n} "
-                   "-gravity center -extent {n}x{n} "
-                   "-monochrome {folder}{id}.png").format(id=raw_data_id,
-                                                          n=self.n,
-                                                          # url=url,
-                                                          folder=foldername)
-        os.system(command)
-        from PIL import Image
-        im = Image.open("%s%i.png" % (foldername, raw_data_id))
-        pix = im.load()
-        # pixel_image = [[0 for i in range(28)] for j in range(28)]
-        for i in range(28):
-            for j in range(28):
-                # pixel_image[i][j] = pix[i, j]
-                x.append(pix[i, j])
+        # Column-major like the pixel access pix[x, y] of PIL
+        x = hwr_obj.get_bitmap(size=self.n).T.flatten().tolist()
         assert self.get_dimension() == len(x), \
             "Dimension of %s should be %i, but was %i" % \
             (str(self), self.get_dimension(), len(x))
@@ -26,7 +26,8 @@ logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s',
                     stream=sys.stdout)
 
 
-def main(symbol_yml_file, raw_pickle_file, pickle_dest_path):
+def main(symbol_yml_file, raw_pickle_file, pickle_dest_path,
+         batch_size=None):
     """
     Parameters
     ----------
@@ -36,12 +37,21 @@ def main(symbol_yml_file, raw_pickle_file, pickle_dest_path):
         Path to a pickle file which contains raw recordings.
     pickle_dest_path : str
         Path where the filtered dict gets serialized as a pickle file again.
+    batch_size : int, optional
+        If given, the recordings are read and filtered batch by batch and
+        written as record stream (see :func:`filter_and_save`).
     """
     metadata = get_metadata()
     symbol_ids = get_symbol_ids(symbol_yml_file, metadata)
     symbol_ids = transform_sids(symbol_ids)
-    raw = load_raw(raw_pickle_file)
-    filter_and_save(raw, symbol_ids, pickle_dest_path)
+    if batch_size is None:
+        raw = load_raw(raw_pickle_file)
+    else:
+        raw, batches = utils.iter_dataset(raw_pickle_file)
+        raw['handwriting_datasets'] = (recording
+                                       for batch in batches
+                                       for recording in batch)
+    filter_and_save(raw, symbol_ids, pickle_dest_path, batch_size)
 
 
 def get_symbol_ids(symbol_yml_file, metadata):
@@ -199,7 +209,8 @@ def read_csv(filepath):
 
 def load_raw(raw_pickle_file):
     """
-    Load a pickle file of raw recordings.
+    Load a pickle file of raw recordings. It may also be a record stream
+    (see :func:`hwrt.utils.write_dataset_stream`).
 
     Parameters
     ----------
@@ -211,13 +222,12 @@ def load_raw(raw_pickle_file):
     dict
         The loaded pickle file.
     """
-    with open(raw_pickle_file, 'rb') as f:
-        raw = pickle.load(f)
+    raw = utils.load_dataset(raw_pickle_file)
     logging.info("Loaded %i recordings.", len(raw['handwriting_datasets']))
     return raw
 
 
-def filter_and_save(raw, symbol_ids, destination_path):
+def filter_and_save(raw, symbol_ids, destination_path, batch_size=None):
     """
     Parameters
     ----------
@@ -227,14 +237,24 @@ def filter_and_save(raw, symbol_ids, destination_path):
         Maps LaTeX to write-math.com id
     destination_path : str
         Path where the filtered dict 'raw' will be saved
+    batch_size : int, optional
+        If given, 'raw' is saved as record stream with batches of at most
+        `batch_size` recordings (see :func:`hwrt.utils.write_dataset_stream`).
+        Then 'handwriting_datasets' may be any iterable of recordings and
+        is only consumed once.
     """
     logging.info('Start filtering...')
-    new_hw_ds = []
-    for el in raw['handwriting_datasets']:
-        if el['formula_id'] in symbol_ids:
-            el['formula_id'] = symbol_ids[el['formula_id']]
-            el['handwriting'].formula_id = symbol_ids[el['formula_id']]
-            new_hw_ds.append(el)
+    new_hw_ds = _filter_recordings(raw['handwriting_datasets'], symbol_ids)
+    if batch_size is not None:
+        metadata = dict((key, value) for key, value in raw.items()
+                        if key != 'handwriting_datasets')
+        count = utils.write_dataset_stream(
+            destination_path,
+            metadata,
+            utils.regroup_recordings(new_hw_ds, batch_size))
+        logging.info('Dumped %i recordings.', count)
+        return
+    new_hw_ds = list(new_hw_ds)
     raw['handwriting_datasets'] = new_hw_ds
 
     # pickle
@@ -242,6 +262,16 @@ def filter_and_save(raw, symbol_ids, destination_path):
     pickle.dump(raw, open(destination_path, "wb"), 2)
 
 
+def _filter_recordings(recordings, symbol_ids):
+    """Yield the recordings whose formula_id is in ``symbol_ids`` with the
+       formula_id it gets mapped to."""
+    for el in recordings:
+        if el['formula_id'] in symbol_ids:
+            el['formula_id'] = symbol_ids[el['formula_id']]
+            el['handwriting'].formula_id = symbol_ids[el['formula_id']]
+            yield el
+
+
 def get_parser():
     """Return the parser object for this script."""
     from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
@@ -264,9 +294,15 @@ def get_parser():
                         required=True,
                         help="pickle destination file",
                         metavar="FILE")
+    parser.add_argument("-b", "--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        help="write a record stream and keep at most this "
+                             "many recordings in memory")
     return parser
 
 
 if __name__ == '__main__':
     args = get_parser().parse_args()
-    main(args.symbol_filename, args.raw_filename, args.pickle_dest_path)
+    main(args.symbol_filename, args.raw_filename, args.pickle_dest_path,
+         args.batch_size)
@@ -5,6 +5,7 @@
 import logging
 import math
 import itertools
+import numpy
 
 
 class Point(object):
@@ -439,6 +440,593 @@ def perpendicular_distance(p3, p1, p2):
     return dist
 
 
+def perpendicular_distances(points, p1, p2):
+    """
+    Calculate the distance from every point in ``points`` to the stroke
+    defined by p1 and p2 like :func:`perpendicular_distance`.
+
+    Parameters
+    ----------
+    points : numpy array
+        ``(n, 2)`` array (further columns are ignored)
+    p1 : numpy array
+        start of stroke (x, y) - either one point or one point per row of
+        ``points``
+    p2 : numpy array
+        end of stroke (x, y) - either one point or one point per row of
+        ``points``
+
+    Returns
+    -------
+    numpy array :
+        ``n`` distances
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    p1 = numpy.asarray(p1, dtype=numpy.float64)
+    p2 = numpy.asarray(p2, dtype=numpy.float64)
+    x, y = points[:, 0], points[:, 1]
+    x1, y1 = p1[..., 0], p1[..., 1]
+    px = p2[..., 0] - x1
+    py = p2[..., 1] - y1
+
+    squared_distance = px * px + py * py
+    is_dot = squared_distance == 0
+    u = ((x - x1) * px + (y - y1) * py) / \
+        numpy.where(is_dot, 1.0, squared_distance)
+    u = numpy.clip(u, 0, 1)
+
+    dx = x1 + u * px - x
+    dy = y1 + u * py - y
+    distances = numpy.sqrt(dx * dx + dy * dy)
+    if is_dot.any():
+        # The line is in fact only a single dot. In this case the distance
+        # of two points has to be calculated.
+        dots = numpy.flatnonzero(numpy.broadcast_to(is_dot, x.shape))
+        x1 = numpy.broadcast_to(x1, x.shape)
+        y1 = numpy.broadcast_to(y1, x.shape)
+        distances[dots] = [math.hypot(x1[i] - x[i], y1[i] - y[i])
+                           for i in dots.tolist()]
+    return distances
+
+
+def douglas_peucker(points, epsilon, stroke_offsets=None):
+    """
+    The Douglas-Peucker line simplification of strokes. It tries to remove
+    as many points as possible while still maintaining the overall shape of
+    a stroke. It does so by taking the first and the last point, connecting
+    them by a straight line and searching for the point with the highest
+    distance. If that distance is at least ``epsilon``, the point is
+    important and the points before and from this point on get simplified
+    the same way.
+
+    Instead of recursive calls, all parts of all strokes which still have to
+    be simplified are handled together, so long strokes work, too.
+
+    Parameters
+    ----------
+    points : numpy array
+        ``(n, 2)`` array of points (further columns are ignored)
+    epsilon : float
+    stroke_offsets : numpy array, optional
+        Stroke ``i`` consists of the points
+        ``stroke_offsets[i]:stroke_offsets[i+1]``. By default, all points
+        are one stroke.
+
+    Returns
+    -------
+    tuple :
+        The indices of the points which are kept and the stroke offsets of
+        those indices. The last point of a stroke is always kept. It is
+        contained twice if the last part of the stroke consists of a single
+        point.
+
+    Examples
+    --------
+    >>> indices, _ = douglas_peucker(numpy.array([[0, 0], [1, 0.1], [2, 0],
+    ...                                           [3, 5]]), 0.2)
+    >>> indices.tolist()
+    [0, 2, 3]
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    if stroke_offsets is None:
+        stroke_offsets = [0, len(points)]
+    stroke_offsets = numpy.asarray(stroke_offsets, dtype=numpy.intp)
+    nonempty = numpy.diff(stroke_offsets) > 0
+    # Every part which is not split any further keeps its first point
+    keep = numpy.zeros(len(points), dtype=bool)
+    firsts = stroke_offsets[:-1][nonempty]
+    lasts = stroke_offsets[1:][nonempty] - 1
+    while len(firsts) > 0:
+        # The candidates of a part are first+1, ..., last
+        counts = lasts - firsts
+        keep[firsts[counts == 0]] = True
+        has_candidates = counts > 0
+        firsts = firsts[has_candidates]
+        lasts = lasts[has_candidates]
+        counts = counts[has_candidates]
+        if len(firsts) == 0:
+            break
+        offsets = numpy.zeros(len(counts) + 1, dtype=numpy.intp)
+        numpy.cumsum(counts, out=offsets[1:])
+        part = numpy.repeat(numpy.arange(len(counts)), counts)
+        positions = numpy.arange(offsets[-1])
+        candidates = positions - offsets[part] + firsts[part] + 1
+        distances = perpendicular_distances(points[candidates],
+                                            points[firsts[part]],
+                                            points[lasts[part]])
+        # Find the (first) point with the biggest distance of every part
+        dmax = numpy.maximum.reduceat(distances, offsets[:-1])
+        is_max = distances == dmax[part]
+        index = numpy.minimum.reduceat(numpy.where(is_max, positions,
+                                                   offsets[-1]),
+                                       offsets[:-1])
+        split = (dmax > 0) & (dmax >= epsilon)
+        keep[firsts[~split]] = True
+        index = candidates[index[split]]
+        firsts, lasts = (numpy.concatenate([firsts[split], index]),
+                         numpy.concatenate([index - 1, lasts[split]]))
+    kept_counts = numpy.add.reduceat(keep, stroke_offsets[:-1][nonempty],
+                                     dtype=numpy.intp) + 1
+    indices = numpy.sort(numpy.concatenate([
+        numpy.flatnonzero(keep), stroke_offsets[1:][nonempty] - 1]),
+        kind='stable')
+    new_offsets = numpy.zeros(len(stroke_offsets), dtype=numpy.intp)
+    new_offsets[1:][nonempty] = kept_counts
+    numpy.cumsum(new_offsets, out=new_offsets)
+    return indices, new_offsets
+
+
+def get_polyline_segments(points):
+    """
+    Get the line segments between consecutive points of a polyline.
+
+    Parameters
+    ----------
+    points : numpy array
+        ``(n, 2)`` array of points (further columns are ignored)
+
+    Returns
+    -------
+    numpy array :
+        ``(n - 1, 2, 2)`` array; ``segments[i]`` goes from ``points[i]`` to
+        ``points[i + 1]``.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)[:, :2]
+    return numpy.stack([points[:-1], points[1:]], axis=1)
+
+
+def get_segment_bounding_boxes(segments):
+    """Get a ``(..., 4)`` array with ``minx``, ``miny``, ``maxx`` and
+       ``maxy`` of every line segment of a ``(..., 2, 2)`` array."""
+    segments = numpy.asarray(segments, dtype=numpy.float64)
+    return numpy.concatenate([segments.min(axis=-2), segments.max(axis=-2)],
+                             axis=-1)
+
+
+def _get_orientations(p1, p2, q):
+    """Get the sign of the cross product of p2 - p1 and q - p1."""
+    return numpy.sign((p2[..., 0] - p1[..., 0]) * (q[..., 1] - p1[..., 1]) -
+                      (p2[..., 1] - p1[..., 1]) * (q[..., 0] - p1[..., 0]))
+
+
+def _is_equal(p, q):
+    """Check which points of the ``(..., 2)`` arrays are the same."""
+    return (p[..., 0] == q[..., 0]) & (p[..., 1] == q[..., 1])
+
+
+def segments_intersect(segments1, segments2):
+    """
+    Check which line segments intersect. Touching segments intersect, too.
+    Like for :func:`get_segments_intersections`, a segment which is a single
+    point only intersects segments which start or end at this point.
+
+    Parameters
+    ----------
+    segments1, segments2 : numpy array
+        ``(..., 2, 2)`` arrays of line segments which get broadcast against
+        each other
+
+    Returns
+    -------
+    numpy array :
+        bools
+
+    Examples
+    --------
+    >>> segments_intersect([[[0, 0], [2, 2]], [[0, 0], [1, 0]]],
+    ...                    [[[0, 2], [2, 0]], [[2, 0], [3, 0]]]).tolist()
+    [True, False]
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64)
+    segments2 = numpy.asarray(segments2, dtype=numpy.float64)
+    p1, p2 = segments1[..., 0, :], segments1[..., 1, :]
+    q1, q2 = segments2[..., 0, :], segments2[..., 1, :]
+    box1 = get_segment_bounding_boxes(segments1)
+    box2 = get_segment_bounding_boxes(segments2)
+    intersect = (box1[..., 0] <= box2[..., 2]) & \
+        (box2[..., 0] <= box1[..., 2]) & \
+        (box1[..., 1] <= box2[..., 3]) & \
+        (box2[..., 1] <= box1[..., 3])
+    # Each segment has the end points of the other one on both sides (or on
+    # its line)
+    intersect &= _get_orientations(p1, p2, q1) * \
+        _get_orientations(p1, p2, q2) <= 0
+    intersect &= _get_orientations(q1, q2, p1) * \
+        _get_orientations(q1, q2, p2) <= 0
+    is_point1 = _is_equal(p1, p2)
+    is_point2 = _is_equal(q1, q2)
+    return numpy.where(is_point1, _is_equal(p1, q1) | _is_equal(p1, q2),
+                       numpy.where(is_point2,
+                                   _is_equal(q1, p1) | _is_equal(q1, p2),
+                                   intersect))
+
+
+def get_segments_intersection_points(segments1, segments2):
+    """
+    Get one intersection point of every pair of intersecting line segments.
+    If an end point of a segment is on the other segment, this end point is
+    taken. Hence segments which meet at the same point get exactly the same
+    intersection point. Overlapping segments get the smallest (by ``x``,
+    then ``y``) end point which is on both segments.
+
+    Parameters
+    ----------
+    segments1, segments2 : numpy array
+        ``(n, 2, 2)`` arrays of line segments where ``segments1[i]``
+        intersects ``segments2[i]`` (see :func:`segments_intersect`)
+
+    Returns
+    -------
+    numpy array :
+        ``(n, 2)`` array of intersection points
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64)
+    segments2 = numpy.asarray(segments2, dtype=numpy.float64)
+    p1, p2 = segments1[:, 0], segments1[:, 1]
+    q1, q2 = segments2[:, 0], segments2[:, 1]
+    r, s = p2 - p1, q2 - q1
+    denominator = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+    is_parallel = denominator == 0
+    t = ((q1[:, 0] - p1[:, 0]) * s[:, 1] - (q1[:, 1] - p1[:, 1]) * s[:, 0]) / \
+        numpy.where(is_parallel, 1, denominator)
+    points = p1 + t[:, None] * r
+    # End points which are on the line of the other segment, the first one
+    # is preferred
+    candidates = [(q1, _get_orientations(p1, p2, q1) == 0),
+                  (q2, _get_orientations(p1, p2, q2) == 0),
+                  (p1, _get_orientations(q1, q2, p1) == 0),
+                  (p2, _get_orientations(q1, q2, p2) == 0)]
+    for candidate, on_line in reversed(candidates):
+        points[on_line] = candidate[on_line]
+    if numpy.any(is_parallel):
+        # Overlapping segments and single points
+        box1 = get_segment_bounding_boxes(segments1[is_parallel])
+        box2 = get_segment_bounding_boxes(segments2[is_parallel])
+        best = numpy.full((len(box1), 2), numpy.inf)
+        for candidate, _ in candidates:
+            candidate = candidate[is_parallel]
+            is_better = numpy.all((candidate >= box1[:, :2]) &
+                                  (candidate <= box1[:, 2:]) &
+                                  (candidate >= box2[:, :2]) &
+                                  (candidate <= box2[:, 2:]), axis=1) & \
+                ((candidate[:, 0] < best[:, 0]) |
+                 ((candidate[:, 0] == best[:, 0]) &
+                  (candidate[:, 1] < best[:, 1])))
+            best[is_better] = candidate[is_better]
+        points[is_parallel] = best
+    return points
+
+
+def get_intersecting_pairs(segments1, segments2=None, max_pairs=2**20):
+    """
+    Find all pairs of intersecting line segments (see
+    :func:`segments_intersect`).
+
+    The bounding boxes of the segments are sorted by their left side. Only
+    segments which start before another one ends get tested, so the costs
+    are about ``O(n log n)`` plus the number of segments with overlapping
+    bounding boxes. Those are tested in chunks of at most ``max_pairs``
+    pairs.
+
+    Parameters
+    ----------
+    segments1 : numpy array
+        ``(n, 2, 2)`` array of line segments
+    segments2 : numpy array, optional
+        ``(m, 2, 2)`` array of line segments. If it is not given, the
+        segments of ``segments1`` are tested against each other.
+    max_pairs : int
+
+    Returns
+    -------
+    tuple :
+        Two index arrays ``i`` and ``j``. ``segments1[i[k]]`` intersects
+        ``segments2[j[k]]`` (or ``segments1[j[k]]`` with ``i[k] < j[k]``).
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64).reshape(-1, 2, 2)
+    if segments2 is None:
+        segments = segments1
+        is_second = numpy.zeros(len(segments), dtype=bool)
+    else:
+        segments2 = numpy.asarray(segments2,
+                                  dtype=numpy.float64).reshape(-1, 2, 2)
+        segments = numpy.concatenate([segments1, segments2])
+        is_second = numpy.arange(len(segments)) >= len(segments1)
+    boxes = get_segment_bounding_boxes(segments)
+    order = numpy.argsort(boxes[:, 0], kind='stable')
+    boxes = boxes[order]
+    # The segments from u + 1 to ends[u] - 1 start before segment u ends
+    ends = numpy.searchsorted(boxes[:, 0], boxes[:, 2], side='right')
+    counts = numpy.maximum(ends - numpy.arange(len(boxes)) - 1, 0)
+    cumulated_counts = numpy.cumsum(counts)
+    found = []
+    start = 0
+    while start < len(boxes):
+        end = max(start + 1, numpy.searchsorted(cumulated_counts,
+                                                cumulated_counts[start] -
+                                                counts[start] + max_pairs,
+                                                side='right'))
+        chunk_counts = counts[start:end]
+        u = numpy.repeat(numpy.arange(start, end), chunk_counts)
+        v = numpy.arange(len(u)) - \
+            numpy.repeat(numpy.cumsum(chunk_counts) - chunk_counts,
+                         chunk_counts) + u + 1
+        u, v = order[u], order[v]
+        if segments2 is None:
+            u, v = numpy.minimum(u, v), numpy.maximum(u, v)
+        else:
+            is_pair = is_second[u] != is_second[v]
+            u, v = u[is_pair], v[is_pair]
+            u, v = numpy.where(is_second[u], v, u), numpy.where(is_second[u],
+                                                                u, v)
+        intersect = segments_intersect(segments[u], segments[v])
+        found.append((u[intersect], v[intersect]))
+        start = end
+    if len(found) == 0:
+        return (numpy.zeros(0, dtype=numpy.intp),
+                numpy.zeros(0, dtype=numpy.intp))
+    i = numpy.concatenate([u for u, _ in found])
+    j = numpy.concatenate([v for _, v in found])
+    if segments2 is not None:
+        j -= len(segments1)
+    return i, j
+
+
+def count_selfintersections(segments):
+    """
+    Count the pairs of line segments of a polyline which intersect.
+    Neighbouring segments are not counted. Segments which have only
+    segments of length 0 (that is repeated points) between them are
+    neighbours, too.
+
+    This is much faster than :meth:`PolygonalChain.count_selfintersections`,
+    but the counts differ: the intersection test uses exact orientations
+    instead of slopes, and pairs of segments which are separated only by
+    repeated points are not counted. For example a stroke which got
+    resampled with repeated points usually has no self-intersections here.
+
+    Parameters
+    ----------
+    segments : numpy array
+        ``(n, 2, 2)`` array of the line segments of a polyline in order
+        (see :func:`get_polyline_segments`)
+
+    Returns
+    -------
+    int
+    """
+    segments = numpy.asarray(segments, dtype=numpy.float64).reshape(-1, 2, 2)
+    i, j = get_intersecting_pairs(segments)
+    # The number of segments with a length up to (including) every segment
+    has_length = numpy.any(segments[:, 0] != segments[:, 1], axis=1)
+    cumulated = numpy.cumsum(has_length)
+    return int(numpy.count_nonzero((j - i > 1) &
+                                   (cumulated[j - 1] - cumulated[i] > 0)))
+
+
+def count_intersections(segments1, segments2):
+    """
+    Count the different points in which the line segments of two polylines
+    intersect. In contrast to :meth:`PolygonalChain.count_intersections`,
+    the intersection test uses exact orientations instead of slopes and
+    only exactly equal intersection points are the same.
+
+    Parameters
+    ----------
+    segments1, segments2 : numpy array
+        ``(n, 2, 2)`` and ``(m, 2, 2)`` arrays of line segments
+
+    Returns
+    -------
+    int
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64).reshape(-1, 2, 2)
+    segments2 = numpy.asarray(segments2, dtype=numpy.float64).reshape(-1, 2, 2)
+    i, j = get_intersecting_pairs(segments1, segments2)
+    points = get_segments_intersection_points(segments1[i], segments2[j])
+    # Adding 0.0 makes -0.0 and 0.0 the same
+    return len(set(map(tuple, (points + 0.0).tolist())))
+
+
+def point_segment_distances(points, segments):
+    """
+    Calculate the distances of points to line segments like
+    :func:`point_segment_distance`. The arrays are broadcast against each
+    other.
+
+    Parameters
+    ----------
+    points : numpy array
+        ``(..., 2)`` array of points
+    segments : numpy array
+        ``(..., 2, 2)`` array of line segments
+
+    Returns
+    -------
+    numpy array :
+        The broadcast shape of ``points[..., 0]`` and ``segments[..., 0, 0]``
+
+    Examples
+    --------
+    >>> point_segment_distances([[0, 0], [3, 1]], [[1, 0], [2, 0]]).tolist()
+    [1.0, 1.4142135623730951]
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    segments = numpy.asarray(segments, dtype=numpy.float64)
+    x, y = points[..., 0], points[..., 1]
+    x1, y1 = segments[..., 0, 0], segments[..., 0, 1]
+    x2, y2 = segments[..., 1, 0], segments[..., 1, 1]
+    dx, dy = x2 - x1, y2 - y1
+    squared_length = dx * dx + dy * dy
+    # Find the t that minimizes the distance to (x1 + t * dx, y1 + t * dy)
+    t = ((x - x1) * dx + (y - y1) * dy) / \
+        numpy.where(squared_length == 0, 1.0, squared_length)
+    t = numpy.clip(t, 0, 1)
+    near_x = numpy.where(t == 1, x2, x1 + t * dx)
+    near_y = numpy.where(t == 1, y2, y1 + t * dy)
+    return numpy.hypot(x - near_x, y - near_y)
+
+
+def segments_distances(segments1, segments2):
+    """
+    Calculate the distances between line segments like
+    :func:`segments_distance`. The arrays are broadcast against each other.
+
+    Parameters
+    ----------
+    segments1, segments2 : numpy array
+        ``(..., 2, 2)`` arrays of line segments
+
+    Returns
+    -------
+    numpy array :
+        The broadcast shape of ``segments1[..., 0, 0]`` and
+        ``segments2[..., 0, 0]``
+
+    Examples
+    --------
+    >>> segments_distances([[1, 0], [2, 0]], [[[0, 1], [0, 2]],
+    ...                                       [[0, 0], [3, 0]]]).tolist()
+    [1.4142135623730951, 0.0]
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64)
+    segments2 = numpy.asarray(segments2, dtype=numpy.float64)
+    # Segments which don't intersect are closest at one of the 4 end points
+    distances = numpy.minimum(
+        point_segment_distances(segments1[..., 0, :], segments2),
+        point_segment_distances(segments1[..., 1, :], segments2))
+    distances = numpy.minimum(
+        distances, point_segment_distances(segments2[..., 0, :], segments1))
+    distances = numpy.minimum(
+        distances, point_segment_distances(segments2[..., 1, :], segments1))
+    return numpy.where(segments_intersect(segments1, segments2), 0.0,
+                       distances)
+
+
+def _get_chunked_minimum(distance, a, b, max_pairs, axis=1):
+    """Get the minimum of ``distance(a[:, numpy.newaxis], b)`` along
+       ``axis`` while computing at most about ``max_pairs`` distances at
+       once."""
+    minimum = numpy.full(len(a) if axis == 1 else len(b), numpy.inf)
+    if len(a) == 0 or len(b) == 0:
+        return minimum
+    step = max(1, max_pairs // len(b))
+    for start in range(0, len(a), step):
+        chunk = distance(a[start:start + step, numpy.newaxis], b)
+        if axis == 1:
+            minimum[start:start + step] = chunk.min(axis=1)
+        else:
+            numpy.minimum(minimum, chunk.min(axis=0), out=minimum)
+    return minimum
+
+
+def get_point_polyline_distances(points, segments, max_pairs=2**20):
+    """
+    Calculate the distance of every point to the nearest of the line
+    segments (e.g. to a polyline, see :func:`get_polyline_segments`).
+
+    Parameters
+    ----------
+    points : numpy array
+        ``(n, 2)`` array of points (further columns are ignored)
+    segments : numpy array
+        ``(m, 2, 2)`` array of line segments
+    max_pairs : int
+        At most about this many distances are computed at once.
+
+    Returns
+    -------
+    numpy array :
+        ``n`` distances. They are ``inf`` if there are no segments.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)[:, :2]
+    segments = numpy.asarray(segments, dtype=numpy.float64).reshape(-1, 2, 2)
+    return _get_chunked_minimum(point_segment_distances, points, segments,
+                                max_pairs)
+
+
+def get_min_segments_distances(segments1, segments2, max_pairs=2**20):
+    """
+    Calculate the distance of every line segment of ``segments1`` to the
+    nearest line segment of ``segments2``.
+
+    Parameters
+    ----------
+    segments1, segments2 : numpy array
+        ``(n, 2, 2)`` and ``(m, 2, 2)`` arrays of line segments
+    max_pairs : int
+        At most about this many distances are computed at once.
+
+    Returns
+    -------
+    numpy array :
+        ``n`` distances. They are ``inf`` if ``segments2`` is empty.
+    """
+    segments1 = numpy.asarray(segments1, dtype=numpy.float64).reshape(-1, 2, 2)
+    segments2 = numpy.asarray(segments2, dtype=numpy.float64).reshape(-1, 2, 2)
+    return _get_chunked_minimum(segments_distances, segments1, segments2,
+                                max_pairs)
+
+
+def get_polylines_distances(segments, segment_offsets, max_pairs=2**20):
+    """
+    Calculate the distances between all pairs of polylines. The distance of
+    two polylines is the distance of their closest line segments.
+
+    Parameters
+    ----------
+    segments : numpy array
+        ``(n, 2, 2)`` array of the line segments of all polylines
+    segment_offsets : numpy array
+        Polyline ``i`` consists of the line segments
+        ``segment_offsets[i]:segment_offsets[i+1]``.
+    max_pairs : int
+        At most about this many distances are computed at once.
+
+    Returns
+    -------
+    numpy array :
+        Symmetric ``(k, k)`` array for ``k`` polylines. Distances to empty
+        polylines are ``inf``, the other elements of the diagonal are 0.
+    """
+    segments = numpy.asarray(segments, dtype=numpy.float64).reshape(-1, 2, 2)
+    segment_offsets = numpy.asarray(segment_offsets, dtype=numpy.intp)
+    nonempty = numpy.flatnonzero(numpy.diff(segment_offsets) > 0)
+    distances = numpy.full((len(segment_offsets) - 1,) * 2, numpy.inf)
+    distances[nonempty, nonempty] = 0
+    # Compare every polyline with all line segments of later polylines
+    for index, a in enumerate(nonempty[:-1]):
+        later = nonempty[index + 1:]
+        minimum = _get_chunked_minimum(
+            segments_distances,
+            segments[segment_offsets[a]:segment_offsets[a + 1]],
+            segments[segment_offsets[later[0]]:segment_offsets[-1]],
+            max_pairs, axis=0)
+        distances[a, later] = numpy.minimum.reduceat(
+            minimum, segment_offsets[later] - segment_offsets[later[0]])
+    return numpy.minimum(distances, distances.T)
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -5,19 +5,130 @@
    that the pen trajectory is given (and not online as in 'Internet').
 """
 
+import hashlib
 import logging
-import json
+import itertools
 import Image
-import ImageDraw
 import numpy
+try:  # Python 3
+    from sys import intern
+except ImportError:  # Python 2
+    pass
+
+# hwrt modules
+from . import codec
+from . import raster
+
+# The flags which tell if x, y and time are integral are shared between all
+# recordings to save memory.
+_INTEGRAL = dict((flags, flags)
+                 for flags in itertools.product([False, True], repeat=3))
 
 
 class HandwrittenData(object):
-    """Represents a handwritten symbol."""
+    """Represents a handwritten symbol.
+
+    The strokes are stored as one ``(n, 3)`` float array of ``x``, ``y`` and
+    ``time`` values together with the offsets where each stroke starts. The
+    JSON representation ``raw_data_json`` is only created when it is actually
+    requested.
+
+    Points with keys other than ``x``, ``y``, ``time`` and ``pen_down`` or
+    with values the arrays cannot represent exactly (e.g. ``1`` in a column
+    which also has ``1.5``) are kept as they are in addition to the arrays,
+    so that :meth:`get_pointlist` returns them unchanged. As soon as the
+    strokes get changed, e.g. by preprocessing, only the array values are
+    kept.
+    """
+    __slots__ = ('raw_data_id', 'formula_id', 'formula_in_latex',
+                 'wild_point_count', 'missing_stroke', 'user_id', 'user_name',
+                 'segmentation', '_points', '_stroke_offsets', '_pen_down',
+                 '_integral', '_extra', '_time_offset', '_raw_data_json',
+                 '_cache', '_store', '_index',
+                 # Allows additional attributes like symbol_stream
+                 '__dict__', '__weakref__')
+
     def __init__(self, raw_data_json, formula_id=None, raw_data_id=None,
                  formula_in_latex=None, wild_point_count=0,
                  missing_stroke=0, user_id=0, user_name='', segmentation=None):
         self.raw_data_json = raw_data_json
+        self._set_metadata(formula_id, raw_data_id, formula_in_latex,
+                           wild_point_count, missing_stroke, user_id,
+                           user_name, segmentation)
+
+    @classmethod
+    def from_pointlist(cls, pointlist, **kwargs):
+        """
+        Create a recording from a list of strokes without the detour over a
+        JSON string. The keyword arguments are the same as for the
+        constructor.
+
+        Parameters
+        ----------
+        pointlist : list
+            A list of strokes. Each stroke is a list of dictionaries
+            {'x': 123, 'y': 42, 'time': 1337}
+
+        Returns
+        -------
+        HandwrittenData
+        """
+        assert type(pointlist) is list, \
+            "pointlist is not a list: %r" % pointlist
+        recording = cls.__new__(cls)
+        recording._set_arrays(*codec.strokes_to_arrays(pointlist))
+        recording._set_metadata(**kwargs)
+        return recording
+
+    @classmethod
+    def from_point_array(cls, points, stroke_offsets, pen_down=None,
+                         integral=(False, False, False), trusted=False,
+                         **kwargs):
+        """
+        Create a recording from point arrays (see :meth:`get_point_array`).
+        The other keyword arguments are the same as for the constructor.
+
+        Parameters
+        ----------
+        points : numpy array
+            An ``(n, 3)`` array with the columns ``x``, ``y`` and ``time``.
+        stroke_offsets : numpy array
+            ``k + 1`` increasing indices into ``points`` for ``k`` strokes.
+        pen_down : numpy array or None
+            ``n`` values which are 1, 0 or -1 (no information).
+        integral : tuple of three bools
+            If the ``x``, ``y`` and ``time`` values should be returned as
+            integers by :meth:`get_pointlist`.
+        trusted : bool
+            If this is set, the arrays are neither copied nor checked and
+            missing times are not fixed. This is meant for arrays of another
+            recording, e.g. when it gets split. The arrays must not be
+            changed afterwards.
+
+        Returns
+        -------
+        HandwrittenData
+        """
+        recording = cls.__new__(cls)
+        integral = _INTEGRAL[tuple(bool(flag) for flag in integral)]
+        if pen_down is not None and \
+           not numpy.any(numpy.asarray(pen_down) >= 0):
+            pen_down = None
+        if trusted:
+            recording._set_arrays(points, stroke_offsets, pen_down, integral)
+            recording._set_metadata(trusted=True, **kwargs)
+        else:
+            recording._integral = integral
+            recording.set_point_array(points, stroke_offsets, pen_down)
+            recording._set_metadata(**kwargs)
+        return recording
+
+    def _set_metadata(self, formula_id=None, raw_data_id=None,
+                      formula_in_latex=None, wild_point_count=0,
+                      missing_stroke=0, user_id=0, user_name='',
+                      segmentation=None, trusted=False):
+        """Set everything except the strokes. Unless ``trusted`` is set, the
+           recording is checked and missing times are fixed."""
         self.formula_id = formula_id
         self.raw_data_id = raw_data_id
         self.formula_in_latex = formula_in_latex
@@ -26,35 +137,62 @@ class HandwrittenData(object):
         self.user_id = user_id
         self.user_name = user_name
         self.segmentation = segmentation
-        assert type(json.loads(self.raw_data_json)) is list, \
-            "raw_data_json is not JSON: %r" % self.raw_data_json
-        assert len(self.get_pointlist()) >= 1, \
-            "The pointlist of formula_id %i is %s" % (self.formula_id,
-                                                      self.get_pointlist())
         if segmentation is None:
             # If no segmentation is given, assume all strokes belong to the
             # same symbol.
-            self.segmentation = [[i for i in
-                                  range(len(json.loads(self.raw_data_json)))]]
+            stroke_count = len(self.get_stroke_offsets()) - 1
+            self.segmentation = [list(range(stroke_count))]
+        if trusted:
+            return
+        assert len(self.get_stroke_offsets()) > 1, \
+            "The pointlist of formula_id %s has no strokes" % self.formula_id
         assert wild_point_count >= 0
         assert missing_stroke >= 0
         self.fix_times()
 
+    @property
+    def raw_data_json(self):
+        """The recording as a JSON string. It is generated on demand."""
+        if self._raw_data_json is None:
+            self._raw_data_json = codec.dumps(self.get_pointlist())
+        return self._raw_data_json
+
+    @raw_data_json.setter
+    def raw_data_json(self, raw_data_json):
+        try:
+            arrays = codec.loads_strokes(raw_data_json)
+        except Exception as inst:
+            logging.debug("pointStrokeList: strokelistP")
+            logging.debug(raw_data_json)
+            logging.debug("didn't work")
+            raise inst
+        self._set_arrays(*arrays)
+
     def fix_times(self):
         """
         Some recordings have wrong times. Fix them so that nothing after
         loading a handwritten recording breaks.
         """
-        pointlist = self.get_pointlist()
-        times = [point['time'] for stroke in pointlist for point in stroke]
-        times_min = max(min(times), 0)  # Make sure this is not None
-        for i, stroke in enumerate(pointlist):
-            for j, point in enumerate(stroke):
-                if point['time'] is None:
-                    pointlist[i][j]['time'] = times_min
-                else:
-                    times_min = point['time']
-        self.raw_data_json = json.dumps(pointlist)
+        times = self.get_point_array()[:, 2]
+        missing = numpy.isnan(times)
+        if not missing.any():
+            return
+        # Forward fill: take the time of the last point with a known time.
+        # Missing times before the first known time become 0.
+        known_index = numpy.where(missing, -1, numpy.arange(len(times)))
+        numpy.maximum.accumulate(known_index, out=known_index)
+        points = self.get_point_array().copy()
+        points[:, 2] = numpy.where(known_index >= 0, times[known_index], 0)
+        extra = self._extra
+        if extra is not None:
+            extra = [point if point is None else dict(point)
+                     for point in extra]
+            for i in numpy.flatnonzero(missing):
+                if extra[i] is not None:
+                    extra[i]['time'] = _to_python(points[i],
+                                                  self._integral)[2]
+        self._set_arrays(points, self.get_stroke_offsets(), self._pen_down,
+                         self._integral, extra)
 
     def get_pointlist(self):
         """
@@ -67,18 +205,14 @@ class HandwrittenData(object):
             A list of strokes. Each stroke is a list of dictionaries
             {'x': 123, 'y': 42, 'time': 1337}
         """
-        try:
-            pointlist = json.loads(self.raw_data_json)
-        except Exception as inst:
-            logging.debug("pointStrokeList: strokelistP")
-            logging.debug(self.raw_data_json)
-            logging.debug("didn't work")
-            raise inst
-
-        if len(pointlist) == 0:
-            logging.warning("Pointlist was empty. Search for '" +
-                            self.raw_data_json + "' in `wm_raw_draw_data`.")
-        return pointlist
+        if len(self.get_stroke_offsets()) == 1:
+            # The JSON string of an empty pointlist is always '[]'
+            logging.warning("Pointlist was empty. Search for '[]' in "
+                            "`wm_raw_draw_data`.")
+        return _arrays_to_pointlist(self.get_point_array(),
+                                    self.get_stroke_offsets(),
+                                    self._pen_down, self._integral,
+                                    self._extra)
 
     def get_sorted_pointlist(self):
         """
@@ -90,11 +224,20 @@ class HandwrittenData(object):
             A list of all strokes in the recording. Each stroke is represented
             as a list of dicts {'time': 123, 'x': 45, 'y': 67}
         """
-        pointlist = self.get_pointlist()
-        for i in range(len(pointlist)):
-            pointlist[i] = sorted(pointlist[i], key=lambda p: p['time'])
-        pointlist = sorted(pointlist, key=lambda stroke: stroke[0]['time'])
-        return pointlist
+        if self._is_time_sorted():
+            return self.get_pointlist()
+        points, offsets, pen_down = _sort_arrays(self.get_point_array(),
+                                                 self.get_stroke_offsets(),
+                                                 self._pen_down)
+        extra = self._extra
+        if extra is not None:
+            # Sort the point indices like the points
+            order = _sort_arrays(self.get_point_array(),
+                                 self.get_stroke_offsets(),
+                                 numpy.arange(len(points)))[2]
+            extra = [extra[i] for i in order.tolist()]
+        return _arrays_to_pointlist(points, offsets, pen_down,
+                                    self._integral, extra)
 
     def set_pointlist(self, pointlist):
         """Overwrite pointlist.
@@ -110,44 +253,200 @@ class HandwrittenData(object):
         assert len(pointlist) >= 1, \
             "The pointlist of formula_id %i is %s" % (self.formula_id,
                                                       self.get_pointlist())
-        self.raw_data_json = json.dumps(pointlist)
+        self._set_arrays(*codec.strokes_to_arrays(pointlist))
 
-    def get_bounding_box(self):
-        """ Get the bounding box of a pointlist. """
-        pointlist = self.get_pointlist()
+    def get_point_array(self):
+        """Get all points of the recording as a read-only ``(n, 3)`` array.
+
+        Returns
+        -------
+        numpy array :
+            The columns are ``x``, ``y`` and ``time``. The rows of stroke
+            ``i`` are ``offsets[i]:offsets[i + 1]`` where ``offsets`` is
+            given by :meth:`get_stroke_offsets`.
+        """
+        if self._store is not None:
+            return self._store.get_point_array(self._index)
+        if self._time_offset is None:
+            return self._points
+        # Expand the compact representation, see :meth:`compact`
+        points = self._points.astype(numpy.float64)
+        points[:, 2] += self._time_offset
+        points.flags.writeable = False
+        return points
+
+    def get_stroke_offsets(self):
+        """Get the read-only array of stroke offsets into the point array.
+           It has one element more than the recording has strokes."""
+        if self._store is not None:
+            return self._store.get_stroke_offsets(self._index)
+        return self._stroke_offsets
+
+    def get_pen_down(self):
+        """Get the read-only ``pen_down`` array (-1 if a point has no
+           ``pen_down`` information) or ``None`` if no point has one."""
+        return self._pen_down
+
+    def set_point_array(self, points, stroke_offsets, pen_down=None):
+        """Overwrite the recording with point arrays.
+
+        Parameters
+        ----------
+        points : numpy array
+            An ``(n, 3)`` array with the columns ``x``, ``y`` and ``time``.
+        stroke_offsets : numpy array
+            ``k + 1`` increasing indices into ``points`` for ``k`` strokes.
+        pen_down : numpy array or None
+            ``n`` values which are 1, 0 or -1 (no information).
+        """
+        points = numpy.array(points, dtype=numpy.float64).reshape(-1, 3)
+        stroke_offsets = numpy.array(stroke_offsets, dtype=numpy.intp)
+        assert len(stroke_offsets) >= 2, \
+            "The pointlist of formula_id %s has no strokes" % self.formula_id
+        assert stroke_offsets[0] == 0 and \
+            stroke_offsets[-1] == len(points), \
+            "stroke_offsets %s do not fit %i points" % (stroke_offsets,
+                                                        len(points))
+        if pen_down is not None:
+            pen_down = numpy.array(pen_down, dtype=numpy.int8)
+        # A column stays integral as long as its values are integral
+        integral = _INTEGRAL[tuple(
+            getattr(self, '_integral', (False, False, False))[i] and
+            bool(numpy.all(points[:, i] == numpy.floor(points[:, i])))
+            for i in range(3))]
+        self._set_arrays(points, stroke_offsets, pen_down, integral)
+
+    def get_stroke_arrays(self):
+        """Get a writable copy of the strokes as :class:`StrokeArrays`."""
+        points = numpy.array(self.get_point_array())
+        pen_down = self._pen_down
+        if pen_down is not None:
+            pen_down = pen_down.copy()
+        stroke_offsets = numpy.array(self.get_stroke_offsets(),
+                                     dtype=numpy.intp)
+        return StrokeArrays(points, stroke_offsets, pen_down, self._integral,
+                            self.raw_data_id)
+
+    def set_stroke_arrays(self, stroke_arrays):
+        """Overwrite the recording with :class:`StrokeArrays`. The arrays are
+           taken over without a copy and become read-only."""
+        points = stroke_arrays.points
+        pen_down = stroke_arrays.pen_down
+        integral = stroke_arrays.integral
+        if len(points) == 0:
+            integral = (False, False, False)
+        if pen_down is not None and not numpy.any(pen_down >= 0):
+            pen_down = None
+        self._set_arrays(points, stroke_arrays.stroke_offsets, pen_down,
+                         integral)
+
+    def _set_arrays(self, points, stroke_offsets, pen_down, integral,
+                    extra=None):
+        """Store the arrays which represent the strokes and the points
+           which they cannot represent (see :func:`codec.strokes_to_arrays`).
+        """
+        for array in (points, stroke_offsets, pen_down):
+            if array is not None:
+                array.flags.writeable = False
+        self._points = points
+        self._stroke_offsets = stroke_offsets
+        self._pen_down = pen_down
+        self._integral = _INTEGRAL[tuple(integral)]
+        self._extra = extra
+        self._time_offset = None
+        self._raw_data_json = None
+        self._cache = None
+        self._store = None
+        self._index = None
+
+    def compact(self):
+        """Reduce the memory this recording needs. This is meant for keeping
+           large raw datasets in memory; recordings get compacted when they
+           are unpickled.
 
-        # Initialize bounding box parameters to save values
-        minx, maxx = pointlist[0][0]["x"], pointlist[0][0]["x"]
-        miny, maxy = pointlist[0][0]["y"], pointlist[0][0]["y"]
-        mint, maxt = pointlist[0][0]["time"], pointlist[0][0]["time"]
+           The points are stored as float32 values with times relative to the
+           first time and the stroke offsets as int32 values. This is only
+           done if no value changes, so for example typical raw recordings
+           with pixel coordinates and times in milliseconds get compacted
+           while scaled recordings are kept as they are. Repeated metadata
+           like ``formula_in_latex`` and ``user_name`` is interned.
+        """
+        for name in ['formula_in_latex', 'user_name']:
+            value = getattr(self, name, None)
+            if isinstance(value, str):
+                setattr(self, name, intern(value))
+        points = self._points
+        if self._store is not None or self._time_offset is not None or \
+           len(points) == 0:
+            return
+        time_offset = float(points[:, 2].min())
+        compact_points = numpy.column_stack([points[:, 0], points[:, 1],
+                                             points[:, 2] - time_offset])
+        compact_points = compact_points.astype(numpy.float32)
+        restored = compact_points.astype(numpy.float64)
+        restored[:, 2] += time_offset
+        if not numpy.array_equal(restored, points):
+            return
+        compact_points.flags.writeable = False
+        stroke_offsets = self._stroke_offsets.astype(numpy.int32)
+        stroke_offsets.flags.writeable = False
+        self._points = compact_points
+        self._stroke_offsets = stroke_offsets
+        self._time_offset = time_offset
+        self._raw_data_json = None
+
+    def _get_cached(self, key, calculate):
+        """Get the derived property ``key`` of the strokes. It is calculated
+           by ``calculate`` only once until the strokes get changed."""
+        if self._cache is None:
+            self._cache = {}
+        if key not in self._cache:
+            self._cache[key] = calculate()
+        return self._cache[key]
+
+    def _calculate_bounding_box(self):
+        """Calculate the bounding box of the point array."""
+        return _get_bounding_box(self.get_point_array(), self._integral)
 
-        # Adjust parameters
-        for stroke in pointlist:
-            for p in stroke:
-                minx, maxx = min(minx, p["x"]), max(maxx, p["x"])
-                miny, maxy = min(miny, p["y"]), max(maxy, p["y"])
-                mint, maxt = min(mint, p["time"]), max(maxt, p["time"])
-        return {"minx": minx, "maxx": maxx, "miny": miny, "maxy": maxy,
-                "mint": mint, "maxt": maxt}
+    def _is_time_sorted(self):
+        """Check if the points of every stroke and the strokes themselves are
+           already ordered by time."""
+        def calculate():
+            return _is_time_sorted(self.get_point_array(),
+                                   self.get_stroke_offsets())
+        return self._get_cached('is_time_sorted', calculate)
+
+    def get_bounding_box(self):
+        """ Get the bounding box of a pointlist. """
+        return dict(self._get_cached('bounding_box',
+                                     self._calculate_bounding_box))
 
     def get_width(self):
         """Get the width of the rectangular, axis-parallel bounding box."""
-        box = self.get_bounding_box()
-        return box['maxx'] - box['minx']
+        def calculate():
+            box = self.get_bounding_box()
+            return box['maxx'] - box['minx']
+        return self._get_cached('width', calculate)
 
     def get_height(self):
         """Get the height of the rectangular, axis-parallel bounding box."""
-        box = self.get_bounding_box()
-        return box['maxy'] - box['miny']
+        def calculate():
+            box = self.get_bounding_box()
+            return box['maxy'] - box['miny']
+        return self._get_cached('height', calculate)
 
     def get_area(self):
         """Get the area in square pixels of the recording."""
-        return (self.get_height() + 1) * (self.get_width() + 1)
+        return self._get_cached('area',
+                                lambda: (self.get_height() + 1) *
+                                (self.get_width() + 1))
 
     def get_time(self):
         """Get the time in which the recording was created."""
-        box = self.get_bounding_box()
-        return box['maxt'] - box['mint']
+        def calculate():
+            box = self.get_bounding_box()
+            return box['maxt'] - box['mint']
+        return self._get_cached('time', calculate)
 
     def get_bitmap(self, time=None, size=32, store_path=None):
         """
@@ -167,39 +466,46 @@ class HandwrittenData(object):
         numpy array :
             Greyscale png image
         """
-        # bitmap_width = int(self.get_width()*size) + 2
-        # bitmap_height = int(self.get_height()*size) + 2
-        img = Image.new('L', (size, size), 'black')
-        draw = ImageDraw.Draw(img, 'L')
-        bb = self.get_bounding_box()
-        for stroke in self.get_sorted_pointlist():
-            for p1, p2 in zip(stroke, stroke[1:]):
-                if time is not None and \
-                   (p1['time'] > time or p2['time'] > time):
-                    continue
-                y_from = int((-bb['miny'] + p1['y']) /
-                             max(self.get_height(), 1)*size)
-                x_from = int((-bb['minx'] + p1['x']) /
-                             max(self.get_width(), 1)*size)
-                y_to = int((-bb['miny'] + p2['y']) /
-                           max(self.get_height(), 1)*size)
-                x_to = int((-bb['minx'] + p2['x']) /
-                           max(self.get_width(), 1)*size)
-                draw.line([x_from, y_from, x_to, y_to],
-                          fill='#ffffff',
-                          width=1)
-        del draw
+        bitmap = numpy.zeros((size, size), dtype=numpy.uint8)
+        raster.draw_lines(bitmap, *self._get_bitmap_lines(time, size))
         if store_path is not None:
-            img.save(store_path)
-        return numpy.asarray(img)
+            Image.fromarray(bitmap, 'L').save(store_path)
+        return bitmap
+
+    def _get_bitmap_lines(self, time, size):
+        """Get the pixel coordinates of the lines which :meth:`get_bitmap`
+           draws as four arrays ``(x_from, y_from, x_to, y_to)``."""
+        bb = self.get_bounding_box()
+        height = max(self.get_height(), 1)
+        width = max(self.get_width(), 1)
+        points, offsets = self.get_point_array(), self.get_stroke_offsets()
+        if not self._is_time_sorted():
+            points, offsets, _ = _sort_arrays(points, offsets, None)
+        # Consecutive points are connected, except where a stroke ends
+        connected = numpy.ones(max(len(points) - 1, 0), dtype=bool)
+        stroke_ends = offsets[1:-1] - 1
+        connected[stroke_ends[(stroke_ends >= 0) &
+                              (stroke_ends < len(connected))]] = False
+        if time is not None:
+            in_time = points[:, 2] <= time
+            connected &= in_time[:-1] & in_time[1:]
+        # Same operations as int((-bb['minx'] + x) / width*size)
+        xs = ((-bb['minx'] + points[:, 0]) / width * size).astype(numpy.int64)
+        ys = ((-bb['miny'] + points[:, 1]) / height * size).astype(
+            numpy.int64)
+        starts = numpy.flatnonzero(connected)
+        return xs[starts], ys[starts], xs[starts + 1], ys[starts + 1]
 
-    def preprocessing(self, algorithms):
+    def preprocessing(self, algorithms, profile=None):
         """Apply preprocessing algorithms.
 
         Parameters
         ----------
         algorithms : a list objects
             Preprocessing allgorithms which get applied in order.
+        profile : preprocessing.PreprocessingProfile, optional
+            If given, the time and the change of the number of points of
+            every algorithm get added to it.
 
         Examples
         --------
@@ -214,18 +520,26 @@ class HandwrittenData(object):
         ...                          'KIND': 'cubic'})]
         >>> a.preprocessing(preprocessing_queue)
         """
-        assert type(algorithms) is list
-        for algorithm in algorithms:
-            algorithm(self)
+        from . import preprocessing  # preprocessing imports this module
+        if type(algorithms) is list:
+            algorithms = preprocessing.PreprocessingQueue(algorithms)
+        assert isinstance(algorithms, preprocessing.PreprocessingQueue)
+        algorithms(self, profile)
 
     def feature_extraction(self, algorithms):
         """Get a list of features.
 
-        Every algorithm has to return the features as a list."""
+        Every algorithm has to return the features as a list. The algorithms
+        which take a :class:`features.ExtractionContext` share one, so
+        intermediate results like the point array get calculated only
+        once."""
+        from . import features as features_module  # features imports this
         assert type(algorithms) is list
+        context = features_module.ExtractionContext(self)
         features = []
         for algorithm in algorithms:
-            new_features = algorithm(self)
+            new_features = features_module.get_feature_values(algorithm, self,
+                                                              context)
             assert len(new_features) == algorithm.get_dimension(), \
                 "Expected %i features from algorithm %s, got %i features" % \
                 (algorithm.get_dimension(), str(algorithm), len(new_features))
@@ -289,12 +603,8 @@ class HandwrittenData(object):
     def count_single_dots(self):
         """Count all strokes of this recording that have only a single dot.
         """
-        pointlist = self.get_pointlist()
-        single_dots = 0
-        for stroke in pointlist:
-            if len(stroke) == 1:
-                single_dots += 1
-        return single_dots
+        stroke_lengths = numpy.diff(self.get_stroke_offsets())
+        return int(numpy.count_nonzero(stroke_lengths == 1))
 
     def get_center_of_mass(self):
         """
@@ -302,13 +612,49 @@ class HandwrittenData(object):
         necessarily the same as the center of the bounding box. Imagine a black
         square and a single dot wide outside of the square.
         """
-        xsum, ysum, counter = 0., 0., 0
-        for stroke in self.get_pointlist():
-            for point in stroke:
-                xsum += point['x']
-                ysum += point['y']
-                counter += 1
-        return (xsum / counter, ysum / counter)
+        def calculate():
+            points = self.get_point_array()
+            counter = len(points)
+            xsum, ysum = points[:, :2].sum(axis=0).tolist()
+            return (xsum / counter, ysum / counter)
+        return self._get_cached('center_of_mass', calculate)
+
+    def get_fingerprint(self, quantization=None):
+        """
+        Get a hash of the strokes. Two recordings have the same fingerprint
+        if their strokes have the same points with the same times, no matter
+        how they are stored or what their metadata is. This makes it usable
+        as key for caches and for finding duplicate recordings.
+
+        Parameters
+        ----------
+        quantization : None, float or tuple of three floats
+            If this is set, ``x``, ``y`` and ``time`` get rounded to
+            multiples of it before they are hashed, e.g. ``(1, 1, 10)``
+            for pixel coordinates and times in steps of 10 ms.
+
+        Returns
+        -------
+        str :
+            A hexadecimal SHA-1 hash
+        """
+        if quantization is not None:
+            quantization = tuple(numpy.broadcast_to(quantization,
+                                                    (3,)).tolist())
+
+        def calculate():
+            points = self.get_point_array()
+            if quantization is None:
+                # Adding 0.0 makes -0.0 and 0.0 the same
+                points = (points + 0.0).astype('<f8')
+            else:
+                points = numpy.round(points / quantization).astype('<i8')
+            offsets = numpy.asarray(self.get_stroke_offsets(), dtype='<i8')
+            fingerprint = hashlib.sha1(b'f' if quantization is None else b'q')
+            fingerprint.update(offsets.tobytes())
+            fingerprint.update(numpy.ascontiguousarray(points).tobytes())
+            return fingerprint.hexdigest()
+        return self._get_cached(('fingerprint', quantization), calculate)
 
     def to_single_symbol_list(self):
         """
@@ -323,18 +669,74 @@ class HandwrittenData(object):
                                 'symbol_stream',
                                 [None for symbol in self.segmentation])
         single_symbols = []
-        pointlist = self.get_sorted_pointlist()
+        points, offsets = self.get_point_array(), self.get_stroke_offsets()
+        pen_down = self._pen_down
+        if not self._is_time_sorted():
+            points, offsets, pen_down = _sort_arrays(points, offsets,
+                                                     pen_down)
         for stroke_indices, label in zip(self.segmentation, symbol_stream):
-            strokes = []
-            for stroke_index in stroke_indices:
-                strokes.append(pointlist[stroke_index])
-            single_symbols.append(HandwrittenData(json.dumps(strokes),
-                                                  formula_id=label))
+            point_indices, symbol_offsets = _get_point_indices(offsets,
+                                                               stroke_indices)
+            integral = self._integral
+            if len(point_indices) == 0:
+                integral = (False, False, False)
+            single_symbols.append(HandwrittenData.from_point_array(
+                points[point_indices], symbol_offsets,
+                None if pen_down is None else pen_down[point_indices],
+                integral=integral, trusted=True, formula_id=label))
         return single_symbols
 
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', {}))
+        for name in self.__slots__:
+            if name not in ['_raw_data_json', '_cache', '_store', '_index',
+                            '__dict__', '__weakref__'] and \
+               hasattr(self, name):
+                state[name] = getattr(self, name)
+        if self._store is not None:
+            # Packed strokes are pickled like the ones of single recordings
+            state['_points'] = self.get_point_array()
+            state['_stroke_offsets'] = numpy.array(self.get_stroke_offsets())
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        # Pickles of older versions store the strokes as JSON string
+        raw_data_json = state.pop('raw_data_json', None)
+        self._extra = None
+        self._time_offset = None
+        self._raw_data_json = None
+        self._cache = None
+        self._store = None
+        self._index = None
+        for name, value in state.items():
+            setattr(self, name, value)
+        if raw_data_json is not None:
+            self.raw_data_json = raw_data_json
+        for array in [self._points, self._stroke_offsets, self._pen_down]:
+            if array is not None:
+                array.flags.writeable = False
+        self._integral = _INTEGRAL[tuple(self._integral)]
+        self.compact()
+
     def __eq__(self, other):
-        return (isinstance(other, self.__class__)
-                and self.__dict__ == other.__dict__)
+        if not isinstance(other, self.__class__):
+            return False
+        state, other_state = self.__getstate__(), other.__getstate__()
+        for key in ['_points', '_stroke_offsets', '_pen_down',
+                    '_time_offset']:
+            del state[key], other_state[key]
+        for array, other_array in [(self.get_point_array(),
+                                    other.get_point_array()),
+                                   (self.get_stroke_offsets(),
+                                    other.get_stroke_offsets()),
+                                   (self._pen_down, other._pen_down)]:
+            if (array is None) != (other_array is None):
+                return False
+            if array is not None and not numpy.array_equal(array,
+                                                           other_array):
+                return False
+        return state == other_state
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -349,6 +751,383 @@ class HandwrittenData(object):
         return repr(self)
 
 
+class StrokeArrays(object):
+    """
+    The strokes of a recording as writable arrays. Preprocessing algorithms
+    work on this representation (see
+    :class:`hwrt.preprocessing.PreprocessingQueue`), so a queue of algorithms
+    converts a recording only once and not after every algorithm.
+
+    Parameters
+    ----------
+    points : numpy array
+        An ``(n, 3)`` array with the columns ``x``, ``y`` and ``time``.
+    stroke_offsets : numpy array
+        ``k + 1`` increasing indices into ``points`` for ``k`` strokes.
+    pen_down : numpy array or None
+        ``n`` values which are 1, 0 or -1 (no information).
+    integral : tuple of three bools
+        If ``x``, ``y`` and ``time`` are integers in the list of strokes.
+    raw_data_id : int or None
+        The recording these strokes belong to. It is used for log messages.
+    """
+    __slots__ = ('points', 'stroke_offsets', 'pen_down', 'integral',
+                 'raw_data_id')
+
+    def __init__(self, points, stroke_offsets, pen_down=None,
+                 integral=(False, False, False), raw_data_id=None):
+        self.set_points(points, stroke_offsets, pen_down, integral)
+        self.raw_data_id = raw_data_id
+
+    def __repr__(self):
+        return "StrokeArrays(strokes=%i, points=%i)" % \
+            (self.get_stroke_count(), len(self.points))
+
+    def set_points(self, points, stroke_offsets, pen_down=None,
+                   integral=None):
+        """Replace the strokes. The integral flags are kept if ``integral``
+           is ``None``."""
+        self.points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+        self.stroke_offsets = numpy.asarray(stroke_offsets, dtype=numpy.intp)
+        if pen_down is not None:
+            pen_down = numpy.asarray(pen_down, dtype=numpy.int8)
+        self.pen_down = pen_down
+        if integral is not None:
+            self.integral = _INTEGRAL[tuple(bool(flag) for flag in integral)]
+
+    def get_stroke_count(self):
+        """Get the number of strokes."""
+        return len(self.stroke_offsets) - 1
+
+    def get_stroke_lengths(self):
+        """Get the number of points of every stroke."""
+        return numpy.diff(self.stroke_offsets)
+
+    def get_strokes(self):
+        """Get a list with a view on the points of every stroke."""
+        bounds = self.stroke_offsets.tolist()
+        return [self.points[start:end]
+                for start, end in zip(bounds, bounds[1:])]
+
+    def get_bounding_box(self):
+        """Get the bounding box like
+           :meth:`HandwrittenData.get_bounding_box`."""
+        return _get_bounding_box(self.points, self.integral)
+
+    def get_width(self):
+        """Get the width of the bounding box."""
+        box = self.get_bounding_box()
+        return box['maxx'] - box['minx']
+
+    def get_height(self):
+        """Get the height of the bounding box."""
+        box = self.get_bounding_box()
+        return box['maxy'] - box['miny']
+
+    def sort(self):
+        """Sort the points of every stroke and the strokes by time like
+           :meth:`HandwrittenData.get_sorted_pointlist`."""
+        if not _is_time_sorted(self.points, self.stroke_offsets):
+            self.points, self.stroke_offsets, self.pen_down = \
+                _sort_arrays(self.points, self.stroke_offsets, self.pen_down)
+
+    def keep_points(self, mask, remove_empty_strokes=False):
+        """Keep only the points where ``mask`` is true."""
+        kept = numpy.zeros(len(mask) + 1, dtype=numpy.intp)
+        numpy.cumsum(mask, out=kept[1:])
+        stroke_offsets = kept[self.stroke_offsets]
+        if remove_empty_strokes:
+            stroke_offsets = numpy.unique(stroke_offsets)
+        self.points = self.points[mask]
+        self.stroke_offsets = stroke_offsets
+        if self.pen_down is not None:
+            self.pen_down = self.pen_down[mask]
+
+    def keep_strokes(self, stroke_indices):
+        """Keep only the strokes ``stroke_indices`` in this order."""
+        point_indices, self.stroke_offsets = \
+            _get_point_indices(self.stroke_offsets, stroke_indices)
+        self.points = self.points[point_indices]
+        if self.pen_down is not None:
+            self.pen_down = self.pen_down[point_indices]
+
+
+def get_bitmaps(recordings, time=None, size=32, out=None):
+    """
+    Get the bitmaps of many recordings at once. The result is the same as
+    calling :meth:`HandwrittenData.get_bitmap` for every recording, but all
+    lines are drawn with a few NumPy calls.
+
+    Parameters
+    ----------
+    recordings : list of HandwrittenData objects
+    time : int or None
+    size : int
+        Size in pixels. Each bitmap will be (size x size).
+    out : numpy array or None
+        A preallocated array of shape ``(len(recordings), size, size)`` for
+        the result. It gets overwritten.
+
+    Returns
+    -------
+    numpy array :
+        An uint8 array of shape ``(len(recordings), size, size)``
+    """
+    shape = (len(recordings), size, size)
+    if out is None:
+        out = numpy.zeros(shape, dtype=numpy.uint8)
+    else:
+        assert out.shape == shape, \
+            "out has shape %s, but %s is needed" % (out.shape, shape)
+        out[...] = 0
+    lines = [recording._get_bitmap_lines(time, size)
+             for recording in recordings]
+    if len(lines) == 0:
+        return out
+    layer = numpy.repeat(numpy.arange(len(lines)),
+                         [len(line[0]) for line in lines])
+    coordinates = [numpy.concatenate(column) for column in zip(*lines)]
+    return raster.draw_lines(out, *coordinates, layer=layer)
+
+
+def pack_recordings(recordings):
+    """
+    Store the strokes of many recordings in one set of arrays to save
+    memory. This is meant for large raw datasets which are kept in memory
+    (see :func:`hwrt.utils.iter_dataset`). The recordings behave exactly as
+    before.
+
+    The points are stored as differences to the previous point. Most of
+    them fit into an int8, so a recording needs about 3 bytes per point and
+    no arrays of its own. This works for recordings whose consecutive points
+    differ by integers, which is the case for typical raw recordings. A
+    recording only gets packed if all of its values are restored exactly;
+    the other recordings keep their arrays.
+
+    Parameters
+    ----------
+    recordings : list of HandwrittenData objects
+
+    Returns
+    -------
+    int :
+        The number of recordings which got packed
+    """
+    packed, firsts, deltas = [], [], []
+    for recording in recordings:
+        points = recording.get_point_array()
+        point_deltas = _get_point_deltas(points)
+        if point_deltas is not None:
+            packed.append(recording)
+            firsts.append(points[0])
+            deltas.append(point_deltas)
+    if len(packed) == 0:
+        return 0
+    store = _PackedStrokes(firsts, deltas,
+                           [recording.get_stroke_offsets()
+                            for recording in packed])
+    for index, recording in enumerate(packed):
+        recording._points = None
+        recording._stroke_offsets = None
+        recording._time_offset = None
+        recording._raw_data_json = None
+        recording._store = store
+        recording._index = index
+    return len(packed)
+
+
+class _PackedStrokes(object):
+    """
+    The strokes of many recordings (see :func:`pack_recordings`). Like in a
+    :class:`hwrt.recording_batch.RecordingBatch`, the points and strokes of
+    recording ``i`` are found by offsets:
+
+    * ``deltas[point_offsets[i]:point_offsets[i + 1]]`` are the differences
+      of every point to the previous one. The first point of a recording is
+      ``firsts[i]``. Differences which do not fit into an int8 are stored
+      as ``-128``; their values are
+      ``large_deltas[large_offsets[i]:large_offsets[i + 1]]`` in row-major
+      order.
+    * ``stroke_offsets[stroke_starts[i]:stroke_starts[i + 1]]`` are the
+      stroke offsets of the recording.
+    """
+    __slots__ = ('firsts', 'deltas', 'point_offsets', 'large_deltas',
+                 'large_offsets', 'stroke_offsets', 'stroke_starts')
+
+    def __init__(self, firsts, deltas, stroke_offsets):
+        self.firsts = numpy.array(firsts, dtype=numpy.float64)
+        self.point_offsets = _get_offsets([len(point_deltas)
+                                           for point_deltas in deltas])
+        deltas = numpy.concatenate(deltas)
+        is_large = (deltas < -127) | (deltas > 127)
+        self.deltas = numpy.where(is_large, -128, deltas).astype(numpy.int8)
+        self.large_deltas = deltas[is_large].astype(numpy.int32)
+        large_counts = numpy.zeros(len(deltas) + 1, dtype=numpy.int64)
+        numpy.cumsum(is_large.sum(axis=1), out=large_counts[1:])
+        self.large_offsets = large_counts[self.point_offsets]
+        self.stroke_starts = _get_offsets([len(offsets)
+                                           for offsets in stroke_offsets])
+        self.stroke_offsets = numpy.concatenate(stroke_offsets).astype(
+            numpy.int32)
+        for name in self.__slots__:
+            getattr(self, name).flags.writeable = False
+
+    def get_point_array(self, index):
+        """Get the points of recording ``index`` as read-only array."""
+        start, end = self.point_offsets[index:index + 2]
+        deltas = self.deltas[start:end].astype(numpy.float64)
+        start, end = self.large_offsets[index:index + 2]
+        if end > start:
+            deltas[deltas == -128] = self.large_deltas[start:end]
+        points = numpy.cumsum(deltas, axis=0, out=deltas)
+        points += self.firsts[index]
+        points.flags.writeable = False
+        return points
+
+    def get_stroke_offsets(self, index):
+        """Get a read-only view on the stroke offsets of recording
+           ``index``."""
+        start, end = self.stroke_starts[index:index + 2]
+        return self.stroke_offsets[start:end]
+
+
+def _get_offsets(lengths):
+    """Get the offsets of consecutive parts with the given lengths."""
+    offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _get_point_deltas(points):
+    """Get the integral differences of every point to the previous one (0
+       for the first point) if they restore all points exactly, else
+       ``None`` (see :func:`pack_recordings`)."""
+    # -0.0 would become 0.0
+    if len(points) == 0 or not numpy.all(numpy.isfinite(points)) or \
+       numpy.any(numpy.signbit(points) & (points == 0)):
+        return None
+    deltas = numpy.round(numpy.diff(points, axis=0, prepend=points[:1]))
+    if numpy.abs(deltas).max() >= 2**31:
+        return None
+    restored = numpy.cumsum(deltas, axis=0)
+    restored += points[0]
+    if not numpy.array_equal(restored, points):
+        return None
+    return deltas
+
+
+def _get_bounding_box(points, integral):
+    """Get the bounding box of a point array as a dictionary of Python
+       numbers."""
+    minx, miny, mint = _to_python(points.min(axis=0), integral)
+    maxx, maxy, maxt = _to_python(points.max(axis=0), integral)
+    return {"minx": minx, "maxx": maxx, "miny": miny, "maxy": maxy,
+            "mint": mint, "maxt": maxt}
+
+
+def _is_time_sorted(points, stroke_offsets):
+    """Check if the points of every stroke and the strokes themselves are
+       ordered by time."""
+    lengths = numpy.diff(stroke_offsets)
+    nonempty = numpy.flatnonzero(lengths)
+    if len(nonempty) > 0 and nonempty[-1] != len(nonempty) - 1:
+        # Empty strokes have to be at the end
+        return False
+    times = points[:, 2]
+    inner = numpy.ones(max(len(times) - 1, 0), dtype=bool)
+    inner[stroke_offsets[1:-1][lengths[1:] > 0] - 1] = False
+    if not numpy.all(numpy.diff(times)[inner] >= 0):
+        return False
+    first_times = times[stroke_offsets[:-1][nonempty]]
+    return bool(numpy.all(numpy.diff(first_times) >= 0))
+
+
+def _get_point_indices(stroke_offsets, stroke_indices):
+    """Get the indices of all points of the strokes ``stroke_indices`` (in
+       this order) and the stroke offsets of these points.
+
+    >>> point_indices, offsets = _get_point_indices(numpy.array([0, 2, 3, 6]),
+    ...                                             numpy.array([2, 0]))
+    >>> point_indices.tolist(), offsets.tolist()
+    ([3, 4, 5, 0, 1], [0, 3, 5])
+    """
+    stroke_indices = numpy.asarray(stroke_indices, dtype=numpy.intp)
+    starts = stroke_offsets[stroke_indices]
+    lengths = stroke_offsets[stroke_indices + 1] - starts
+    offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.intp)
+    numpy.cumsum(lengths, out=offsets[1:])
+    point_indices = numpy.repeat(starts - offsets[:-1], lengths) + \
+        numpy.arange(offsets[-1])
+    return point_indices, offsets
+
+
+def _to_python(values, integral):
+    """Convert a row of the point array to Python numbers."""
+    return [int(value) if is_int else float(value)
+            for value, is_int in zip(values, integral)]
+
+
+def _arrays_to_pointlist(points, stroke_offsets, pen_down, integral,
+                         extra=None):
+    """Convert the arrays used by HandwrittenData to a list of strokes.
+       Points which are given by ``extra`` are copied from there.
+
+    >>> _arrays_to_pointlist(numpy.array([[1., 2.5, 3.]]),
+    ...                      numpy.array([0, 1]), None, (True, False, True))
+    [[{'x': 1, 'y': 2.5, 'time': 3}]]
+    """
+    columns = []
+    for i, is_int in enumerate(integral):
+        column = points[:, i]
+        if is_int:
+            column = column.astype(numpy.int64)
+        columns.append(column.tolist())
+    if pen_down is None:
+        flat = [{'x': x, 'y': y, 'time': t} for x, y, t in zip(*columns)]
+    else:
+        flat = []
+        for x, y, t, down in zip(columns[0], columns[1], columns[2],
+                                 pen_down.tolist()):
+            point = {'x': x, 'y': y, 'time': t}
+            if down >= 0:
+                point['pen_down'] = bool(down)
+            flat.append(point)
+    if extra is not None:
+        for i, point in enumerate(extra):
+            if point is not None:
+                flat[i] = dict(point)
+    bounds = stroke_offsets.tolist()
+    return [flat[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _sort_arrays(points, stroke_offsets, pen_down):
+    """Sort the points of every stroke by time and the strokes by the time of
+       their first point. Both sorts are stable.
+
+    Returns
+    -------
+    tuple :
+        (points, stroke_offsets, pen_down)
+    """
+    lengths = numpy.diff(stroke_offsets)
+    stroke_ids = numpy.repeat(numpy.arange(len(lengths)), lengths)
+    # Empty strokes have no first point; they are moved to the end
+    first_times = numpy.full(len(lengths), numpy.inf)
+    nonempty = lengths > 0
+    if nonempty.any():
+        first_times[nonempty] = numpy.minimum.reduceat(
+            points[:, 2], stroke_offsets[:-1][nonempty])
+    stroke_order = numpy.argsort(first_times, kind='mergesort')
+    stroke_rank = numpy.empty_like(stroke_order)
+    stroke_rank[stroke_order] = numpy.arange(len(stroke_order))
+    order = numpy.lexsort((points[:, 2], stroke_rank[stroke_ids]))
+    new_offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.intp)
+    numpy.cumsum(lengths[stroke_order], out=new_offsets[1:])
+    if pen_down is not None:
+        pen_down = pen_down[order]
+    return points[order], new_offsets, pen_down
+
+
 def _get_colors(segmentation):
     """Get a list of colors which is as long as the segmentation.
 
@@ -5,8 +5,10 @@
 
 from __future__ import print_function
 import logging
+import multiprocessing
 import sys
 import os
+import numpy
 import yaml
 try:  # Python 2
     import cPickle as pickle
@@ -53,9 +55,235 @@ def get_parameters(folder):
     return (raw_datapath, outputpath, preprocessing_queue)
 
 
-def create_preprocessed_dataset(path_to_data, outputpath, preprocessing_queue):
+def _preprocess_chunk(task):
+    """Apply a preprocessing queue to a chunk of recordings. This runs in a
+       worker process, so only the resulting strokes are sent back.
+
+    Parameters
+    ----------
+    task : tuple
+        (list of HandwrittenData objects, list of preprocessing algorithms,
+         bool if the algorithms should be profiled)
+
+    Returns
+    -------
+    tuple :
+        (:class:`handwritten_data.StrokeArrays` for every recording,
+         :class:`preprocessing.PreprocessingProfile` or None)
+    """
+    recordings, preprocessing_queue, profiled = task
+    profile = preprocessing.PreprocessingProfile() if profiled else None
+    stroke_arrays = []
+    for recording in recordings:
+        recording.preprocessing(preprocessing_queue, profile)
+        stroke_arrays.append(recording.get_stroke_arrays())
+    return stroke_arrays, profile
+
+
+def _use_builtin_dtypes(stroke_arrays):
+    """Replace the dtypes of unpickled :class:`handwritten_data.StrokeArrays`
+       by the builtin ones (without copying the data). Every unpickled array
+       has its own dtype object, but the preprocessed file should be pickled
+       exactly like after preprocessing in a single process."""
+    for name in ['points', 'stroke_offsets', 'pen_down']:
+        array = getattr(stroke_arrays, name)
+        if array is not None:
+            setattr(stroke_arrays, name,
+                    numpy.asarray(array, dtype=array.dtype.type))
+
+
+def _get_queue_key(preprocessing_queue):
+    """Get a string which identifies `preprocessing_queue`. The repr of an
+       algorithm does not contain all of its parameters, so the attributes
+       are part of the key, too."""
+    return repr([(repr(algorithm),
+                  sorted(getattr(algorithm, '__dict__', {}).items()))
+                 for algorithm in preprocessing_queue])
+
+
+class _PreprocessedRecordings(object):
+    """The preprocessed recordings of a previous run, accessible by the
+       fingerprint of their raw recording.
+
+       If the previous run was written as record stream, only the position
+       of every recording in the file is kept in memory and the batches are
+       read again when they are needed. A single pickled dictionary has to
+       be kept completely.
+
+    Parameters
+    ----------
+    outputpath : str
+        Path of the preprocessed data pickle file of the previous run
+    preprocessing_queue : list
+        Preprocessing algorithms. Nothing is reused if the previous run had
+        other ones.
+    """
+    def __init__(self, outputpath, preprocessing_queue):
+        self.outputpath = outputpath
+        # Maps fingerprints to (offset of the batch, index in the batch)
+        self._positions = {}
+        self._batch_offset = None
+        self._batch = None
+        if not os.path.isfile(outputpath):
+            return
+        with open(outputpath, 'rb') as f:
+            metadata = pickle.load(f)
+            if _get_queue_key(metadata.get('preprocessing_queue', [])) != \
+                    _get_queue_key(preprocessing_queue):
+                logging.info("The preprocessing queue changed, so no "
+                             "recording of '%s' is reused.", outputpath)
+                return
+            if metadata.get('format') != utils.DATASET_STREAM_FORMAT:
+                self._batch = metadata['handwriting_datasets']
+                self._add_positions(None, self._batch)
+                return
+            while True:
+                offset = f.tell()
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    break
+                self._add_positions(offset, batch)
+
+    def _add_positions(self, offset, batch):
+        """Store the position of every recording of `batch` which has a
+           fingerprint."""
+        for i, raw_dataset in enumerate(batch):
+            if 'raw_fingerprint' in raw_dataset:
+                self._positions[raw_dataset['raw_fingerprint']] = (offset, i)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._positions
+
+    def __getitem__(self, fingerprint):
+        """Get the preprocessed HandwrittenData object of the raw recording
+           with `fingerprint`."""
+        offset, i = self._positions[fingerprint]
+        if offset != self._batch_offset:
+            # Recordings are usually requested in the order of the file, so
+            # only the last batch is kept
+            with open(self.outputpath, 'rb') as f:
+                f.seek(offset)
+                self._batch = pickle.load(f)
+            self._batch_offset = offset
+        return self._batch[i]['handwriting']
+
+
+def _reuse_preprocessed(raw_datasets, preprocessed):
+    """Store the fingerprint of every raw recording of `raw_datasets` and
+       take the strokes of recordings which are in `preprocessed` from there.
+       The metadata of the recordings is kept. If `preprocessed` is None,
+       nothing is reused and no fingerprint is stored.
+
+    Returns
+    -------
+    list :
+        The recordings which still have to be preprocessed
+    """
+    if preprocessed is None:
+        return raw_datasets
+    todo = []
+    for raw_dataset in raw_datasets:
+        handwriting = raw_dataset['handwriting']
+        fingerprint = handwriting.get_fingerprint()
+        raw_dataset['raw_fingerprint'] = fingerprint
+        if fingerprint in preprocessed:
+            stroke_arrays = preprocessed[fingerprint].get_stroke_arrays()
+            _use_builtin_dtypes(stroke_arrays)
+            handwriting.set_stroke_arrays(stroke_arrays)
+        else:
+            todo.append(raw_dataset)
+    return todo
+
+
+def _preprocess(raw_datasets, preprocessing_queue, pool=None, chunksize=100,
+                profile=None):
+    """Apply `preprocessing_queue` to the recordings of `raw_datasets`. If a
+       `pool` of worker processes is given, chunks of `chunksize` recordings
+       are sent to the workers and the results are stored in the original
+       order. The algorithms are profiled if a `profile` is given. This is a
+       generator which yields the number of preprocessed recordings from
+       time to time."""
+    if pool is None:
+        for i, raw_dataset in enumerate(raw_datasets):
+            if i % 10 == 0 and i > 0:
+                yield i
+            # Do the work
+            raw_dataset['handwriting'].preprocessing(preprocessing_queue,
+                                                     profile)
+        return
+    chunks = [raw_datasets[i:i + chunksize]
+              for i in range(0, len(raw_datasets), chunksize)]
+    tasks = (([raw_dataset['handwriting'] for raw_dataset in chunk],
+              preprocessing_queue, profile is not None)
+             for chunk in chunks)
+    done = 0
+    for chunk, (results, chunk_profile) in \
+            zip(chunks, pool.imap(_preprocess_chunk, tasks)):
+        if profile is not None:
+            profile.merge(chunk_profile)
+        for raw_dataset, stroke_arrays in zip(chunk, results):
+            _use_builtin_dtypes(stroke_arrays)
+            raw_dataset['handwriting'].set_stroke_arrays(stroke_arrays)
+        done += len(chunk)
+        yield done
+
+
+def _preprocess_batches(batches, preprocessing_queue, batch_size, pool,
+                        chunksize, preprocessed, profile):
+    """Regroup the recordings of `batches` in batches of at most
+       `batch_size` recordings and preprocess them one batch at a time."""
+    recordings = (recording for batch in batches for recording in batch)
+    done = 0
+    start_time = time.time()
+    for batch in utils.regroup_recordings(recordings, batch_size):
+        todo = _reuse_preprocessed(batch, preprocessed)
+        for _ in _preprocess(todo, preprocessing_queue, pool, chunksize,
+                             profile):
+            pass
+        done += len(batch)
+        utils.print_status(None, done, start_time)
+        yield batch
+
+
+def create_preprocessed_dataset(path_to_data, outputpath, preprocessing_queue,
+                                workers=1, chunksize=100, batch_size=None,
+                                incremental=False, profile=None):
     """Create a preprocessed dataset file by applying `preprocessing_queue`
-       to `path_to_data`. The result will be stored in `outputpath`."""
+       to `path_to_data`. The result will be stored in `outputpath`.
+
+    Parameters
+    ----------
+    path_to_data : str
+        Path to a raw data pickle file - either a single pickled dictionary
+        or a record stream (see :func:`hwrt.utils.write_dataset_stream`)
+    outputpath : str
+        Path where the preprocessed data pickle file gets stored
+    preprocessing_queue : list
+        Preprocessing algorithms
+    workers : int
+        Number of processes which apply the preprocessing queue. The file is
+        the same as with a single process.
+    chunksize : int
+        Number of recordings which are sent to a worker process at once
+    batch_size : int, optional
+        If given, the recordings are read, preprocessed and written as
+        record stream in batches of at most `batch_size` recordings, so
+        not the whole dataset has to fit into memory. This only works
+        incrementally if `path_to_data` is a record stream, too.
+    incremental : bool
+        If `outputpath` was created before with the same preprocessing
+        queue, only recordings which are not in there (by the fingerprint
+        of the raw recording) get preprocessed. The strokes of all others
+        are taken from `outputpath`. The fingerprints are only stored in
+        incremental runs, so only their recordings can be reused later.
+    profile : preprocessing.PreprocessingProfile, optional
+        If given, the time and the change of the number of points of every
+        algorithm get added to it.
+    """
     # Log everything
     logging.info("Data soure %s", path_to_data)
     logging.info("Output will be stored in %s", outputpath)
@@ -73,16 +301,45 @@ def create_preprocessed_dataset(path_to_data, outputpath, preprocessing_queue):
                            raw_dataset_path.split("raw-datasets")[1]
         print(raw_dataset_path)
         sys.exit()  # TODO: Update model!
-    logging.info("Start loading data...")
-    loaded = pickle.load(open(path_to_data, "rb"))
-    raw_datasets = loaded['handwriting_datasets']
-    logging.info("Start applying preprocessing methods")
-    start_time = time.time()
-    for i, raw_dataset in enumerate(raw_datasets):
-        if i % 10 == 0 and i > 0:
-            utils.print_status(len(raw_datasets), i, start_time)
-        # Do the work
-        raw_dataset['handwriting'].preprocessing(preprocessing_queue)
+    preprocessed = None
+    if incremental:
+        preprocessed = _PreprocessedRecordings(outputpath,
+                                               preprocessing_queue)
+        logging.info("%i preprocessed recordings can be reused",
+                     len(preprocessed))
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        if batch_size is not None:
+            metadata, batches = utils.iter_dataset(path_to_data)
+            logging.info("Start preprocessing batches of %i recordings",
+                         batch_size)
+            batches = _preprocess_batches(batches, preprocessing_queue,
+                                          batch_size, pool, chunksize,
+                                          preprocessed, profile)
+            # The previous run is read while the new one gets written
+            tmp_outputpath = outputpath + ".part"
+            utils.write_dataset_stream(
+                tmp_outputpath,
+                {'formula_id2latex': metadata['formula_id2latex'],
+                 'preprocessing_queue': preprocessing_queue},
+                batches)
+            os.rename(tmp_outputpath, outputpath)
+            print("")
+            return
+        logging.info("Start loading data...")
+        loaded = utils.load_dataset(path_to_data)
+        raw_datasets = loaded['handwriting_datasets']
+        todo = _reuse_preprocessed(raw_datasets, preprocessed)
+        del preprocessed  # The previous run is not needed any more
+        logging.info("Start applying preprocessing methods to %i of %i "
+                     "recordings", len(todo), len(raw_datasets))
+        start_time = time.time()
+        for done in _preprocess(todo, preprocessing_queue, pool, chunksize,
+                                profile):
+            utils.print_status(len(todo), done, start_time)
+    finally:
+        if pool is not None:
+            pool.terminate()
     sys.stdout.write("\r%0.2f%% (done)\033[K\n" % (100))
     print("")
     pickle.dump({'handwriting_datasets': raw_datasets,
@@ -92,10 +349,20 @@ def create_preprocessed_dataset(path_to_data, outputpath, preprocessing_queue):
                 2)
 
 
-def main(folder):
+def main(folder, workers=1, batch_size=None, incremental=False,
+         profiled=False):
     """Main part of preprocess_dataset that glues things togeter."""
     raw_datapath, outputpath, p_queue = get_parameters(folder)
-    create_preprocessed_dataset(raw_datapath, outputpath, p_queue)
+    profile = preprocessing.PreprocessingProfile() if profiled else None
+    create_preprocessed_dataset(raw_datapath, outputpath, p_queue, workers,
+                                batch_size=batch_size,
+                                incremental=incremental,
+                                profile=profile)
+    if profile is not None:
+        print(profile)
+        with open(os.path.join(folder, "preprocessing-profile.txt"),
+                  "w") as f:
+            f.write(profile.get_table() + "\n")
     utils.create_run_logfile(folder)
 
 
@@ -117,5 +384,30 @@ if __name__ == '__main__':
                         metavar="FOLDER",
                         type=lambda x: utils.is_valid_folder(parser, x),
                         default=latest_preprocessed)
+    parser.add_argument("-w", "--workers",
+                        dest="workers",
+                        type=int,
+                        default=1,
+                        help="number of processes which preprocess the "
+                             "recordings")
+    parser.add_argument("-b", "--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        help="write a record stream and keep at most this "
+                             "many recordings in memory")
+    parser.add_argument("-i", "--incremental",
+                        dest="incremental",
+                        action="store_true",
+                        default=False,
+                        help="only preprocess recordings which are not in "
+                             "the preprocessed file of the last run")
+    parser.add_argument("-p", "--profile",
+                        dest="profiled",
+                        action="store_true",
+                        default=False,
+                        help="measure the time of every preprocessing "
+                             "algorithm and store it in "
+                             "preprocessing-profile.txt")
     args = parser.parse_args()
-    main(args.folder)
+    main(args.folder, args.workers, args.batch_size, args.incremental,
+         args.profiled)
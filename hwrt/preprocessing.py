@@ -15,8 +15,10 @@ this:
     >>> a.preprocessing(preprocessing_queue)
 """
 
+import abc
 import logging
 import sys
+import timeit
 import numpy
 from scipy.interpolate import interp1d
 import math
@@ -73,14 +75,146 @@ def print_preprocessing_list(preprocessing_queue):
         print("* " + str(algorithm))
     print("```")
 
+
+class PreprocessingQueue(object):
+    """
+    A list of preprocessing algorithms which get applied together. The
+    recording is converted to :class:`hwrt.handwritten_data.StrokeArrays`
+    once, every algorithm changes these arrays and the result is stored in
+    the recording once at the end.
+
+    Algorithms which have no ``apply_arrays`` method (e.g. from plugins) get
+    the HandwrittenData object like before.
+
+    Parameters
+    ----------
+    algorithms : list of preprocessing objects
+        Algorithms that get applied in order.
+    """
+    def __init__(self, algorithms):
+        self.algorithms = list(algorithms)
+
+    def __repr__(self):
+        return "PreprocessingQueue(%r)" % self.algorithms
+
+    def __str__(self):
+        return "\n".join(str(algorithm) for algorithm in self.algorithms)
+
+    def __iter__(self):
+        return iter(self.algorithms)
+
+    def __len__(self):
+        return len(self.algorithms)
+
+    def __call__(self, hwr_obj, profile=None):
+        """Apply the algorithms to ``hwr_obj``. If a
+           :class:`PreprocessingProfile` is given, the time and the change of
+           the number of points of every algorithm are added to it."""
+        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
+            "handwritten data is not of type HandwrittenData, but of %r" % \
+            type(hwr_obj)
+        stroke_arrays = hwr_obj.get_stroke_arrays()
+        for position, algorithm in enumerate(self.algorithms):
+            if profile is not None:
+                point_count = len(stroke_arrays.points)
+                start_time = timeit.default_timer()
+            if hasattr(algorithm, 'apply_arrays'):
+                algorithm.apply_arrays(stroke_arrays)
+            else:
+                hwr_obj.set_stroke_arrays(stroke_arrays)
+                algorithm(hwr_obj)
+                stroke_arrays = hwr_obj.get_stroke_arrays()
+            if profile is not None:
+                profile.add(position, algorithm,
+                            timeit.default_timer() - start_time,
+                            point_count, len(stroke_arrays.points))
+        hwr_obj.set_stroke_arrays(stroke_arrays)
+
+
+class PreprocessingProfile(object):
+    """
+    Wall time, number of calls and change of the number of points of every
+    algorithm of a preprocessing queue, summed over all recordings the queue
+    was applied to.
+
+    Examples
+    --------
+    >>> profile = PreprocessingProfile()
+    >>> a = HandwrittenData(...)
+    >>> a.preprocessing([ScaleAndShift(), SpaceEvenly()], profile)
+    >>> print(profile)
+    """
+    def __init__(self):
+        # Maps (position in queue, algorithm name) to a list
+        # [calls, seconds, points before, points after]
+        self.entries = {}
+
+    def add(self, position, algorithm, seconds, points_before, points_after):
+        """Add one call of ``algorithm`` at ``position`` of the queue."""
+        key = (position, type(algorithm).__name__)
+        entry = self.entries.setdefault(key, [0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += points_before
+        entry[3] += points_after
+
+    def merge(self, other):
+        """Add all calls which were recorded by the profile ``other``."""
+        for key, other_entry in other.entries.items():
+            entry = self.entries.setdefault(key, [0, 0.0, 0, 0])
+            for i, value in enumerate(other_entry):
+                entry[i] += value
+
+    def get_table(self):
+        """Get the profile as human-readable table."""
+        total_seconds = sum(entry[1] for entry in self.entries.values())
+        lines = ["%3s %-28s %8s %10s %14s %7s %12s %12s" %
+                 ("#", "algorithm", "calls", "total [s]", "per call [ms]",
+                  "share", "points in", "points out")]
+        for (position, name), entry in sorted(self.entries.items()):
+            calls, seconds, points_before, points_after = entry
+            lines.append("%3i %-28s %8i %10.4f %14.4f %6.1f%% %12i %12i" %
+                         (position, name, calls, seconds,
+                          seconds / max(calls, 1) * 1000,
+                          seconds / max(total_seconds, 1e-12) * 100,
+                          points_before, points_after))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.get_table()
+
+
 # Only preprocessing classes follow
 # Everyone must have a __str__, __repr__ and __call__
 # where
 # * __call__ must take exactly one argument of type HandwrittenData
 # * __call__ must call the Handwriting.set_points
+# Algorithms which derive from PreprocessingAlgorithm implement apply_arrays
+# instead of __call__.
+
 
+class PreprocessingAlgorithm(object):
 
-class RemoveDuplicateTime(object):
+    """Abstract class for preprocessing algorithms which work on
+       :class:`hwrt.handwritten_data.StrokeArrays`."""
+
+    __metaclass__ = abc.ABCMeta
+
+    def __call__(self, hwr_obj):
+        """Apply the algorithm to the recording ``hwr_obj``."""
+        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
+            "handwritten data is not of type HandwrittenData, but of %r" % \
+            type(hwr_obj)
+        stroke_arrays = hwr_obj.get_stroke_arrays()
+        self.apply_arrays(stroke_arrays)
+        hwr_obj.set_stroke_arrays(stroke_arrays)
+
+    @abc.abstractmethod
+    def apply_arrays(self, stroke_arrays):
+        """Apply the algorithm to ``stroke_arrays`` in place."""
+
+
+class RemoveDuplicateTime(PreprocessingAlgorithm):
     """If a recording has two points with the same timestamp, than the second
        point will be discarded. This is useful for a couple of algorithms that
        don't expect two points at the same time."""
@@ -90,31 +224,16 @@ class RemoveDuplicateTime(object):
     def __str__(self):
         return "remove duplicate time"
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        pointlist = hwr_obj.get_pointlist()
-        new_pointlist = []
-        times = []
-        for stroke in pointlist:
-            new_stroke = []
-            for point in stroke:
-                if point['time'] not in times:
-                    new_stroke.append(point)
-                    times.append(point['time'])
-            if len(new_stroke) > 0:
-                new_pointlist.append(new_stroke)
-        # Make sure there are no duplicates
-        times = [point['time'] for stroke in new_pointlist for point in stroke]
-        assert len(times) == len(set(times)), \
-            ("The list of all times in RemoveDuplicateTime has %i values, "
-             "but the set has %i values: %s --- %s") % \
-            (len(times), len(set(times)), pointlist, new_pointlist)
-        hwr_obj.set_pointlist(new_pointlist)
-
-
-class RemoveDots(object):
+    def apply_arrays(self, stroke_arrays):
+        # numpy.unique returns the index of the first occurrence of each time
+        first_indices = numpy.unique(stroke_arrays.points[:, 2],
+                                     return_index=True)[1]
+        keep = numpy.zeros(len(stroke_arrays.points), dtype=bool)
+        keep[first_indices] = True
+        stroke_arrays.keep_points(keep, remove_empty_strokes=True)
+
+
+class RemoveDots(PreprocessingAlgorithm):
     """Remove all strokes that have only a single point (a dot) from the
        recording, except if the whole recording consists of dots only.
     """
@@ -124,25 +243,14 @@ class RemoveDots(object):
     def __str__(self):
         return "remove points"
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        pointlist = hwr_obj.get_pointlist()
-        has_nonpoint_stroke = False
+    def apply_arrays(self, stroke_arrays):
+        nonpoint_strokes = stroke_arrays.get_stroke_lengths() > 1
         # Check if recording has non-point stroke:
-        for stroke in pointlist:
-            if len(stroke) > 1:
-                has_nonpoint_stroke = True
-        if has_nonpoint_stroke:
-            new_pointlist = []
-            for stroke in pointlist:
-                if len(stroke) > 1:
-                    new_pointlist.append(stroke)
-            hwr_obj.set_pointlist(new_pointlist)
-
-
-class ScaleAndShift(object):
+        if nonpoint_strokes.any():
+            stroke_arrays.keep_strokes(numpy.flatnonzero(nonpoint_strokes))
+
+
+class ScaleAndShift(PreprocessingAlgorithm):
     """ Scale a recording so that it fits into a unit square. This keeps the
         aspect ratio. Then the recording is shifted. The default way is to
         shift it so that the recording is in [0, 1] × [0,1]. However, it
@@ -179,69 +287,126 @@ class ScaleAndShift(object):
             Optionally center the points inside of the unit square.
         """
         a = hwr_obj.get_bounding_box()
+        factor, addx, addy = self._get_batch_parameters(
+            numpy.array([a['minx'], a['miny']], dtype=numpy.float64),
+            numpy.array([a['maxx'], a['maxy']], dtype=numpy.float64))
+        return {"factor": float(factor[0]),
+                "addx": float(addx[0]), "addy": float(addy[0]),
+                "minx": a['minx'], "miny": a['miny'], "mint": a['mint']}
 
-        width = a['maxx'] - a['minx'] + self.width_add
-        height = a['maxy'] - a['miny'] + self.height_add
-
-        factor_x, factor_y = 1, 1
-        if width != 0:
-            factor_x = self.max_width / width
+    def _get_batch_parameters(self, mins, maxs):
+        """Calculate the scaling factor and the shift in x and y direction for
+           many recordings at once.
+
+        Parameters
+        ----------
+        mins : numpy array
+            The smallest x and y value of every recording as ``(..., 2)``
+            array.
+        maxs : numpy array
+            The biggest x and y value of every recording as ``(..., 2)``
+            array.
+
+        Returns
+        -------
+        tuple of numpy arrays :
+            (factor, addx, addy) with one value per recording. The points get
+            transformed by ``(x - minx) * factor + addx`` and
+            ``(y - miny) * factor + addy``.
+        """
+        mins = numpy.asarray(mins, dtype=numpy.float64).reshape(-1, 2)
+        maxs = numpy.asarray(maxs, dtype=numpy.float64).reshape(-1, 2)
+        width = maxs[:, 0] - mins[:, 0] + self.width_add
+        height = maxs[:, 1] - mins[:, 1] + self.height_add
 
-        if height != 0:
-            factor_y = self.max_height / height
+        with numpy.errstate(divide='ignore'):
+            factor_x = numpy.where(width != 0, self.max_width / width, 1.0)
+            factor_y = numpy.where(height != 0, self.max_height / height,
+                                   1.0)
 
-        factor = min(factor_x, factor_y)
-        addx, addy = 0.0, 0.0
+        factor = numpy.minimum(factor_x, factor_y)
+        addx = numpy.zeros(len(factor))
+        addy = numpy.zeros(len(factor))
 
         if self.center:
             # Only one dimension (x or y) has to be centered (the smaller one)
-            add = -(factor / (2.0 * max(factor_x, factor_y)))
-
-            if factor == factor_x:
-                addy = add
-                if self.center_other:
-                    addx = -(width * factor / 2.0)
-            else:
-                addx = add
-                if self.center_other:
-                    addy = -(height * factor / 2.0)
-        assert factor > 0, "factor > 0 is False. factor = %s" % str(factor)
-        assert isinstance(addx, float), "addx is %s" % str(addx)
-        assert isinstance(addy, float), "addy is %s" % str(addy)
-        assert isinstance(a['minx'], (int, float)), "minx is %s" % str(a['minx'])
-        assert isinstance(a['miny'], (int, float)), "miny is %s" % str(a['miny'])
-        assert isinstance(a['mint'], (int, float)), "mint is %s" % str(a['mint'])
-        return {"factor": factor, "addx": addx, "addy": addy,
-                "minx": a['minx'], "miny": a['miny'], "mint": a['mint']}
-
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-
-        tmp = self._get_parameters(hwr_obj)
-        factor, addx, addy = tmp['factor'], tmp['addx'], tmp['addy']
-        minx, miny, mint = tmp['minx'], tmp['miny'], tmp['mint']
-
-        pointlist = hwr_obj.get_pointlist()
-        for strokenr, stroke in enumerate(pointlist):
-            for key, p in enumerate(stroke):
-                pointlist[strokenr][key] = {
-                    "x": (p["x"] - minx) * factor + addx,
-                    "y": (p["y"] - miny) * factor + addy,
-                    "time": p["time"] - mint}
-                if "pen_down" in p:
-                    pointlist[strokenr][key]["pen_down"] = p["pen_down"]
-        hwr_obj.set_pointlist(pointlist)
-        assert self.max_width - hwr_obj.get_width() >= -0.00001, \
-            "max_width: %0.5f; width: %0.5f" % (self.max_width,
-                                                hwr_obj.get_width())
-        assert self.max_height - hwr_obj.get_height() >= -0.00001, \
-            "max_height: %0.5f; height: %0.5f" % \
-            (self.max_height, hwr_obj.get_height())
-
-
-class SpaceEvenly(object):
+            add = -(factor / (2.0 * numpy.maximum(factor_x, factor_y)))
+            x_is_smaller = factor == factor_x
+            addy = numpy.where(x_is_smaller, add, addy)
+            addx = numpy.where(x_is_smaller, addx, add)
+            if self.center_other:
+                addx = numpy.where(x_is_smaller, -(width * factor / 2.0),
+                                   addx)
+                addy = numpy.where(x_is_smaller, addy,
+                                   -(height * factor / 2.0))
+        assert numpy.all(factor > 0), \
+            "factor > 0 is False. factor = %s" % str(factor)
+        return factor, addx, addy
+
+    def apply_arrays(self, stroke_arrays):
+        points = stroke_arrays.points
+        mins, maxs = points.min(axis=0), points.max(axis=0)
+        factor, addx, addy = self._get_batch_parameters(mins[:2], maxs[:2])
+
+        points[:, :2] -= mins[:2]
+        points[:, :2] *= factor
+        points[:, 0] += addx
+        points[:, 1] += addy
+        points[:, 2] -= mins[2]
+        stroke_arrays.integral = (False, False, stroke_arrays.integral[2])
+        self._check_size((maxs[:2] - mins[:2]) * factor)
+
+    def apply_batch(self, batch):
+        """Scale and shift every recording of a
+        :class:`hwrt.recording_batch.RecordingBatch` separately, like calling
+        this algorithm for each recording.
+
+        Parameters
+        ----------
+        batch : RecordingBatch
+
+        Returns
+        -------
+        RecordingBatch :
+            A new batch with the transformed points. Strokes and ``pen_down``
+            are shared with ``batch``.
+        """
+        counts = batch.get_point_counts()
+        nonempty = counts > 0
+        starts = batch.get_point_offsets()[:-1][nonempty]
+        points = batch.points
+        if len(starts) > 0:
+            mins = numpy.minimum.reduceat(points, starts)
+            maxs = numpy.maximum.reduceat(points, starts)
+        else:
+            mins = maxs = numpy.zeros((0, 3))
+        factor, addx, addy = self._get_batch_parameters(mins[:, :2],
+                                                        maxs[:, :2])
+
+        counts = counts[nonempty]
+        new_points = points - numpy.repeat(mins, counts, axis=0)
+        new_points[:, :2] *= numpy.repeat(factor, counts)[:, numpy.newaxis]
+        new_points[:, 0] += numpy.repeat(addx, counts)
+        new_points[:, 1] += numpy.repeat(addy, counts)
+        self._check_size((maxs[:, :2] - mins[:, :2]) *
+                         factor[:, numpy.newaxis])
+        return batch.__class__(new_points, batch.stroke_offsets,
+                               batch.recording_offsets, batch.pen_down)
+
+    def _check_size(self, sizes):
+        """Make sure that the width and height of the scaled recordings
+           (``sizes`` is an ``(..., 2)`` array) are not too big."""
+        sizes = numpy.asarray(sizes).reshape(-1, 2)
+        if len(sizes) == 0:
+            return
+        width, height = sizes.max(axis=0).tolist()
+        assert self.max_width - width >= -0.00001, \
+            "max_width: %0.5f; width: %0.5f" % (self.max_width, width)
+        assert self.max_height - height >= -0.00001, \
+            "max_height: %0.5f; height: %0.5f" % (self.max_height, height)
+
+
+class SpaceEvenly(PreprocessingAlgorithm):
     """Space the points evenly in time over the complete recording. The
        parameter 'number' defines how many."""
     def __init__(self, number=100, kind='cubic'):
@@ -260,108 +425,96 @@ class SpaceEvenly(object):
                 " - kind: %s\n") % \
             (self.number, self.kind)
 
-    def _calculate_pen_down_strokes(self, pointlist, times=None):
-        """Calculate the intervall borders 'times' that contain the information
-           when a stroke started, when it ended and how it should be
-           interpolated."""
-        if times is None:
-            times = []
-        for stroke in pointlist:
-            stroke_info = {"start": stroke[0]['time'],
-                           "end": stroke[-1]['time'],
-                           "pen_down": True}
-            # set up variables for interpolation
-            x, y, t = [], [], []
-            for point in stroke:
-                if point['time'] not in t:
-                    x.append(point['x'])
-                    y.append(point['y'])
-                    t.append(point['time'])
-            x, y = numpy.array(x), numpy.array(y)
-            if len(t) == 1:
-                # constant interpolation
-                fx, fy = lambda x: float(x), lambda y: float(y)
-            elif len(t) == 2:
-                # linear interpolation
-                fx, fy = interp1d(t, x, 'linear'), interp1d(t, y, 'linear')
-            elif len(t) == 3:
-                # quadratic interpolation
-                fx = interp1d(t, x, 'quadratic')
-                fy = interp1d(t, y, 'quadratic')
-            else:
-                fx, fy = interp1d(t, x, self.kind), interp1d(t, y, self.kind)
-            stroke_info['fx'] = fx
-            stroke_info['fy'] = fy
-            times.append(stroke_info)
-        return times
-
-    def _calculate_pen_up_strokes(self, pointlist, times=None):
-        """ 'Pen-up' strokes are virtual strokes that were not drawn. It
-            models the time when the user moved from one stroke to the next.
-        """
-        if times is None:
-            times = []
-        for i in range(len(pointlist) - 1):
-            stroke_info = {"start": pointlist[i][-1]['time'],
-                           "end": pointlist[i + 1][0]['time'],
-                           "pen_down": False}
-            x, y, t = [], [], []
-            for point in [pointlist[i][-1], pointlist[i + 1][0]]:
-                if point['time'] not in t:
-                    x.append(point['x'])
-                    y.append(point['y'])
-                    t.append(point['time'])
-            if len(x) == 1:
-                # constant interpolation
-                fx, fy = lambda x: float(x), lambda y: float(y)
-            else:
-                # linear interpolation
-                x, y = numpy.array(x), numpy.array(y)
-                fx = interp1d(t, x, kind='linear')
-                fy = interp1d(t, y, kind='linear')
-            stroke_info['fx'] = fx
-            stroke_info['fy'] = fy
-            times.append(stroke_info)
-        return times
-
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
+    def apply_arrays(self, stroke_arrays):
         # Make sure that the lists are sorted
-        pointlist = hwr_obj.get_sorted_pointlist()
-
-        # Build 'times' datastructure which will contain information about
-        # strokes and when they were started / ended and how they should be
-        # interpolated
-        times = self._calculate_pen_down_strokes(pointlist)
-        times = self._calculate_pen_up_strokes(pointlist, times)
-
-        tnew = numpy.linspace(pointlist[0][0]['time'],
-                              pointlist[-1][-1]['time'],
-                              self.number)
-
-        # Create the new pointlist
-        new_pointlist = []
-        for time in tnew:
-            for stroke_interval in times:
-                if stroke_interval["start"] <= time <= stroke_interval["end"]:
-                    x = float(stroke_interval['fx'](time))
-                    y = float(stroke_interval['fy'](time))
-                    time = float(time)
-                    new_pointlist.append({'x': x, 'y': y, 'time': time,
-                                          'pen_down':
-                                          stroke_interval['pen_down']})
-        hwr_obj.set_pointlist([new_pointlist])
-
-
-class SpaceEvenlyPerStroke(object):
+        stroke_arrays.sort()
+        points = stroke_arrays.points
+        stroke_offsets = stroke_arrays.stroke_offsets
+        if (numpy.diff(stroke_offsets) == 0).any():
+            raise IndexError("SpaceEvenly needs strokes with at least one "
+                             "point.")
+        firsts, lasts = stroke_offsets[:-1], stroke_offsets[1:] - 1
+        stroke_count = len(firsts)
+
+        # Every interval is either a stroke ('pen-down') or the 'pen-up'
+        # movement from the last point of a stroke to the first point of the
+        # next stroke. The pen-up intervals follow the pen-down intervals.
+        # An interval gets interpolated between the points with the first
+        # ``time_counts`` different times.
+        new_time = numpy.ones(len(points), dtype=bool)
+        new_time[1:] = points[1:, 2] != points[:-1, 2]
+        new_time[firsts] = True
+        interval_firsts = numpy.concatenate((firsts, lasts[:-1]))
+        interval_seconds = numpy.concatenate(
+            (_get_second_time_index(new_time, stroke_offsets), firsts[1:]))
+        starts = points[interval_firsts, 2]
+        ends = points[numpy.concatenate((lasts, firsts[1:])), 2]
+        time_counts = numpy.concatenate(
+            (numpy.add.reduceat(new_time, firsts, dtype=numpy.intp),
+             numpy.full(stroke_count - 1, 2)))
+        time_counts[starts == ends] = 1
+
+        tnew = numpy.linspace(starts[0], ends[stroke_count - 1], self.number)
+        samples, intervals = _assign_to_intervals(tnew, starts, ends,
+                                                  stroke_count)
+        times = tnew[samples]
+        sample_time_counts = time_counts[intervals]
+        x = numpy.empty(len(times))
+        y = numpy.empty(len(times))
+
+        # constant interpolation
+        constant = sample_time_counts == 1
+        x[constant] = times[constant]
+        y[constant] = times[constant]
+
+        # linear interpolation
+        linear = sample_time_counts == 2
+        x[linear], y[linear] = _interpolate_linear(
+            points[interval_firsts[intervals[linear]]],
+            points[interval_seconds[intervals[linear]]],
+            times[linear])
+
+        # quadratic interpolation for 3 times, 'kind' for more
+        splines = numpy.flatnonzero(time_counts > 2)
+        spline_samples = numpy.flatnonzero(sample_time_counts > 2)
+        spline_samples = spline_samples[numpy.argsort(
+            intervals[spline_samples], kind='stable')]
+        bounds = numpy.searchsorted(intervals[spline_samples],
+                                    numpy.append(splines, len(starts)))
+        for i, start, end in zip(splines.tolist(), bounds[:-1].tolist(),
+                                 bounds[1:].tolist()):
+            if start == end:
+                # No sample is within this stroke
+                continue
+            kind = 'quadratic' if time_counts[i] == 3 else self.kind
+            stroke = points[firsts[i]:lasts[i] + 1][
+                new_time[firsts[i]:lasts[i] + 1]]
+            selected = spline_samples[start:end]
+            # x and y are interpolated separately, because a spline for both
+            # at once gives slightly different values.
+            x[selected] = interp1d(stroke[:, 2], stroke[:, 0],
+                                   kind)(times[selected])
+            y[selected] = interp1d(stroke[:, 2], stroke[:, 1],
+                                   kind)(times[selected])
+
+        stroke_arrays.set_points(numpy.column_stack((x, y, times)),
+                                 [0, len(times)],
+                                 intervals < stroke_count,
+                                 (False, False, False))
+
+
+class SpaceEvenlyPerStroke(PreprocessingAlgorithm):
     """Space the points evenly for every single stroke separately. The
        parameter `number` defines how many points are used per stroke and the
        parameter `kind` defines which kind of interpolation is used. Possible
-       values include `cubic`, `quadratic`, `linear`, `nearest`. This part of
-       the implementation relies on
-       :mod:`scipy.interpolate.interp1d <scipy:scipy.interpolate.interp1d>`.
+       values include `cubic`, `quadratic`, `linear`, `nearest`.
+
+       `cubic`, `quadratic` and `linear` interpolation is done for all strokes
+       at once. The splines are the same as the ones of
+       :mod:`scipy.interpolate.interp1d <scipy:scipy.interpolate.interp1d>`
+       (up to rounding errors), which is used for all other kinds.
+       Strokes with 2 or 3 points or with several points at the same time
+       are interpolated linearly.
     """
     def __init__(self, number=100, kind='cubic'):
         self.number = number
@@ -379,34 +532,22 @@ class SpaceEvenlyPerStroke(object):
                 " - kind: %s\n") % \
             (self.number, self.kind)
 
-    def _space(self, hwr_obj, stroke, kind):
-        """Do the interpolation of 'kind' for 'stroke'"""
-        new_stroke = []
-        stroke = sorted(stroke, key=lambda p: p['time'])
-
-        x, y, t = [], [], []
-
-        for point in stroke:
-            x.append(point['x'])
-            y.append(point['y'])
-            t.append(point['time'])
-
-        x, y = numpy.array(x), numpy.array(y)
+    def _space(self, raw_data_id, stroke, kind, tnew):
+        """Do the interpolation of 'kind' for 'stroke' with scipy"""
+        x, y, t = stroke[:, 0], stroke[:, 1], stroke[:, 2]
         failed = False
         try:
             fx = interp1d(t, x, kind=kind)
             fy = interp1d(t, y, kind=kind)
         except Exception as e:  # pylint: disable=W0703
-            if hwr_obj.raw_data_id is not None:
+            if raw_data_id is not None:
                 logging.debug("spline failed for raw_data_id %i",
-                              hwr_obj.raw_data_id)
+                              raw_data_id)
             else:
                 logging.debug("spline failed")
             logging.debug(e)
             failed = True
 
-        tnew = numpy.linspace(t[0], t[-1], self.number)
-
         # linear interpolation fallback due to
         # https://github.com/scipy/scipy/issues/3868
         if failed:
@@ -416,40 +557,91 @@ class SpaceEvenlyPerStroke(object):
                 failed = False
             except Exception as e:
                 logging.debug("len(stroke) = %i", len(stroke))
-                logging.debug("len(x) = %i", len(x))
-                logging.debug("len(y) = %i", len(y))
                 logging.debug("stroke=%s", stroke)
                 raise e
 
-        for x, y, t in zip(fx(tnew), fy(tnew), tnew):
-            new_stroke.append({'x': x, 'y': y, 'time': t})
-        return new_stroke
-
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        pointlist = hwr_obj.get_sorted_pointlist()
-        new_pointlist = []
-
-        for stroke in pointlist:
-            if len(stroke) < 2:
-                # Don't do anything if there are less than 2 points
-                new_stroke = stroke
-            elif 2 <= len(stroke) <= 3:
-                # Linear interpolation for 2 or 3 points
-                new_stroke = self._space(hwr_obj,
-                                         stroke,
-                                         'linear')
+        return numpy.column_stack((fx(tnew), fy(tnew)))
+
+    def apply_arrays(self, stroke_arrays):
+        stroke_arrays.sort()
+        points = stroke_arrays.points
+        stroke_offsets = stroke_arrays.stroke_offsets
+        lengths = numpy.diff(stroke_offsets)
+        # Don't do anything with strokes of less than 2 points
+        spaced = numpy.flatnonzero(lengths >= 2)
+        if len(spaced) == 0:
+            return
+
+        # Strokes with 2 or 3 points are interpolated linearly. Splines need
+        # increasing times, so the same is done for strokes with several
+        # points at the same time.
+        linear = lengths[spaced] <= 3
+        if self.kind in ('cubic', 'quadratic'):
+            # same_time[i] is the number of points before point i which
+            # have the same time as their predecessor in the stroke
+            same_time = numpy.zeros(len(points) + 1, dtype=numpy.intp)
+            same_time[2:] = points[1:, 2] == points[:-1, 2]
+            same_time[stroke_offsets[:-1][lengths > 0] + 1] = 0
+            numpy.cumsum(same_time, out=same_time)
+            linear |= same_time[stroke_offsets[spaced + 1]] > \
+                same_time[stroke_offsets[spaced] + 1]
+        if self.kind in ('cubic', 'quadratic', 'linear'):
+            kinds = numpy.where(linear, 'linear', self.kind)
+        else:
+            kinds = numpy.where(linear, 'linear', 'scipy')
+
+        tnew = _linspace(points[stroke_offsets[spaced], 2],
+                         points[stroke_offsets[spaced + 1] - 1, 2],
+                         self.number)
+        values = numpy.empty((len(spaced), self.number, 2))
+        for kind in set(kinds.tolist()):
+            selected = numpy.flatnonzero(kinds == kind)
+            strokes = spaced[selected]
+            if kind == 'scipy':
+                for i, stroke in zip(selected.tolist(), strokes.tolist()):
+                    values[i] = self._space(
+                        stroke_arrays.raw_data_id,
+                        points[stroke_offsets[stroke]:
+                               stroke_offsets[stroke + 1]],
+                        self.kind, tnew[i])
+                continue
+            point_indices, offsets = \
+                handwritten_data._get_point_indices(stroke_offsets, strokes)
+            if kind == 'linear':
+                values[selected] = _interpolate_strokes_linear(
+                    points[point_indices], offsets, tnew[selected])
             else:
-                new_stroke = self._space(hwr_obj,
-                                         stroke,
-                                         self.kind)
-            new_pointlist.append(new_stroke)
-        hwr_obj.set_pointlist(new_pointlist)
-
-
-class DouglasPeucker(object):
+                values[selected] = _interpolate_strokes_spline(
+                    points[point_indices], offsets, tnew[selected],
+                    {'quadratic': 2, 'cubic': 3}[kind])
+
+        # Put the new points of the spaced strokes and the other strokes
+        # together
+        new_lengths = lengths.copy()
+        new_lengths[spaced] = self.number
+        new_offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.intp)
+        numpy.cumsum(new_lengths, out=new_offsets[1:])
+        new_points = numpy.empty((new_offsets[-1], 3))
+        new_pen_down = None
+        if stroke_arrays.pen_down is not None:
+            new_pen_down = numpy.full(len(new_points), -1, dtype=numpy.int8)
+        kept = numpy.flatnonzero(lengths < 2)
+        if len(kept) > 0:
+            source = handwritten_data._get_point_indices(stroke_offsets,
+                                                         kept)[0]
+            target = handwritten_data._get_point_indices(new_offsets,
+                                                         kept)[0]
+            new_points[target] = points[source]
+            if new_pen_down is not None:
+                new_pen_down[target] = stroke_arrays.pen_down[source]
+        target = handwritten_data._get_point_indices(new_offsets, spaced)[0]
+        new_points[target, :2] = values.reshape(-1, 2)
+        new_points[target, 2] = tnew.reshape(-1)
+        stroke_arrays.set_points(new_points, new_offsets, new_pen_down,
+                                 (False, False, False))
+
+
+class DouglasPeucker(PreprocessingAlgorithm):
     """Apply the Douglas-Peucker stroke simplification algorithm separately to
        each stroke of the recording. The algorithm has a threshold parameter
        `epsilon` that indicates how much the stroke is simplified. The smaller
@@ -464,52 +656,20 @@ class DouglasPeucker(object):
     def __str__(self):
         return "DouglasPeucker (epsilon: %0.2f)\n" % self.epsilon
 
-    def _stroke_simplification(self, pointlist):
-        """The Douglas-Peucker line simplification takes a list of points as an
-           argument. It tries to simplifiy this list by removing as many points
-           as possible while still maintaining the overall shape of the stroke.
-           It does so by taking the first and the last point, connecting them
-           by a straight line and searchin for the point with the highest
-           distance. If that distance is bigger than 'epsilon', the point is
-           important and the algorithm continues recursively."""
-
-        # Find the point with the biggest distance
-        dmax = 0
-        index = 0
-        for i in range(1, len(pointlist)):
-            d = geometry.perpendicular_distance(pointlist[i],
-                                                pointlist[0],
-                                                pointlist[-1])
-            if d > dmax:
-                index = i
-                dmax = d
-
-        # If the maximum distance is bigger than the threshold 'epsilon', then
-        # simplify the pointlist recursively
-        if dmax >= self.epsilon:
-            # Recursive call
-            rec_results1 = self._stroke_simplification(pointlist[0:index])
-            rec_results2 = self._stroke_simplification(pointlist[index:])
-            result_list = rec_results1[:-1] + rec_results2
-        else:
-            result_list = [pointlist[0], pointlist[-1]]
-
-        return result_list
-
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        pointlist = hwr_obj.get_pointlist()
-
-        for i in range(0, len(pointlist)):
-            pointlist[i] = self._stroke_simplification(pointlist[i])
-        hwr_obj.set_pointlist(pointlist)
+    def apply_arrays(self, stroke_arrays):
+        points = stroke_arrays.points
+        indices, stroke_offsets = \
+            geometry.douglas_peucker(points, self.epsilon,
+                                     stroke_arrays.stroke_offsets)
+        pen_down = stroke_arrays.pen_down
+        if pen_down is not None:
+            pen_down = pen_down[indices]
+        stroke_arrays.set_points(points[indices], stroke_offsets, pen_down)
         # This might have duplicated points! Filter them!
-        hwr_obj.preprocessing([RemoveDuplicateTime()])
+        RemoveDuplicateTime().apply_arrays(stroke_arrays)
 
 
-class StrokeConnect(object):
+class StrokeConnect(PreprocessingAlgorithm):
     """`StrokeConnect`: Detect if strokes were probably accidentally
        disconnected. If that is the case, connect them. This is detected by the
        threshold parameter `minimum_distance`. If the distance between the end
@@ -527,36 +687,30 @@ class StrokeConnect(object):
         return "Stroke connect (minimum_distance: %0.2f)" % \
             self.minimum_distance
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        pointlist = hwr_obj.get_pointlist()
+    def apply_arrays(self, stroke_arrays):
+        offsets = stroke_arrays.stroke_offsets.tolist()
+        points = stroke_arrays.points
 
         # Connecting strokes makes only sense when there are multiple strokes
-        if len(pointlist) > 1:
-            strokes = []
-            last_appended = False
+        if len(offsets) > 2:
+            merged = []
             i = 0
-            while i < len(pointlist) - 1:
-                last_point = pointlist[i][-1]
-                first_point = pointlist[i + 1][0]
-                if euclidean_distance(last_point, first_point) < \
+            while i < len(offsets) - 2:
+                last_point = points[offsets[i + 1] - 1].tolist()
+                first_point = points[offsets[i + 1]].tolist()
+                if math.sqrt((last_point[0] - first_point[0])**2 +
+                             (last_point[1] - first_point[1])**2) < \
                    self.minimum_distance:
-                    strokes.append(pointlist[i] + pointlist[i + 1])
-                    pointlist[i + 1] = strokes[-1]
-                    if i == len(pointlist) - 2:
-                        last_appended = True
+                    # Connect stroke i with stroke i + 1
+                    merged.append(i + 1)
                     i += 1
-                else:
-                    strokes.append(pointlist[i])
                 i += 1
-            if not last_appended:
-                strokes.append(pointlist[-1])
-            hwr_obj.set_pointlist(strokes)
+            if len(merged) > 0:
+                stroke_arrays.stroke_offsets = \
+                    numpy.delete(stroke_arrays.stroke_offsets, merged)
 
 
-class DotReduction(object):
+class DotReduction(PreprocessingAlgorithm):
     """
     Reduce strokes where the maximum distance between points is below a
     `threshold` to a single dot.
@@ -572,71 +726,98 @@ class DotReduction(object):
         return "DotReduction (threshold: %0.2f)" % \
             self.threshold
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-
-        def _get_max_distance(ps):
-            """
-            Find the maximum distance between two points in a list of points
+    def _is_dot(self, stroke):
+        """
+        Check if the maximum distance between two points of a stroke is
+        below the threshold.
 
-            Parameters
-            ----------
-            ps : list
-                list of points
+        Parameters
+        ----------
+        stroke : numpy array
+            points of a stroke with at least two points
 
-            Returns
-            -------
-            float
-                maximum distance bewtween two points
-            """
-            if len(ps) <= 1:
-                return -1
-            else:
-                max_dist = euclidean_distance(ps[0], ps[1])
-                for i in range(len(ps) - 1):
-                    for j in range(i + 1, len(ps)):
-                        max_dist = max(euclidean_distance(ps[i], ps[j]),
-                                       max_dist)
-                return max_dist
-
-        def _get_average_point(pointlist):
+        Returns
+        -------
+        bool
+        """
+        # Compare blocks of rows against all points, so that strokes with
+        # many points stop as soon as one distance reaches the threshold
+        block_size = max(1, 2**16 // len(stroke))
+        for start in range(0, len(stroke), block_size):
+            block = stroke[start:start + block_size]
+            dx = block[:, 0, numpy.newaxis] - stroke[:, 0]
+            dy = block[:, 1, numpy.newaxis] - stroke[:, 1]
+            if not (numpy.sqrt(dx**2 + dy**2) < self.threshold).all():
+                return False
+        return True
+
+    def apply_arrays(self, stroke_arrays):
+        def _get_average_point(stroke):
             """
             Calculate the average point.
 
             Parameters
             ----------
-            pointlist : list
-                list of points
+            stroke : numpy array
+                points of a stroke
 
             Returns
             -------
-            dict :
+            list :
                 a single point
             """
-            x, y, t = 0, 0, 0
-            for point in pointlist:
-                x += point['x']
-                y += point['y']
-                t += point['time']
-            x = float(x) / len(pointlist)
-            y = float(y) / len(pointlist)
-            t = float(t) / len(pointlist)
-            return {'x': x, 'y': y, 'time': t}
-
-        new_pointlist = []
-        pointlist = hwr_obj.get_pointlist()
-        for stroke in pointlist:
-            new_stroke = stroke
-            if len(stroke) > 1 and _get_max_distance(stroke) < self.threshold:
-                new_stroke = [_get_average_point(stroke)]
-            new_pointlist.append(new_stroke)
-
-        hwr_obj.set_pointlist(new_pointlist)
-
-
-class WildPointFilter(object):
+            return [float(sum(column)) / len(stroke)
+                    for column in stroke.T.tolist()]
+
+        points = stroke_arrays.points
+        stroke_offsets = stroke_arrays.stroke_offsets
+        lengths = stroke_arrays.get_stroke_lengths()
+        if not (lengths > 1).any():
+            return
+        # The bounding box decides most strokes: No two points are further
+        # apart than its diagonal and the points on opposite sides are at
+        # least as far apart as its larger side.
+        starts = stroke_offsets[:-1][lengths > 0]
+        sides = (numpy.maximum.reduceat(points[:, :2], starts) -
+                 numpy.minimum.reduceat(points[:, :2], starts))
+        is_dot = numpy.zeros(len(lengths), dtype=bool)
+        is_dot[lengths > 0] = numpy.sqrt((sides**2).sum(axis=1)) < \
+            self.threshold
+        undecided = numpy.zeros(len(lengths), dtype=bool)
+        undecided[lengths > 0] = ~is_dot[lengths > 0] & \
+            (sides.max(axis=1) < self.threshold)
+        is_dot &= lengths > 1
+        for i in numpy.flatnonzero(undecided & (lengths > 1)).tolist():
+            is_dot[i] = self._is_dot(points[stroke_offsets[i]:
+                                            stroke_offsets[i + 1]])
+        if not is_dot.any():
+            return
+
+        new_strokes, pen_down = [], []
+        old_pen_down = stroke_arrays.pen_down
+        for start, stroke, reduce_stroke in zip(stroke_offsets.tolist(),
+                                                stroke_arrays.get_strokes(),
+                                                is_dot.tolist()):
+            if reduce_stroke:
+                new_strokes.append([_get_average_point(stroke)])
+                pen_down.append([-1])
+            else:
+                new_strokes.append(stroke)
+                if old_pen_down is not None:
+                    pen_down.append(old_pen_down[start:start + len(stroke)])
+        stroke_offsets = numpy.zeros(len(new_strokes) + 1, dtype=numpy.intp)
+        numpy.cumsum([len(stroke) for stroke in new_strokes],
+                     out=stroke_offsets[1:])
+        if old_pen_down is not None:
+            pen_down = numpy.concatenate(pen_down)
+        else:
+            pen_down = None
+        stroke_arrays.set_points(numpy.concatenate(new_strokes),
+                                 stroke_offsets, pen_down,
+                                 (False, False, False))
+
+
+class WildPointFilter(PreprocessingAlgorithm):
     """Find wild points and remove them. The threshold means
        speed in pixels / ms.
     """
@@ -651,39 +832,27 @@ class WildPointFilter(object):
         return "Wild point filter (threshold: %0.2f)" % \
             self.threshold
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        new_pointlist = []
-        pointlist = hwr_obj.get_sorted_pointlist()
-        for stroke in pointlist:
-            new_stroke = []
-            for last_point, point in zip(stroke, stroke[1:]):
-                space_dist = math.hypot(last_point['x'] - point['x'],
-                                        last_point['y'] - point['y'])
-                time_dist = float(point['time'] - last_point['time'])
-                if time_dist == 0:
-                    continue
-                speed = space_dist / time_dist
-                if speed < self.threshold:
-                    new_stroke.append(point)
-
-            new_pointlist.append(new_stroke)
+    def apply_arrays(self, stroke_arrays):
+        # The points which are faster than the threshold are not removed yet.
         # Bounding box criterion:
         # If the distance from point to all others strokes bounding boxes is
         # more than 1/5 of the whole size, it is a wild point
+        pass
 
 
-class WeightedAverageSmoothing(object):
+class WeightedAverageSmoothing(PreprocessingAlgorithm):
     """Smooth every stroke by a weighted average. This algorithm takes a list
-       `theta` of 3 numbers that are the weights used for smoothing."""
+       `theta` of an odd number of weights (3 by default) that are used for
+       smoothing. Points which are too close to the beginning or the end of
+       their stroke for the whole window use the largest centered window
+       which fits into the stroke. The first and the last point of every
+       stroke are not changed."""
     def __init__(self, theta=None):
-        """Theta is a list of 3 non-negative numbers"""
+        """Theta is a list of an odd number of non-negative numbers"""
         if theta is None:
             theta = [1. / 6, 4. / 6, 1. / 6]
-        assert len(theta) == 3, \
-            "theta has length %i, but should have length 3" % \
+        assert len(theta) % 2 == 1, \
+            "theta has length %i, but should have an odd length" % \
             len(theta)
         theta = [float(element) for element in theta]
 
@@ -697,36 +866,271 @@ class WeightedAverageSmoothing(object):
         return "Weighted average smoothing (theta: %s)" % \
             self.theta
 
-    def _calculate_average(self, points):
-        """Calculate the arithmetic mean of the points x and y coordinates
-           seperately.
-        """
-        assert len(self.theta) == len(points), \
-            "points has length %i, but should have length %i" % \
-            (len(points), len(self.theta))
-        new_point = {'x': 0, 'y': 0, 'time': 0}
-        for key in new_point:
-            new_point[key] = self.theta[0] * points[0][key] + \
-                self.theta[1] * points[1][key] + \
-                self.theta[2] * points[2][key]
-        return new_point
+    def _get_weights(self, window_radius):
+        """Get the normalized weights of the centered window with
+           ``2 * window_radius + 1`` points."""
+        radius = len(self.theta) // 2
+        if window_radius == radius:
+            return self.theta
+        theta = self.theta[radius - window_radius:radius + window_radius + 1]
+        return list(1. / sum(theta) * numpy.array(theta))
+
+    def apply_arrays(self, stroke_arrays):
+        stroke_arrays.sort()
+        lengths = stroke_arrays.get_stroke_lengths()
+        if (lengths == 0).any():
+            raise IndexError("WeightedAverageSmoothing needs strokes with at "
+                             "least one point.")
+        if not (lengths > 2).any():
+            return
+        points = stroke_arrays.points
+        stroke_offsets = stroke_arrays.stroke_offsets
+        # The radius of the window around each point which fits into its
+        # stroke
+        indices = numpy.arange(len(points))
+        radii = numpy.minimum(
+            indices - numpy.repeat(stroke_offsets[:-1], lengths),
+            numpy.repeat(stroke_offsets[1:] - 1, lengths) - indices)
+        numpy.minimum(radii, len(self.theta) // 2, out=radii)
+        radius = len(self.theta) // 2
+        # Points close to the beginning or the end of a stroke are rare, so
+        # their neighbors get gathered ...
+        averages = []
+        for window_radius in range(1, radius):
+            centers = numpy.flatnonzero(radii == window_radius)
+            weights = self._get_weights(window_radius)
+            average = weights[0] * points[centers - window_radius]
+            for offset, weight in enumerate(weights[1:], 1):
+                average += weight * points[centers - window_radius + offset]
+            averages.append((centers, average))
+        # ... while shifted slices of all points are cheaper for the others
+        end = len(points) - radius
+        if end > radius:
+            average = self.theta[0] * points[:end - radius]
+            for offset, weight in enumerate(self.theta[1:], 1):
+                average += weight * points[offset:end - radius + offset]
+            numpy.copyto(points[radius:end], average,
+                         where=(radii[radius:end] == radius)[:, numpy.newaxis])
+        for centers, average in averages:
+            points[centers] = average
+        if stroke_arrays.pen_down is not None:
+            stroke_arrays.pen_down[radii > 0] = -1
+        stroke_arrays.integral = (False, False, False)
+
+
+def _get_second_time_index(new_time, stroke_offsets):
+    """Get the index of the first point of every time sorted stroke which has
+       another time than the first point of the stroke. ``new_time`` tells
+       for every point if its time differs from the point before within the
+       stroke. Strokes with a single time get the index of their last
+       point."""
+    later_times = numpy.flatnonzero(new_time)
+    positions = numpy.searchsorted(later_times, stroke_offsets[:-1],
+                                   side='right')
+    later_times = numpy.append(later_times, len(new_time))
+    return numpy.minimum(later_times[positions], stroke_offsets[1:] - 1)
+
+
+def _assign_to_intervals(times, starts, ends, stroke_count):
+    """Find all pairs of a time and an interval with
+       ``start <= time <= end``, ordered by time and then by interval.
+
+    The first ``stroke_count`` intervals are strokes and the others are the
+    gaps between them. If the strokes do not overlap in time, the intervals
+    are found with ``numpy.searchsorted``.
+
+    Returns
+    -------
+    tuple of numpy arrays :
+        (sample_indices, interval_indices)
+
+    Examples
+    --------
+    >>> samples, intervals = _assign_to_intervals(numpy.array([0., 1., 3.]),
+    ...                                           numpy.array([0., 2., 1.]),
+    ...                                           numpy.array([1., 3., 2.]),
+    ...                                           2)
+    >>> samples.tolist(), intervals.tolist()
+    ([0, 1, 1, 2], [0, 0, 2, 1])
+    """
+    if numpy.any(starts[1:stroke_count] < ends[:stroke_count - 1]):
+        # Overlapping strokes
+        return numpy.nonzero((starts <= times[:, numpy.newaxis]) &
+                             (times[:, numpy.newaxis] <= ends))
+    # In chronological order (stroke, gap, stroke, ...), both the starts and
+    # the ends are sorted. So the intervals which contain a time are
+    # consecutive.
+    order = numpy.empty(len(starts), dtype=numpy.intp)
+    order[0::2] = numpy.arange(stroke_count)
+    order[1::2] = numpy.arange(stroke_count, len(starts))
+    lower = numpy.searchsorted(ends[order], times, side='left')
+    upper = numpy.searchsorted(starts[order], times, side='right')
+    counts = numpy.maximum(upper - lower, 0)
+    samples = numpy.repeat(numpy.arange(len(times)), counts)
+    sample_offsets = numpy.zeros(len(times), dtype=numpy.intp)
+    numpy.cumsum(counts[:-1], out=sample_offsets[1:])
+    intervals = order[numpy.repeat(lower - sample_offsets, counts) +
+                      numpy.arange(len(samples))]
+    # Strokes come before gaps for the same time
+    sorting = numpy.lexsort((intervals, samples))
+    return samples[sorting], intervals[sorting]
+
+
+def _interpolate_linear(p1, p2, times):
+    """Interpolate linearly between the points ``p1`` and ``p2`` (each with
+       the columns x, y and time) like :func:`numpy.interp`."""
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        slope = (p2[:, :2] - p1[:, :2]) / (p2[:, 2] - p1[:, 2])[:, None]
+        values = slope * (times - p1[:, 2])[:, None] + p1[:, :2]
+    values = numpy.where((times == p1[:, 2])[:, None], p1[:, :2], values)
+    values = numpy.where((times == p2[:, 2])[:, None], p2[:, :2], values)
+    return values[:, 0], values[:, 1]
+
+
+def _linspace(starts, stops, number):
+    """Get ``number`` evenly spaced values from ``starts[i]`` to ``stops[i]``
+       in row ``i``. Every row is the same as :func:`numpy.linspace` gives
+       for it. (Called with arrays, numpy.linspace computes all rows
+       differently if a single row has the same start and stop.)
+
+    >>> _linspace(numpy.array([0., 1.]), numpy.array([1., 1.]), 3).tolist()
+    [[0.0, 0.5, 1.0], [1.0, 1.0, 1.0]]
+    """
+    steps = numpy.arange(number, dtype=numpy.float64)
+    if number > 1:
+        values = steps * ((stops - starts) / (number - 1))[:, numpy.newaxis]
+    else:
+        values = steps * (stops - starts)[:, numpy.newaxis]
+    values += starts[:, numpy.newaxis]
+    if number > 1:
+        values[:, -1] = stops
+    return values
+
+
+def _count_not_greater(values, value_groups, queries, query_groups,
+                       group_count):
+    """Count for every query the values of the same group which are not
+       greater than the query.
+
+    >>> _count_not_greater(numpy.array([1., 2., 3., 0.]),
+    ...                    numpy.array([0, 0, 0, 1]),
+    ...                    numpy.array([2., 0., 5.]),
+    ...                    numpy.array([0, 0, 1]), 2).tolist()
+    [2, 0, 1]
+    """
+    is_query = numpy.zeros(len(values) + len(queries), dtype=bool)
+    is_query[len(values):] = True
+    # Values come before queries which are equal
+    order = numpy.lexsort((is_query,
+                           numpy.concatenate((values, queries)),
+                           numpy.concatenate((value_groups, query_groups))))
+    values_before = numpy.cumsum(~is_query[order])
+    counts = numpy.empty(len(queries), dtype=numpy.intp)
+    counts[order[is_query[order]] - len(values)] = \
+        values_before[is_query[order]]
+    group_offsets = numpy.zeros(group_count + 1, dtype=numpy.intp)
+    numpy.cumsum(numpy.bincount(value_groups, minlength=group_count),
+                 out=group_offsets[1:])
+    return counts - group_offsets[query_groups]
+
+
+def _interpolate_strokes_linear(points, stroke_offsets, times):
+    """Interpolate x and y of every stroke linearly at ``times`` (one row per
+       stroke) like :func:`numpy.interp`. The points of every stroke have to
+       be sorted by time."""
+    stroke_count = len(stroke_offsets) - 1
+    lengths = numpy.diff(stroke_offsets)
+    time_strokes = numpy.repeat(numpy.arange(stroke_count), times.shape[1])
+    times = times.reshape(-1)
+    # The last point of every stroke with a time not greater than the
+    # sample time
+    lower = _count_not_greater(points[:, 2],
+                               numpy.repeat(numpy.arange(stroke_count),
+                                            lengths),
+                               times, time_strokes, stroke_count) - 1
+    lower = stroke_offsets[time_strokes] + numpy.maximum(lower, 0)
+    upper = numpy.minimum(lower + 1, stroke_offsets[time_strokes + 1] - 1)
+    x, y = _interpolate_linear(points[lower], points[upper], times)
+    return numpy.column_stack((x, y)).reshape(stroke_count, -1, 2)
+
+
+def _interpolate_strokes_spline(points, stroke_offsets, times, k):
+    """Interpolate x and y of every stroke with a spline of degree ``k`` (2
+       or 3) and evaluate it at ``times`` (one row per stroke).
+
+    The knots are the same as the ones of
+    :func:`scipy.interpolate.make_interp_spline` (not-a-knot). The B-spline
+    coefficients of all strokes are the solution of one banded linear
+    system. Every stroke needs at least 4 points with increasing times.
+    """
+    from scipy.linalg import solve_banded
+    stroke_count = len(stroke_offsets) - 1
+    lengths = numpy.diff(stroke_offsets)
+    point_strokes = numpy.repeat(numpy.arange(stroke_count), lengths)
+    local = numpy.arange(len(points)) - stroke_offsets[point_strokes]
+    point_times = points[:, 2]
+
+    # Inner knots: data points for odd k, midpoints for even k. The first and
+    # the last k // 2 are omitted.
+    if k % 2 == 1:
+        inner = (local >= (k + 1) // 2) & \
+            (local < lengths[point_strokes] - (k + 1) // 2)
+        inner_knots = point_times[inner]
+    else:
+        inner = (local >= k // 2) & \
+            (local < lengths[point_strokes] - 1 - k // 2)
+        inner_knots = (point_times[inner] +
+                       point_times[numpy.flatnonzero(inner) + 1]) / 2
+    inner_strokes = point_strokes[inner]
+
+    # All knots: the first and last time k + 1 times and the inner knots
+    knot_offsets = numpy.zeros(stroke_count + 1, dtype=numpy.intp)
+    numpy.cumsum(lengths + k + 1, out=knot_offsets[1:])
+    knot_strokes = numpy.repeat(numpy.arange(stroke_count),
+                                lengths + k + 1)
+    knot_local = numpy.arange(knot_offsets[-1]) - knot_offsets[knot_strokes]
+    knots = numpy.empty(knot_offsets[-1])
+    first = knot_local <= k
+    last = knot_local >= lengths[knot_strokes]
+    knots[first] = point_times[stroke_offsets[knot_strokes[first]]]
+    knots[last] = point_times[stroke_offsets[knot_strokes[last] + 1] - 1]
+    knots[~(first | last)] = inner_knots
+
+    def get_basis(x, x_strokes):
+        """Get the index of the first B-spline which is not zero at ``x`` and
+           the values of this and the following k B-splines (de Boor)."""
+        interval = k + _count_not_greater(inner_knots, inner_strokes,
+                                          x, x_strokes, stroke_count)
+        base = knot_offsets[x_strokes] + interval
+        basis = numpy.zeros((len(x), k + 1))
+        basis[:, 0] = 1
+        for j in range(1, k + 1):
+            previous = basis[:, :j].copy()
+            basis[:, 0] = 0
+            for n in range(1, j + 1):
+                xb = knots[base + n]
+                xa = knots[base + n - j]
+                w = previous[:, n - 1] / (xb - xa)
+                basis[:, n - 1] += w * (xb - x)
+                basis[:, n] = w * (x - xa)
+        return stroke_offsets[x_strokes] + interval - k, basis
+
+    # Interpolation conditions: the spline goes through all points
+    columns, basis = get_basis(point_times, point_strokes)
+    banded = numpy.zeros((2 * k + 1, len(points)))
+    rows = numpy.arange(len(points))
+    for i in range(k + 1):
+        banded[k + rows - (columns + i), columns + i] = basis[:, i]
+    coefficients = solve_banded((k, k), banded, points[:, :2],
+                                check_finite=False)
+
+    time_strokes = numpy.repeat(numpy.arange(stroke_count), times.shape[1])
+    columns, basis = get_basis(times.reshape(-1), time_strokes)
+    values = numpy.zeros((len(columns), 2))
+    for i in range(k + 1):
+        values += basis[:, i, numpy.newaxis] * coefficients[columns + i]
+    return values.reshape(stroke_count, -1, 2)
 
-    def __call__(self, hwr_obj):
-        assert isinstance(hwr_obj, handwritten_data.HandwrittenData), \
-            "handwritten data is not of type HandwrittenData, but of %r" % \
-            type(hwr_obj)
-        new_pointlist = []
-        pointlist = hwr_obj.get_sorted_pointlist()
-        for stroke in pointlist:
-            tmp = [stroke[0]]
-            new_pointlist.append(tmp)
-            if len(stroke) > 1:
-                for i in range(1, len(stroke) - 1):
-                    points = [stroke[i - 1], stroke[i], stroke[i + 1]]
-                    p = self._calculate_average(points)
-                    new_pointlist[-1].append(p)
-                new_pointlist[-1].append(stroke[-1])
-        hwr_obj.set_pointlist(new_pointlist)
 
 if __name__ == '__main__':
     import doctest
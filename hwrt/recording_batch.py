@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Many recordings of on-line handwritten data stored as one set of arrays.
+
+A :class:`RecordingBatch` concatenates the point arrays of all recordings
+(see :meth:`hwrt.handwritten_data.HandwrittenData.get_point_array`). Like a
+sparse matrix in CSR format it uses offsets to find the strokes of a
+recording and the points of a stroke:
+
+* ``stroke_offsets[j]:stroke_offsets[j + 1]`` are the rows of stroke ``j``
+  in ``points``.
+* ``recording_offsets[i]:recording_offsets[i + 1]`` are the strokes of
+  recording ``i``.
+
+This allows algorithms to work on all recordings with a few NumPy calls::
+
+    batch = RecordingBatch.from_handwriting_datasets(raw_datasets)
+    batch.get_points(3)  # a view on the points of the fourth recording
+"""
+
+import numpy
+
+# hwrt modules
+from . import handwritten_data
+
+
+class RecordingBatch(object):
+    """Represents many handwritten recordings as concatenated arrays.
+
+    Parameters
+    ----------
+    points : numpy array
+        An ``(n, 3)`` array with the columns ``x``, ``y`` and ``time`` of the
+        points of all recordings.
+    stroke_offsets : numpy array
+        ``k + 1`` increasing indices into ``points`` for ``k`` strokes.
+    recording_offsets : numpy array
+        ``m + 1`` increasing indices into the strokes for ``m`` recordings.
+    pen_down : numpy array or None
+        ``n`` values which are 1, 0 or -1 (no information).
+    """
+    def __init__(self, points, stroke_offsets, recording_offsets,
+                 pen_down=None):
+        points = numpy.array(points, dtype=numpy.float64).reshape(-1, 3)
+        stroke_offsets = numpy.array(stroke_offsets, dtype=numpy.intp)
+        recording_offsets = numpy.array(recording_offsets, dtype=numpy.intp)
+        assert len(stroke_offsets) >= 1 and stroke_offsets[0] == 0 and \
+            stroke_offsets[-1] == len(points), \
+            "stroke_offsets %s do not fit %i points" % (stroke_offsets,
+                                                        len(points))
+        assert len(recording_offsets) >= 1 and recording_offsets[0] == 0 and \
+            recording_offsets[-1] == len(stroke_offsets) - 1, \
+            "recording_offsets %s do not fit %i strokes" % \
+            (recording_offsets, len(stroke_offsets) - 1)
+        if pen_down is not None:
+            pen_down = numpy.array(pen_down, dtype=numpy.int8)
+            assert len(pen_down) == len(points)
+        # Views on the arrays are handed out, so they must not change.
+        for array in [points, stroke_offsets, recording_offsets, pen_down]:
+            if array is not None:
+                array.flags.writeable = False
+        self.points = points
+        self.stroke_offsets = stroke_offsets
+        self.recording_offsets = recording_offsets
+        self.pen_down = pen_down
+
+    @classmethod
+    def from_recordings(cls, recordings):
+        """Create a batch from a list of HandwrittenData objects."""
+        for recording in recordings:
+            assert isinstance(recording, handwritten_data.HandwrittenData), \
+                "recording is not of type HandwrittenData, but of %r" % \
+                type(recording)
+        points = [recording.get_point_array() for recording in recordings]
+        stroke_lengths = [numpy.diff(recording.get_stroke_offsets())
+                          for recording in recordings]
+        stroke_counts = [len(lengths) for lengths in stroke_lengths]
+        stroke_offsets = numpy.zeros(sum(stroke_counts) + 1,
+                                     dtype=numpy.intp)
+        recording_offsets = numpy.zeros(len(recordings) + 1,
+                                        dtype=numpy.intp)
+        if len(recordings) > 0:
+            points = numpy.concatenate(points)
+            numpy.cumsum(numpy.concatenate(stroke_lengths),
+                         out=stroke_offsets[1:])
+            numpy.cumsum(stroke_counts, out=recording_offsets[1:])
+        else:
+            points = numpy.zeros((0, 3))
+        pen_down = None
+        if any(recording.get_pen_down() is not None
+               for recording in recordings):
+            pen_down = numpy.concatenate(
+                [recording.get_pen_down()
+                 if recording.get_pen_down() is not None else
+                 numpy.full(len(recording.get_point_array()), -1,
+                            dtype=numpy.int8)
+                 for recording in recordings])
+        return cls(points, stroke_offsets, recording_offsets, pen_down)
+
+    @classmethod
+    def from_handwriting_datasets(cls, handwriting_datasets):
+        """Create a batch from the list ``handwriting_datasets`` of a
+           (raw or preprocessed) dataset pickle file. Every element is a
+           dictionary with the HandwrittenData object in ``'handwriting'``.
+        """
+        return cls.from_recordings([raw_data['handwriting']
+                                    for raw_data in handwriting_datasets])
+
+    def __len__(self):
+        return len(self.recording_offsets) - 1
+
+    def __repr__(self):
+        return "RecordingBatch(recordings=%i, strokes=%i, points=%i)" % \
+            (len(self), len(self.stroke_offsets) - 1, len(self.points))
+
+    def __str__(self):
+        return repr(self)
+
+    def get_point_offsets(self):
+        """Get ``m + 1`` indices into ``points`` where the recordings
+           start."""
+        return self.stroke_offsets[self.recording_offsets]
+
+    def get_point_counts(self):
+        """Get the number of points of every recording."""
+        return numpy.diff(self.get_point_offsets())
+
+    def get_stroke_counts(self):
+        """Get the number of strokes of every recording."""
+        return numpy.diff(self.recording_offsets)
+
+    def get_recording_index(self):
+        """Get the index of the recording for every point."""
+        return numpy.repeat(numpy.arange(len(self)), self.get_point_counts())
+
+    def get_points(self, index):
+        """Get a read-only view on the ``(n, 3)`` point array of the recording
+           ``index``."""
+        start, end = self.get_point_offsets()[[index, index + 1]]
+        return self.points[start:end]
+
+    def get_pen_down(self, index):
+        """Get a read-only view on the ``pen_down`` array of the recording
+           ``index`` or ``None``."""
+        if self.pen_down is None:
+            return None
+        start, end = self.get_point_offsets()[[index, index + 1]]
+        pen_down = self.pen_down[start:end]
+        if numpy.all(pen_down < 0):
+            return None
+        return pen_down
+
+    def get_stroke_offsets(self, index):
+        """Get the stroke offsets of the recording ``index`` relative to
+           :meth:`get_points`."""
+        start, end = self.recording_offsets[[index, index + 1]]
+        offsets = self.stroke_offsets[start:end + 1]
+        return offsets - offsets[0]
+
+    def update_recordings(self, recordings):
+        """Overwrite the strokes of ``recordings`` with the strokes of this
+           batch, e.g. after a batched preprocessing step.
+
+        Parameters
+        ----------
+        recordings : list of HandwrittenData objects
+            Must have as many elements as this batch has recordings.
+        """
+        assert len(recordings) == len(self), \
+            "Got %i recordings for a batch of %i recordings" % \
+            (len(recordings), len(self))
+        for index, recording in enumerate(recordings):
+            recording.set_point_array(self.get_points(index),
+                                      self.get_stroke_offsets(index),
+                                      self.get_pen_down(index))
@@ -17,7 +17,6 @@ This module contains algorithms for segmentation.
 """
 
 import logging
-import json
 
 import itertools
 import numpy
@@ -38,6 +37,7 @@ import theano.tensor as T
 import pymysql.cursors
 
 # hwrt modules
+from .. import codec
 from .. import utils
 from ..handwritten_data import HandwrittenData
 from .. import features
@@ -161,7 +161,7 @@ class SingleClassifier(object):
                            self.feature_list,
                            self.model,
                            self.output_semantics,
-                           json.dumps(parsed_json['data']),
+                           codec.dumps(parsed_json['data']),
                            parsed_json['id'])
         return results
 
@@ -190,8 +190,8 @@ def get_dataset():
     for i, data in enumerate(datasets):
         if i % 10 == 0:
             logging.info("[Create Dataset] i=%i/%i", i, len(datasets))
-        segmentation = json.loads(data['segmentation'])
-        recording = json.loads(data['data'])
+        segmentation = codec.loads(data['segmentation'])
+        recording = codec.loads(data['data'])
         X_symbol = [get_median_stroke_distance(recording)]
         if len([p for s in recording for p in s if p['time'] is None]) > 0:
             continue
@@ -274,7 +274,7 @@ def get_segmented_raw_data(top_n=10000):
                  len(datasets))
     for i in range(len(datasets)):
         if datasets[i]['segmentation'] is None:
-            stroke_count = len(json.loads(datasets[i]['data']))
+            stroke_count = len(codec.loads(datasets[i]['data']))
             if stroke_count > 10:
                 print("Massive stroke count! %i" % stroke_count)
             datasets[i]['segmentation'] = str([[s for s in
@@ -296,8 +296,8 @@ def filter_recordings(recordings):
     """
     new_recordings = []
     for recording in recordings:
-        recording['data'] = json.loads(recording['data'])
-        tmp = json.loads(recording['segmentation'])
+        recording['data'] = codec.loads(recording['data'])
+        tmp = codec.loads(recording['segmentation'])
         recording['segmentation'] = normalize_segmentation(tmp)
         had_none = False
         for stroke in recording['data']:
@@ -491,7 +491,7 @@ def get_stroke_features(recording, strokeid1, strokeid2):
     assert isinstance(stroke1, list), "stroke1 is a %s" % type(stroke1)
     X_i = []
     for s in [stroke1, stroke2]:
-        hw = HandwrittenData(json.dumps([s]))
+        hw = HandwrittenData.from_pointlist([s])
         feat1 = features.ConstantPointCoordinates(strokes=1,
                                                   points_per_stroke=20,
                                                   fill_empty_with=0)
@@ -506,12 +506,14 @@ def get_stroke_features(recording, strokeid1, strokeid2):
 
 
 def get_median_stroke_distance(recording):
-    dists = []
-    for s1_id in range(len(recording)-1):
-        for s2_id in range(s1_id+1, len(recording)):
-            dists.append(get_strokes_distance(recording[s1_id],
-                                              recording[s2_id]))
-    return numpy.median(dists)
+    segments = [_get_stroke_segments(stroke) for stroke in recording]
+    segment_offsets = numpy.zeros(len(segments) + 1, dtype=numpy.intp)
+    numpy.cumsum([len(stroke) for stroke in segments],
+                 out=segment_offsets[1:])
+    dists = geometry.get_polylines_distances(
+        numpy.concatenate([numpy.zeros((0, 2, 2))] + segments),
+        segment_offsets)
+    return numpy.median(dists[numpy.triu_indices(len(recording), 1)])
 
 
 def get_time_distance(s1, s2):
@@ -522,18 +524,20 @@ def get_time_distance(s1, s2):
     return min_dist
 
 
+def _get_stroke_segments(stroke):
+    """Get the ``(n, 2, 2)`` array of line segments of a stroke. A stroke
+       which is a single dot is one line segment of length 0."""
+    points = numpy.array([[p['x'], p['y']] for p in stroke],
+                         dtype=numpy.float64).reshape(-1, 2)
+    if len(points) == 1:
+        points = numpy.concatenate([points, points])
+    return geometry.get_polyline_segments(points)
+
+
 def get_strokes_distance(s1, s2):
-    if len(s1) == 1:
-        s1 += s1
-    if len(s2) == 1:
-        s2 += s2
-    stroke1 = geometry.PolygonalChain(s1)
-    stroke2 = geometry.PolygonalChain(s2)
-
-    min_dist = geometry.segments_distance(stroke1[0], stroke2[0])
-    for seg1, seg2 in itertools.product(stroke1, stroke2):
-        min_dist = min(min_dist, geometry.segments_distance(seg1, seg2))
-    return min_dist
+    distances = geometry.get_min_segments_distances(_get_stroke_segments(s1),
+                                                    _get_stroke_segments(s2))
+    return float(distances.min())
 
 
 def merge_segmentations(segs1, segs2, strokes=None):
@@ -877,7 +881,7 @@ class SingleSymbolStrokeClassifier(object):
                            self.feature_list,
                            self.model,
                            self.output_semantics,
-                           json.dumps(parsed_json['data']),
+                           codec.dumps(parsed_json['data']),
                            parsed_json['id'])
         return results
 
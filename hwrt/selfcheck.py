@@ -67,6 +67,8 @@ def check_python_modules():
                         'cPickle', 'theano', 'dropbox', 'yaml',
                         'webbrowser', 'hashlib', 'numpy',
                         'jinja2']
+    # Modules which are only used to speed things up if they are installed
+    optional_modules = ['orjson']
     found = []
     for required_module in required_modules:
         try:
@@ -80,6 +82,16 @@ def check_python_modules():
             print("module '%s' ... %sNOT%s found" % (required_module,
                                                      Bcolors.WARNING,
                                                      Bcolors.ENDC))
+    for optional_module in optional_modules:
+        try:
+            imp.find_module(optional_module)
+            print("module '%s' ... %sfound%s" % (optional_module,
+                                                 Bcolors.OKGREEN,
+                                                 Bcolors.ENDC))
+            found.append(optional_module)
+        except ImportError:
+            print("module '%s' ... not found (optional speedup)" %
+                  optional_module)
 
     if "argparse" in found:
         import argparse
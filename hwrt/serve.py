@@ -8,7 +8,6 @@ from flask import Flask, request, render_template
 from flask_bootstrap import Bootstrap
 import os
 import sys
-import json
 import requests
 import logging
 import uuid
@@ -22,6 +21,7 @@ if sys.version_info[0] == 2:
 
 # hwrt modules
 import hwrt
+from . import codec
 from . import utils
 from . import classify
 from . import segmentation as se
@@ -115,7 +115,7 @@ def get_json_result(results, n=10):
             break
         s.append(res)
         last = res['probability']
-    return json.dumps(s)
+    return codec.dumps(s)
 
 
 @app.route('/worker', methods=['POST', 'GET'])
@@ -133,13 +133,12 @@ def worker():
 
         # Check recording
         try:
-            json.loads(raw_data_json)
+            strokelist = codec.loads(raw_data_json)
         except ValueError:
             return "Invalid JSON string: %s" % raw_data_json
 
         # Classify
         if use_segmenter_flag:
-            strokelist = json.loads(raw_data_json)
             beam = utils.get_beam(secret_uuid)
 
             if beam is None:
@@ -273,7 +272,7 @@ def work():
         url = "http://www.martin-thoma.de/write-math/api/get_unclassified.php"
         response = urlopen(url)
         page_source = response.read()
-        parsed_json = json.loads(page_source)
+        parsed_json = codec.loads(page_source)
         if parsed_json is False:
             return "Nothing left to classify"
         raw_data_json = parsed_json['recording']
@@ -281,14 +280,13 @@ def work():
         # Classify
         # Check recording
         try:
-            json.loads(raw_data_json)
+            strokelist = codec.loads(raw_data_json)
         except ValueError:
             return ("Raw Data ID %s; Invalid JSON string: %s" %
                     (parsed_json['id'], raw_data_json))
 
         # Classify
         if use_segmenter_flag:
-            strokelist = json.loads(raw_data_json)
             beam = se.Beam()
             for stroke in strokelist:
                 beam.add_stroke(stroke)
@@ -296,7 +294,6 @@ def work():
         else:
             results_sym = classify.classify_segmented_recording(raw_data_json)
             results = []
-            strokelist = json.loads(raw_data_json)
             segmentation = [list(range(len(strokelist)))]
             translate = _get_translate()
             for symbol in results_sym:
@@ -322,7 +319,7 @@ def work():
         prepared = req.prepare()
         response = s.send(prepared)
         try:
-            response = json.loads(response.text)
+            response = codec.loads(response.text)
         except ValueError:
             return "Invalid JSON response: %s" % response.text
 
@@ -48,7 +48,8 @@ def update_if_outdated(folder):
             if "preprocessed" in target_folder:
                 logging.info("Preprocessed file was outdated. Update...")
                 preprocess_dataset.main(os.path.join(utils.get_project_root(),
-                                                     target_folder))
+                                                     target_folder),
+                                        incremental=True)
             elif "feature-files" in target_folder:
                 logging.info("Feature file was outdated. Update...")
                 create_ffiles.main(target_folder)
@@ -6,6 +6,7 @@
 from __future__ import print_function
 import inspect
 import imp
+import itertools
 import logging
 import sys
 import os
@@ -26,8 +27,13 @@ from decimal import Decimal, getcontext
 getcontext().prec = 100
 
 # hwrt modules
+from . import codec
 from . import handwritten_data
 
+# Pickled datasets of older versions refer to the module by these names
+sys.modules.setdefault('hwrt.HandwrittenData', handwritten_data)
+sys.modules.setdefault('HandwrittenData', handwritten_data)
+
 
 def print_status(total, current, start_time=None):
     """
@@ -35,13 +41,21 @@ def print_status(total, current, start_time=None):
 
     Parameters
     ----------
-    total : float
-        The total amount of work
+    total : float or None
+        The total amount of work. If it is not known, only the work that has
+        been done so far and the running time are shown.
     current : float
         The work that has been done so far
     start_time : int
         The start time in seconds since 1970 to estimate the remaining time.
     """
+    if total is None:
+        sys.stdout.write("\r%s done " % str(current))
+        if start_time is not None:
+            tmp = datetime.timedelta(seconds=int(time.time() - start_time))
+            sys.stdout.write("(%s running)   " % str(tmp))
+        sys.stdout.flush()
+        return
     percentage_done = float(current) / total
     sys.stdout.write("\r%0.2f%% " % (percentage_done * 100))
     if start_time is not None:
@@ -412,26 +426,178 @@ def create_hdf5(output_filename, feature_count, data):
         name of the HDF5 file that will be created
     feature_count : int
         dimension of all features combined
-    data : list of tuples
+    data : list of tuples or tuple
         list of (x, y) tuples, where x is the feature vector of dimension
-        ``feature_count`` and y is a label.
+        ``feature_count`` and y is a label - or one tuple (x, y) of a
+        ``(n, feature_count)`` feature matrix x and ``n`` labels y.
     """
     import h5py
     logging.info("Start creating of %s hdf file", output_filename)
-    x = []
-    y = []
-    for features, label in data:
-        assert len(features) == feature_count, \
+    if isinstance(data, tuple):
+        x, y = data
+        assert x.shape[1] == feature_count, \
             "Expected %i features, got %i features" % \
-            (feature_count, len(features))
-        x.append(features)
-        y.append(int(label))
+            (feature_count, x.shape[1])
+    else:
+        x = []
+        y = []
+        for features, label in data:
+            assert len(features) == feature_count, \
+                "Expected %i features, got %i features" % \
+                (feature_count, len(features))
+            x.append(features)
+            y.append(int(label))
     Wfile = h5py.File(output_filename, 'w')
     Wfile.create_dataset("data", data=x, dtype='float32')
     Wfile.create_dataset("labels", data=y, dtype='int32')
     Wfile.close()
 
 
+DATASET_STREAM_FORMAT = 'hwrt-record-stream'
+
+
+def write_dataset_stream(path, metadata, batches):
+    """
+    Write a dataset as record stream: A pickled header with the metadata is
+    followed by one pickled list of recordings per batch. In contrast to a
+    single pickled dictionary, such a file can be written and read without
+    holding all recordings in memory.
+
+    Parameters
+    ----------
+    path : str
+        Where the dataset gets stored
+    metadata : dict
+        Everything which belongs to the dataset except the recordings, e.g.
+        ``formula_id2latex``
+    batches : iterable
+        Lists of recordings (dictionaries with a 'handwriting' key)
+
+    Returns
+    -------
+    int :
+        Number of written recordings
+    """
+    header = dict(metadata)
+    header['format'] = DATASET_STREAM_FORMAT
+    recording_count = 0
+    with open(path, 'wb') as f:
+        pickle.dump(header, f, 2)
+        for batch in batches:
+            pickle.dump(list(batch), f, 2)
+            recording_count += len(batch)
+    return recording_count
+
+
+def iter_dataset(path):
+    """
+    Read a dataset batch by batch. Only record streams (see
+    :func:`write_dataset_stream`) are read incrementally; a single pickled
+    dictionary is one batch. The strokes of the recordings of a batch share
+    their memory (see :func:`hwrt.handwritten_data.pack_recordings`).
+
+    Parameters
+    ----------
+    path : str
+        A pickle file of a dataset
+
+    Returns
+    -------
+    tuple :
+        (metadata as dictionary, iterator over lists of recordings)
+    """
+    f = open(path, 'rb')
+    metadata = pickle.load(f)
+    if metadata.get('format') != DATASET_STREAM_FORMAT:
+        f.close()
+        recordings = metadata.pop('handwriting_datasets')
+        return metadata, iter([_pack_dataset(recordings)])
+    del metadata['format']
+
+    def read_batches():
+        with f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield _pack_dataset(batch)
+    return metadata, read_batches()
+
+
+def _pack_dataset(recordings):
+    """Reduce the memory which the recordings of a dataset need: the
+       strokes share arrays and equal metadata values share one object."""
+    values = {}
+
+    def share(value):
+        if type(value) in (int, str):
+            return values.setdefault((type(value), value), value)
+        return value
+    handwritings = []
+    for recording in recordings:
+        for key, value in recording.items():
+            recording[key] = share(value)
+        handwriting = recording.get('handwriting')
+        if isinstance(handwriting, handwritten_data.HandwrittenData):
+            for name in ['raw_data_id', 'formula_id', 'formula_in_latex',
+                         'user_id', 'user_name']:
+                if hasattr(handwriting, name):
+                    setattr(handwriting, name,
+                            share(getattr(handwriting, name)))
+            handwritings.append(handwriting)
+    handwritten_data.pack_recordings(handwritings)
+    return recordings
+
+
+def load_dataset(path):
+    """
+    Load a dataset which is stored either as a single pickled dictionary or
+    as record stream (see :func:`write_dataset_stream`).
+
+    Parameters
+    ----------
+    path : str
+        A pickle file of a dataset
+
+    Returns
+    -------
+    dict :
+        The metadata and the recordings as 'handwriting_datasets'
+    """
+    metadata, batches = iter_dataset(path)
+    dataset = dict(metadata)
+    dataset['handwriting_datasets'] = [recording
+                                       for batch in batches
+                                       for recording in batch]
+    return dataset
+
+
+def regroup_recordings(recordings, batch_size):
+    """
+    Group recordings in lists of at most `batch_size` recordings, e.g. to
+    write them with :func:`write_dataset_stream`. Only one list is held in
+    memory at a time.
+
+    Parameters
+    ----------
+    recordings : iterable
+        Recordings (dictionaries with a 'handwriting' key)
+    batch_size : int
+
+    Returns
+    -------
+    generator :
+        Lists of recordings
+    """
+    recordings = iter(recordings)
+    while True:
+        batch = list(itertools.islice(recordings, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
 def get_recognizer_folders(model_folder):
     """Get a list of folders [preprocessed, feature-files, model]."""
     folders = []
@@ -570,9 +736,8 @@ def evaluate_model_single_recording_preloaded_multisymbol(preprocessing_queue,
     recording :
         The handwritten recording in JSON format.
     """
-    import json
     import nntoolkit.evaluate
-    recording = json.loads(recording)
+    recording = codec.loads(recording)
     logging.info(("## start (%i strokes)" % len(recording)) + "#" * 80)
     hypotheses = []  # [[{'score': 0.123, symbols: [123, 123]}]  # split0
                      #  []] # Split i...
@@ -580,7 +745,8 @@ def evaluate_model_single_recording_preloaded_multisymbol(preprocessing_queue,
         recording_segmented = segment_by_split(split, recording)
         cur_split_results = []
         for i, symbol in enumerate(recording_segmented):
-            handwriting = handwritten_data.HandwrittenData(json.dumps(symbol))
+            handwriting = \
+                handwritten_data.HandwrittenData.from_pointlist(symbol)
             handwriting.preprocessing(preprocessing_queue)
             x = handwriting.feature_extraction(feature_list)
 
@@ -593,7 +759,6 @@ def evaluate_model_single_recording_preloaded_multisymbol(preprocessing_queue,
 
         # Now that I have all symbols of this split, I have to get all
         # combinations of the hypothesis
-        import itertools
         for hyp in itertools.product(*cur_split_results):
             hypotheses.append({'score': reduce(lambda x, y: x*y,
                                                [s['probability'] for s in hyp])*len(hyp)/len(recording),
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import nose
+import numpy
+import tests.testhelper as testhelper
+
+# hwrt modules
+from hwrt import codec
+
+
+# Tests
+def backends_test():
+    pointlist = testhelper.get_symbol_as_handwriting(97705).get_pointlist()
+    default_backend = codec.get_backend()
+    encoded = []
+    try:
+        for backend in codec.BACKENDS:
+            codec.set_backend(backend)
+            nose.tools.assert_equal(codec.get_backend(), backend)
+            encoded.append(codec.dumps(pointlist))
+            nose.tools.assert_equal(codec.loads(encoded[-1]), pointlist)
+    finally:
+        codec.set_backend(default_backend)
+    nose.tools.assert_equal(len(set(encoded)), 1)
+
+
+@nose.tools.raises(ValueError)
+def set_backend_unknown_test():
+    codec.set_backend('no such backend')
+
+
+def loads_nan_test():
+    value = codec.loads('[NaN]')[0]
+    assert numpy.isnan(value)
+
+
+def loads_strokes_test():
+    points, offsets, pen_down, integral, extra = codec.loads_strokes(
+        '[[{"x":1,"y":2.5,"time":null,"pen_down":true}],'
+        '[],[{"x":3,"y":4,"time":5}]]')
+    nose.tools.assert_equal(points[:, :2].tolist(), [[1, 2.5], [3, 4]])
+    assert numpy.isnan(points[0, 2])
+    nose.tools.assert_equal(offsets.tolist(), [0, 1, 1, 2])
+    nose.tools.assert_equal(pen_down.tolist(), [1, -1])
+    nose.tools.assert_equal(integral, (True, False, True))
+    # y of the second point is an integer in a column which is not integral
+    nose.tools.assert_equal(extra, [None, {'x': 3, 'y': 4, 'time': 5}])
+
+
+def loads_strokes_extra_test():
+    points, offsets, pen_down, integral, extra = codec.loads_strokes(
+        '[[{"x":1,"y":2,"time":3,"pressure":0.5},{"x":1.5,"y":2,"time":4},'
+        '{"x":2,"y":3,"time":5,"pen_down":1}]]')
+    nose.tools.assert_equal(points.tolist(), [[1, 2, 3], [1.5, 2, 4],
+                                              [2, 3, 5]])
+    nose.tools.assert_equal(integral, (False, True, True))
+    # The first point has an additional key and an integer x, the last one
+    # an integer x and an integer instead of a bool for pen_down
+    nose.tools.assert_equal(extra, [{'x': 1, 'y': 2, 'time': 3,
+                                     'pressure': 0.5},
+                                    None,
+                                    {'x': 2, 'y': 3, 'time': 5,
+                                     'pen_down': 1}])
+
+
+@nose.tools.raises(ValueError)
+def loads_strokes_no_list_test():
+    codec.loads_strokes('{"x":1}')
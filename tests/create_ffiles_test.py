@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import functools
 import os
+import shutil
+import tempfile
 import nose
+import numpy
 import tests.testhelper as th
 
 # hwrt modules
@@ -14,6 +18,23 @@ import hwrt.data_multiplication as data_multiplication
 import hwrt.utils as utils
 
 
+def in_temporary_directory(test):
+    """Run `test` in a new temporary directory, so that the files it writes
+       to the current directory (like featurenormalization.csv) do not end
+       up in the working tree."""
+    @functools.wraps(test)
+    def wrapper():
+        cwd = os.getcwd()
+        directory = tempfile.mkdtemp()
+        try:
+            os.chdir(directory)
+            test()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(directory)
+    return wrapper
+
+
 # Tests
 def training_set_multiplication_test():
     """Test the create_ffiles.training_set_multiplication method."""
@@ -28,6 +49,7 @@ def training_set_multiplication_test():
     # nose.tools.assert_equal(len(feature_list), len(correct))
 
 
+@in_temporary_directory
 def execution_test():
     formula_id2index = {1337: 1, 12: 2}
     feature_folder = '.'
@@ -59,6 +81,7 @@ def prepare_dataset_test():
                                   is_traindata)
 
 
+@in_temporary_directory
 def normalize_features_one_test():
     """Test create_ffiles._normalize_features with one point."""
     feature_list = [features.Width(), features.Height()]
@@ -70,6 +93,7 @@ def normalize_features_one_test():
     nose.tools.assert_equal(out, [([0.0], 1)])
 
 
+@in_temporary_directory
 def normalize_features_two_test():
     """Test create_ffiles._normalize_features with two points."""
     feature_list = [features.Width(), features.Height()]
@@ -92,6 +116,7 @@ def normalize_features_two_test():
                                   ([2.9782608695652173], 1)])
 
 
+@in_temporary_directory
 def normalize_features_two_feats_test():
     """Test create_ffiles._normalize_features with two points."""
     feature_list = [features.Width(), features.Height()]
@@ -114,6 +139,7 @@ def normalize_features_two_feats_test():
                                   ([-2.5, -2.5], 1)])
 
 
+@in_temporary_directory
 def normalize_features_two_feats2_test():
     """Test create_ffiles._normalize_features with two points."""
     feature_list = [features.Width(), features.Height()]
@@ -136,6 +162,7 @@ def normalize_features_two_feats2_test():
                                   ([-2.5, -2.5], 1)])
 
 
+@in_temporary_directory
 def normalize_features_two_classes_test():
     """Test create_ffiles._normalize_features with two classes."""
     feature_list = [features.Width(), features.Height()]
@@ -150,6 +177,18 @@ def normalize_features_two_classes_test():
                                   ([0.6475], 2)])
 
 
+@in_temporary_directory
+def normalize_features_matrix_test():
+    """Test create_ffiles._normalize_features with a feature matrix."""
+    feature_list = [features.Width(), features.Height()]
+    x = numpy.array([[123, 5], [100, 5]], dtype=numpy.float32)
+    y = numpy.array([1, 1], dtype=numpy.int32)
+    x, y = create_ffiles._normalize_features(feature_list, (x, y), True)
+    # Mean: 111.5; Range: 23 (first column), 0 (second column)
+    numpy.testing.assert_array_almost_equal(x, [[0.5, 0.0], [-0.5, 0.0]])
+    numpy.testing.assert_array_equal(y, [1, 1])
+
+
 def create_translation_file_test():
     """Test create_ffiles._create_translation_file."""
     feature_folder = os.path.join(utils.get_project_root(),
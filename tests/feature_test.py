@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import mock
 import nose
+import numpy
 import tests.testhelper as testhelper
 
 # hwrt modules
@@ -62,6 +64,26 @@ def constant_point_coordinates_test():
     f._features_without_strokes(recording)
 
 
+def constant_point_coordinates_pixel_env_test():
+    """The pixel maps show the lines which were drawn up to a point."""
+    recording = HandwrittenData.from_pointlist([[{'x': 0, 'y': 0, 'time': 0},
+                                                 {'x': 2, 'y': 0, 'time': 1}],
+                                                [{'x': 0, 'y': 1, 'time': 2}]])
+    f = features.ConstantPointCoordinates(strokes=2,
+                                          points_per_stroke=2,
+                                          fill_empty_with=-1,
+                                          pixel_env=1,
+                                          scaling_factor=1)
+    nose.tools.assert_equal(f(recording),
+                            [0, 0, 255, 255, 0, 255, 255, 0, 0, 0, 0,
+                             2, 0, 255, 255, 0, 255, 255, 0, 0, 0, 0,
+                             0, 1, 255, 255, 0, 255, 255, 0, 255, 0, 0] +
+                            [-1] * 11)
+    # Pixels right of the canvas are not clamped
+    f.pixel_env = 2
+    nose.tools.assert_raises(IndexError, f, recording)
+
+
 def stroke_intersections_test():
     f = features.StrokeIntersections(strokes=4)
     recording = testhelper.get_symbol_as_handwriting(293035)
@@ -126,8 +148,202 @@ def stroke_intersection2_test():
     nose.tools.assert_equal(feature(recording), [0, 1, 0])
 
 
+def stroke_intersections_resampled_test():
+    """Resampled recordings have repeated points. The counts are the ones of
+       geometry.PolygonalChain before the sweep was added."""
+    expected = {(292934, 20): [2, 0, 0, 0, 0, 0],
+                (292934, 50): [3, 0, 0, 0, 0, 0],
+                (293035, 20): [2, 0, 0, 0, 0, 0],
+                (293035, 50): [4, 0, 0, 0, 0, 0],
+                (97705, 20): [2, 0, 0, 0, 0, 0],
+                (97705, 50): [3, 0, 0, 0, 0, 0]}
+    for (symbol_id, number), counts in sorted(expected.items()):
+        recording = testhelper.get_symbol_as_handwriting(symbol_id)
+        recording.preprocessing([preprocessing.ScaleAndShift(),
+                                 preprocessing.SpaceEvenly(number=number)])
+        feature = features.StrokeIntersections(3)
+        nose.tools.assert_equal(feature(recording), counts)
+
+
+def stroke_intersections_sweep_test():
+    """The sweep counts the intersections of the unprocessed symbols like
+       geometry.PolygonalChain."""
+    for symbol_id in [97705, 293035, 292934]:
+        recording = testhelper.get_symbol_as_handwriting(symbol_id)
+        nose.tools.assert_equal(
+            features.StrokeIntersections(3, sweep=True)(recording),
+            features.StrokeIntersections(3)(recording))
+
+
 def recurvature_test():
     """A 'o' ends in itself. The re-curvature is therefore 0."""
     recording = testhelper.get_symbol_as_handwriting(293036)
     feature = features.ReCurvature(1)
     feature(recording)
+
+
+def feature_matrix_test():
+    """Every row of the feature matrix equals the concatenated features."""
+    recordings = [testhelper.get_symbol_as_handwriting(symbol_id)
+                  for symbol_id in [97705, 293035, 293036]]
+    feature_list = [features.StrokeCount(),
+                    features.ConstantPointCoordinates(strokes=2,
+                                                      points_per_stroke=4),
+                    features.StrokeIntersections(2)]
+    x = features.get_feature_matrix(feature_list, recordings)
+    nose.tools.assert_equal(x.shape, (3, 1 + 16 + 3))
+    nose.tools.assert_equal(x.dtype, numpy.float32)
+    for row, recording in zip(x, recordings):
+        expected = []
+        for feature in feature_list:
+            expected += feature(recording)
+        numpy.testing.assert_array_equal(row,
+                                         numpy.array(expected,
+                                                     dtype=numpy.float32))
+
+
+def feature_matrix_kernels_test():
+    """Features with array kernels are calculated for all recordings at once
+       and give exactly the values of every single recording."""
+    recordings = [testhelper.get_symbol_as_handwriting(symbol_id)
+                  for symbol_id in [292934, 293035, 293036, 97705]]
+    feature_list = [features.StrokeCount(),
+                    features.Ink(),
+                    features.AspectRatio(),
+                    features.Width(),
+                    features.Height(),
+                    features.Time(),
+                    features.CenterOfMass(),
+                    features.StrokeCenter(3),
+                    features.ReCurvature(3),
+                    features.FirstNPoints(5),
+                    features.StrokeIntersections(2)]
+    expected = numpy.array([recording.feature_extraction(feature_list)
+                            for recording in recordings],
+                           dtype=numpy.float32)
+    with mock.patch.object(features.Ink, '__call__') as call:
+        x = features.get_feature_matrix(feature_list, recordings)
+    nose.tools.assert_equal(call.call_count, 0)
+    numpy.testing.assert_array_equal(x, expected)
+
+
+class PluginFeature(object):
+    """A feature of a plugin which does not know ExtractionContext."""
+    normalize = False
+
+    def get_dimension(self):
+        return 1
+
+    def __call__(self, hwr_obj):
+        return [len(hwr_obj.get_pointlist())]
+
+
+def plugin_feature_test():
+    """Features which only take the recording get no context."""
+    recordings = [testhelper.get_symbol_as_handwriting(symbol_id)
+                  for symbol_id in [97705, 293035]]
+    feature_list = [features.StrokeCount(), PluginFeature(), features.Ink()]
+    for recording in recordings:
+        x = recording.feature_extraction(feature_list)
+        nose.tools.assert_equal(x[:2], [len(recording.get_pointlist())] * 2)
+    x = features.get_feature_matrix(feature_list, recordings)
+    nose.tools.assert_equal(x[:, 1].tolist(),
+                            [len(recording.get_pointlist())
+                             for recording in recordings])
+
+
+def extraction_context_test():
+    """The intermediate results of the context fit the pointlist."""
+    recording = testhelper.get_symbol_as_handwriting(293035)
+    context = features.ExtractionContext(recording)
+    pointlist = recording.get_pointlist()
+    nose.tools.assert_equal(context.get_stroke_count(), len(pointlist))
+    nose.tools.assert_equal(context.get_segment_offsets().tolist()[-1],
+                            sum(len(stroke) - 1 for stroke in pointlist))
+    boxes = context.get_stroke_bounding_boxes()
+    for i, stroke in enumerate(pointlist):
+        length = sum(preprocessing.euclidean_distance(p1, p2)
+                     for p1, p2 in zip(stroke, stroke[1:]))
+        nose.tools.assert_almost_equal(context.get_stroke_lengths()[i],
+                                       length)
+        nose.tools.assert_equal(boxes[i].tolist(),
+                                [min(p['x'] for p in stroke),
+                                 min(p['y'] for p in stroke),
+                                 max(p['x'] for p in stroke),
+                                 max(p['y'] for p in stroke)])
+
+
+def shared_extraction_context_test():
+    """All features of one extraction pass decode the recording once."""
+    recording = testhelper.get_symbol_as_handwriting(293035)
+    feature_list = [features.ConstantPointCoordinates(),
+                    features.StrokeCount(),
+                    features.Ink(),
+                    features.AspectRatio(),
+                    features.ReCurvature(),
+                    features.FirstNPoints()]
+    expected = []
+    for feature in feature_list:
+        expected += feature(recording)
+    with mock.patch.object(HandwrittenData, 'get_point_array', autospec=True,
+                           side_effect=HandwrittenData.get_point_array) as get:
+        x = recording.feature_extraction(feature_list)
+    nose.tools.assert_equal(get.call_count, 1)
+    nose.tools.assert_equal(x, expected)
+
+
+def feature_kernels_test():
+    """The kernels of many recordings equal the features of every single
+       recording, which equal the loops over the point dictionaries."""
+    recordings = [testhelper.get_symbol_as_handwriting(symbol_id)
+                  for symbol_id in [292934, 293035, 293036, 97705]]
+    points, stroke_offsets, recording_offsets = \
+        features.get_recording_arrays(recordings)
+    kernels = [(lambda points, *args: features.get_stroke_count(*args),
+                features.StrokeCount()),
+               (features.get_ink, features.Ink()),
+               (features.get_aspect_ratio, features.AspectRatio()),
+               (features.get_center_of_mass, features.CenterOfMass()),
+               (lambda *args: features.get_stroke_centers(*args, strokes=3),
+                features.StrokeCenter(3)),
+               (lambda *args: features.get_recurvature(*args, strokes=3),
+                features.ReCurvature(3)),
+               (lambda *args: features.get_first_n_points(*args, n=5),
+                features.FirstNPoints(5))]
+    for kernel, feature in kernels:
+        x = kernel(points, stroke_offsets, recording_offsets)
+        nose.tools.assert_equal(x.shape, (4, feature.get_dimension()))
+        for row, recording in zip(x, recordings):
+            numpy.testing.assert_allclose(row, feature(recording))
+    extents = features.get_extents(points, stroke_offsets, recording_offsets)
+    for row, recording in zip(extents, recordings):
+        nose.tools.assert_equal(row.tolist(), [recording.get_width(),
+                                               recording.get_height(),
+                                               recording.get_time()])
+    for recording in recordings:
+        pointlist = recording.get_pointlist()
+        ink = sum(preprocessing.euclidean_distance(p1, p2)
+                  for stroke in pointlist
+                  for p1, p2 in zip(stroke, stroke[1:]))
+        nose.tools.assert_almost_equal(features.Ink()(recording)[0], ink)
+        xs = [p['x'] for stroke in pointlist for p in stroke]
+        ys = [p['y'] for stroke in pointlist for p in stroke]
+        numpy.testing.assert_allclose(features.CenterOfMass()(recording),
+                                      [numpy.mean(xs), numpy.mean(ys)])
+        stroke = pointlist[0]
+        heights = max(p['y'] for p in stroke) - min(p['y'] for p in stroke)
+        length = sum(preprocessing.euclidean_distance(p1, p2)
+                     for p1, p2 in zip(stroke, stroke[1:]))
+        nose.tools.assert_almost_equal(features.ReCurvature(1)(recording)[0],
+                                       heights / length)
+
+
+def first_n_points_padding_test():
+    """Recordings with less than n points get padded with 0."""
+    recording = HandwrittenData.from_pointlist([[{'x': 1, 'y': 2, 'time': 0},
+                                                 {'x': 3, 'y': 4, 'time': 1}],
+                                                [{'x': 5, 'y': 6, 'time': 2}]])
+    nose.tools.assert_equal(features.FirstNPoints(4)(recording),
+                            [1, 2, 3, 4, 5, 6, 0, 0])
+    nose.tools.assert_equal(features.StrokeCenter(3)(recording),
+                            [2, 3, 5, 6, 0, 0])
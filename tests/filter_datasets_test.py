@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import os
+import shutil
+import tempfile
 import pkg_resources
 import nose
 
 # hwrt modules
 import hwrt.filter_dataset as filter_dataset
+import hwrt.utils as utils
 
 
 # Tests
@@ -27,3 +30,46 @@ def get_parser_execution_test():
 def get_metadata_test():
     metadata = filter_dataset.get_metadata()
     nose.tools.assert_equal(len(metadata), 3)
+
+
+def load_raw_record_stream_test():
+    tests_path = os.path.join(os.path.dirname(__file__), 'data/')
+    raw_pickle_file = os.path.join(tests_path, 'unittests-tiny-raw.pickle')
+    raw = filter_dataset.load_raw(raw_pickle_file)
+    recordings = raw.pop('handwriting_datasets')
+    target = tempfile.mkdtemp()
+    try:
+        stream = os.path.join(target, "raw.pickle")
+        utils.write_dataset_stream(stream, raw, [recordings[:10],
+                                                 recordings[10:]])
+        loaded = filter_dataset.load_raw(stream)
+        nose.tools.assert_equal(loaded['formula_id2latex'],
+                                raw['formula_id2latex'])
+        nose.tools.assert_equal(loaded['handwriting_datasets'], recordings)
+    finally:
+        shutil.rmtree(target)
+
+
+def filter_and_save_record_stream_test():
+    tests_path = os.path.join(os.path.dirname(__file__), 'data/')
+    raw_pickle_file = os.path.join(tests_path, 'unittests-tiny-raw.pickle')
+    raw = filter_dataset.load_raw(raw_pickle_file)
+    formula_ids = sorted(set(el['formula_id']
+                             for el in raw['handwriting_datasets']))
+    symbol_ids = {formula_ids[0]: formula_ids[0],
+                  formula_ids[1]: formula_ids[0]}
+    expected = len([el for el in raw['handwriting_datasets']
+                    if el['formula_id'] in symbol_ids])
+    target = tempfile.mkdtemp()
+    try:
+        stream = os.path.join(target, "filtered.pickle")
+        filter_dataset.filter_and_save(raw, symbol_ids, stream, batch_size=2)
+        metadata, batches = utils.iter_dataset(stream)
+        nose.tools.assert_equal(metadata['formula_id2latex'],
+                                raw['formula_id2latex'])
+        recordings = [el for batch in batches for el in batch]
+        nose.tools.assert_equal(len(recordings), expected)
+        nose.tools.assert_equal(set(el['formula_id'] for el in recordings),
+                                set([formula_ids[0]]))
+    finally:
+        shutil.rmtree(target)
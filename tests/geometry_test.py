@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import nose
+import numpy
 
 # hwrt modules
 import hwrt.geometry as geometry
@@ -285,3 +286,123 @@ def stroke_selfintersection_test():
          {'y': 72, 'x': 303}]
     a = geometry.PolygonalChain(a)
     nose.tools.assert_equal(a.count_selfintersections(), 0)
+
+
+def douglas_peucker_test():
+    points = numpy.array([[0, 0], [1, 0.1], [2, 0], [3, 5]])
+    nose.tools.assert_equal(list(geometry.douglas_peucker(points, 0.2)[0]),
+                            [0, 2, 3])
+    nose.tools.assert_equal(list(geometry.douglas_peucker(points, 10)[0]),
+                            [0, 3])
+    nose.tools.assert_equal(len(geometry.douglas_peucker(points[:0], 0.2)[0]),
+                            0)
+
+
+def douglas_peucker_long_stroke_test():
+    x = numpy.arange(20000, dtype=float)
+    points = numpy.column_stack([x, x**2])
+    kept, _ = geometry.douglas_peucker(points, 0.0001)
+    nose.tools.assert_equal(kept[0], 0)
+    nose.tools.assert_equal(kept[-1], len(points) - 1)
+    nose.tools.assert_true((numpy.diff(kept) > 0).all())
+
+
+def douglas_peucker_strokes_test():
+    points = numpy.array([[0, 0], [1, 0.1], [2, 0], [3, 5],
+                          [0, 0], [5, 5]])
+    indices, offsets = geometry.douglas_peucker(points, 0.2, [0, 4, 4, 6])
+    nose.tools.assert_equal(list(indices), [0, 2, 3, 4, 5])
+    nose.tools.assert_equal(list(offsets), [0, 3, 3, 5])
+
+
+def segments_intersect_test():
+    x = numpy.array([[0, 2], [2, 0]], dtype=float)
+    segments = numpy.array([[[0, 0], [2, 2]],  # crosses x
+                            [[1, 1], [3, -1]],  # collinear overlap
+                            [[1, 1], [5, 0]],  # touches x in (1, 1)
+                            [[1, 0], [1, 0]],  # a point below x
+                            [[3, 0], [3, -1]]], dtype=float)
+    nose.tools.assert_equal(
+        geometry.segments_intersect(x, segments).tolist(),
+        [True, True, True, False, False])
+    nose.tools.assert_equal(
+        geometry.segments_intersect(segments[3], segments[3]), True)
+
+
+def count_selfintersections_test():
+    # Segments which are only separated by a repeated point are neighbours
+    points = numpy.array([[0, 0], [1, 0], [1, 0], [1, 1], [0.5, -1]])
+    segments = geometry.get_polyline_segments(points)
+    nose.tools.assert_equal(geometry.count_selfintersections(segments), 1)
+    nose.tools.assert_equal(
+        geometry.count_selfintersections(segments[:-1]), 0)
+
+
+def count_intersections_test():
+    """A stroke which crosses a corner intersects it only once."""
+    corner = geometry.get_polyline_segments(numpy.array([[0, 0], [1, 1],
+                                                         [2, 0]]))
+    line = geometry.get_polyline_segments(numpy.array([[1, 2], [1, -1]]))
+    nose.tools.assert_equal(geometry.count_intersections(corner, line), 1)
+    nose.tools.assert_equal(geometry.count_intersections(corner[:0], line), 0)
+
+
+def get_intersecting_pairs_test():
+    """The sweep finds the same pairs as a comparison of all pairs."""
+    segments = numpy.random.RandomState(0).rand(60, 2, 2)
+    intersect = geometry.segments_intersect(segments[:, None],
+                                            segments[None, :])
+    expected = sorted((i, j) for i, j in zip(*numpy.nonzero(intersect))
+                      if i < j)
+    i, j = geometry.get_intersecting_pairs(segments, max_pairs=7)
+    nose.tools.assert_equal(sorted(zip(i, j)), expected)
+    i, j = geometry.get_intersecting_pairs(segments[:20], segments[20:])
+    expected = [(i, j - 20) for i, j in expected if i < 20 <= j]
+    nose.tools.assert_equal(sorted(zip(i, j)), expected)
+
+
+def segments_distances_test():
+    """The distances of segment arrays equal those of the objects."""
+    segments = numpy.random.RandomState(0).randint(0, 4, (40, 2, 2))
+    line_segments = [geometry.LineSegment(geometry.Point(*p1),
+                                          geometry.Point(*p2))
+                     for p1, p2 in segments]
+    distances = geometry.segments_distances(segments[:, numpy.newaxis],
+                                            segments)
+    point_distances = geometry.point_segment_distances(
+        segments[:, numpy.newaxis, 0], segments)
+    for i, segment1 in enumerate(line_segments):
+        for j, segment2 in enumerate(line_segments):
+            nose.tools.assert_almost_equal(
+                distances[i, j],
+                geometry.segments_distance(segment1, segment2))
+            point = geometry.Point(*segments[i, 0])
+            nose.tools.assert_almost_equal(
+                point_distances[i, j],
+                geometry.point_segment_distance(point, segment2))
+
+
+def get_polylines_distances_test():
+    """Polylines are as far apart as their closest line segments."""
+    segments = numpy.random.RandomState(0).rand(30, 2, 2) * 10
+    offsets = [0, 5, 5, 12, 30]
+    distances = geometry.get_polylines_distances(segments, offsets,
+                                                 max_pairs=10)
+    for a, b in [(0, 2), (0, 3), (2, 3)]:
+        expected = geometry.get_min_segments_distances(
+            segments[offsets[a]:offsets[a + 1]],
+            segments[offsets[b]:offsets[b + 1]], max_pairs=10).min()
+        nose.tools.assert_equal(distances[a, b], expected)
+        nose.tools.assert_equal(distances[b, a], expected)
+    nose.tools.assert_equal(distances.diagonal().tolist(),
+                            [0, numpy.inf, 0, 0])
+    nose.tools.assert_equal(distances[1].tolist(), [numpy.inf] * 4)
+
+
+def get_point_polyline_distances_test():
+    segments = geometry.get_polyline_segments(numpy.array([[0, 0], [2, 0],
+                                                           [2, 2]]))
+    points = numpy.array([[1, 1], [3, 3], [-1, 0]])
+    distances = geometry.get_point_polyline_distances(points, segments,
+                                                      max_pairs=1)
+    numpy.testing.assert_allclose(distances, [1, 2 ** 0.5, 1])
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
+import pickle
 import nose.tools
 import tests.testhelper as testhelper
 import mock
 
 # hwrt modules
+from hwrt import handwritten_data
+from hwrt import preprocessing
 from hwrt.handwritten_data import HandwrittenData
 
 
@@ -18,6 +22,11 @@ def load_symbol_test():
         assert isinstance(a, HandwrittenData)
 
 
+def empty_recording_test():
+    """A recording without strokes is rejected by an assertion."""
+    nose.tools.assert_raises(AssertionError, HandwrittenData, '[]')
+
+
 def set_pointlist_test():
     a = testhelper.get_symbol_as_handwriting(97705)
     a.set_pointlist([[]])
@@ -147,3 +156,245 @@ def width_test():
         data = f.read()
     assert HandwrittenData(data).get_width() == 186, \
         "Got %i" % HandwrittenData(data).get_width()
+
+
+def raw_data_json_test():
+    a = testhelper.get_symbol_as_handwriting(293035)
+    with open(testhelper.get_symbol(293035)) as f:
+        data = json.load(f)
+    nose.tools.assert_equal(json.loads(a.raw_data_json), data)
+    a.set_pointlist([[{'x': 1, 'y': 2, 'time': 3}]])
+    nose.tools.assert_equal(json.loads(a.raw_data_json),
+                            [[{'x': 1, 'y': 2, 'time': 3}]])
+
+
+def point_array_test():
+    a = HandwrittenData('[[{"x": 1, "y": 2, "time": 3}], '
+                        '[{"x": 4, "y": 5.5, "time": 6}, '
+                        '{"x": 7, "y": 8, "time": 9}]]')
+    nose.tools.assert_equal(a.get_point_array().tolist(),
+                            [[1, 2, 3], [4, 5.5, 6], [7, 8, 9]])
+    nose.tools.assert_equal(a.get_stroke_offsets().tolist(), [0, 1, 3])
+    nose.tools.assert_equal(a.get_pen_down(), None)
+
+
+def set_point_array_test():
+    a = HandwrittenData('[[{"x": 1, "y": 2, "time": 3}]]')
+    a.set_point_array([[0.5, 1, 3], [2, 3, 4]], [0, 1, 2], [1, -1])
+    nose.tools.assert_equal(a.get_pointlist(),
+                            [[{'x': 0.5, 'y': 1, 'time': 3, 'pen_down': True}],
+                             [{'x': 2, 'y': 3, 'time': 4}]])
+    nose.tools.assert_equal(type(a.get_pointlist()[0][0]['time']), int)
+
+
+def legacy_pickle_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    b = HandwrittenData.__new__(HandwrittenData)
+    b.__setstate__({'raw_data_json': a.raw_data_json,
+                    'formula_id': None,
+                    'raw_data_id': None,
+                    'formula_in_latex': None,
+                    'wild_point_count': 0,
+                    'missing_stroke': 0,
+                    'user_id': 0,
+                    'user_name': '',
+                    'segmentation': [[0]]})
+    nose.tools.assert_equal(a, b)
+    nose.tools.assert_equal(pickle.loads(pickle.dumps(a)), a)
+
+
+def cache_invalidation_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    nose.tools.assert_equal(a.get_width(), 186)
+    box = a.get_bounding_box()
+    box['minx'] = 0  # Must not change the cached bounding box
+    nose.tools.assert_equal(a.get_width(), 186)
+    a.set_pointlist([[{'x': 1, 'y': 2, 'time': 3},
+                      {'x': 5, 'y': 12, 'time': 4}]])
+    nose.tools.assert_equal(a.get_width(), 4)
+    nose.tools.assert_equal(a.get_height(), 10)
+    nose.tools.assert_equal(a.get_area(), 55)
+    nose.tools.assert_equal(a.get_time(), 1)
+    nose.tools.assert_equal(a.get_center_of_mass(), (3.0, 7.0))
+
+
+def get_sorted_pointlist_unsorted_test():
+    a = HandwrittenData('[[{"x": 1, "y": 1, "time": 5}, '
+                        '{"x": 2, "y": 2, "time": 4}], '
+                        '[{"x": 3, "y": 3, "time": 1}]]')
+    nose.tools.assert_equal(a.get_sorted_pointlist(),
+                            [[{'x': 3, 'y': 3, 'time': 1}],
+                             [{'x': 2, 'y': 2, 'time': 4},
+                              {'x': 1, 'y': 1, 'time': 5}]])
+
+
+def compact_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    pointlist = a.get_pointlist()
+    a.compact()
+    nose.tools.assert_equal(a.get_pointlist(), pointlist)
+    nose.tools.assert_equal(a.get_width(), 186)
+    b = pickle.loads(pickle.dumps(a))
+    nose.tools.assert_equal(a, b)
+    nose.tools.assert_equal(b.get_pointlist(), pointlist)
+
+
+def compact_preprocessing_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    a.compact()
+    stroke_arrays = a.get_stroke_arrays()
+    nose.tools.assert_true(stroke_arrays.points.flags.writeable)
+    a.preprocessing([preprocessing.ScaleAndShift()])
+    nose.tools.assert_equal(max(a.get_width(), a.get_height()), 1)
+
+
+def compact_lossless_test():
+    """Recordings which can not be stored as float32 are not compacted."""
+    a = HandwrittenData('[[{"x": 0.1, "y": 0.2, "time": 3}]]')
+    a.compact()
+    nose.tools.assert_equal(a.get_pointlist(),
+                            [[{'x': 0.1, 'y': 0.2, 'time': 3}]])
+
+
+def raw_data_json_round_trip_test():
+    """Additional keys and the type of every value are kept as long as the
+       strokes are not changed."""
+    data = ('[[{"x":1,"y":2,"time":4,"pressure":0.5},'
+            '{"x":1.0,"y":2,"time":null}],'
+            '[{"x":2,"y":3,"time":3,"pen_down":1}]]')
+    a = HandwrittenData(data)
+    pointlist = [[{'x': 1, 'y': 2, 'time': 4, 'pressure': 0.5},
+                  {'x': 1.0, 'y': 2, 'time': 4}],
+                 [{'x': 2, 'y': 3, 'time': 3, 'pen_down': 1}]]
+    nose.tools.assert_equal(a.get_pointlist(), pointlist)
+    nose.tools.assert_equal([type(point['x']) for point in pointlist[0]],
+                            [int, float])
+    nose.tools.assert_equal(a.raw_data_json,
+                            '[[{"x":1,"y":2,"time":4,"pressure":0.5},'
+                            '{"x":1.0,"y":2,"time":4}],'
+                            '[{"x":2,"y":3,"time":3,"pen_down":1}]]')
+    nose.tools.assert_equal(a.get_sorted_pointlist(),
+                            [pointlist[1], pointlist[0]])
+    a.compact()
+    b = pickle.loads(pickle.dumps(a))
+    nose.tools.assert_equal(a, b)
+    nose.tools.assert_equal(b.get_pointlist(), pointlist)
+    nose.tools.assert_equal(handwritten_data.pack_recordings([b]), 1)
+    nose.tools.assert_equal(b.raw_data_json, a.raw_data_json)
+    # Changed strokes only have the values of the arrays
+    a.preprocessing([preprocessing.ScaleAndShift()])
+    nose.tools.assert_true(all('pressure' not in point
+                               for stroke in a.get_pointlist()
+                               for point in stroke))
+
+
+def pack_recordings_test():
+    """Packed recordings keep their values exactly."""
+    recordings = [testhelper.get_symbol_as_handwriting(symbol_id)
+                  for symbol_id in [97705, 292934, 293035]]
+    # Large differences and -128 are not stored as int8
+    recordings.append(HandwrittenData.from_pointlist(
+        [[{'x': 0, 'y': 5, 'time': 1403800022048},
+          {'x': -128, 'y': 300, 'time': 1403800022178}],
+         [{'x': 127, 'y': 0, 'time': 1403800099999}]]))
+    # Values which are not restored exactly are not packed
+    recordings.append(HandwrittenData('[[{"x": 0.1, "y": 0.2, "time": 3}, '
+                                      '{"x": 1.2, "y": 0.2, "time": 4}]]'))
+    copies = [pickle.loads(pickle.dumps(recording))
+              for recording in recordings]
+    nose.tools.assert_equal(handwritten_data.pack_recordings(recordings), 4)
+    for recording, copy in zip(recordings, copies):
+        nose.tools.assert_equal(recording, copy)
+        nose.tools.assert_equal(recording.get_pointlist(),
+                                copy.get_pointlist())
+        nose.tools.assert_equal(recording.raw_data_json, copy.raw_data_json)
+        nose.tools.assert_equal(pickle.loads(pickle.dumps(recording)), copy)
+    recordings[0].preprocessing([preprocessing.ScaleAndShift()])
+    nose.tools.assert_equal(max(recordings[0].get_width(),
+                                recordings[0].get_height()), 1)
+    nose.tools.assert_equal(recordings[1], copies[1])
+
+
+def additional_attributes_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    a.symbol_stream = [42]
+    b = pickle.loads(pickle.dumps(a))
+    nose.tools.assert_equal(b.symbol_stream, [42])
+
+
+def get_bitmaps_test():
+    recordings = testhelper.get_all_symbols_as_handwriting()
+    for time in [None, 1377173554900]:
+        bitmaps = handwritten_data.get_bitmaps(recordings, time=time,
+                                               size=16)
+        nose.tools.assert_equal(bitmaps.shape, (len(recordings), 16, 16))
+        for recording, bitmap in zip(recordings, bitmaps):
+            nose.tools.assert_equal(
+                bitmap.tolist(),
+                recording.get_bitmap(time=time, size=16).tolist())
+    nose.tools.assert_equal(handwritten_data.get_bitmaps([]).shape,
+                            (0, 32, 32))
+
+
+def from_pointlist_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    b = HandwrittenData.from_pointlist(a.get_pointlist(),
+                                       formula_id=a.formula_id)
+    nose.tools.assert_equal(b.get_pointlist(), a.get_pointlist())
+    nose.tools.assert_equal(b.segmentation, [[0]])
+    nose.tools.assert_equal(b.formula_id, a.formula_id)
+
+
+def fix_times_test():
+    a = HandwrittenData.from_pointlist([[{'x': 0, 'y': 0, 'time': None},
+                                         {'x': 1, 'y': 0, 'time': 5}],
+                                        [{'x': 2, 'y': 0, 'time': None},
+                                         {'x': 3, 'y': 0, 'time': 7},
+                                         {'x': 4, 'y': 0, 'time': None}]])
+    nose.tools.assert_equal([[p['time'] for p in stroke]
+                             for stroke in a.get_pointlist()],
+                            [[0, 5], [5, 7, 7]])
+
+
+def from_point_array_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    for trusted in [False, True]:
+        b = HandwrittenData.from_point_array(a.get_point_array(),
+                                             a.get_stroke_offsets(),
+                                             integral=(False, False, True),
+                                             trusted=trusted)
+        nose.tools.assert_equal(b.get_pointlist(), a.get_pointlist())
+        nose.tools.assert_equal(b.segmentation, [[0]])
+
+
+def to_single_symbol_list_test():
+    a = HandwrittenData.from_pointlist(
+        [[{'x': 0, 'y': 0, 'time': 4}], [{'x': 1, 'y': 1, 'time': 1}],
+         [{'x': 2, 'y': 2, 'time': 2}, {'x': 3, 'y': 3, 'time': 3}]],
+        segmentation=[[0, 2], [1]])
+    a.symbol_stream = ['A', 'B']
+    symbols = a.to_single_symbol_list()
+    nose.tools.assert_equal([symbol.formula_id for symbol in symbols],
+                            ['A', 'B'])
+    sorted_pointlist = a.get_sorted_pointlist()
+    nose.tools.assert_equal(symbols[0].get_pointlist(),
+                            [sorted_pointlist[0], sorted_pointlist[2]])
+    nose.tools.assert_equal(symbols[1].get_pointlist(),
+                            [sorted_pointlist[1]])
+
+
+def fingerprint_test():
+    a = testhelper.get_symbol_as_handwriting(97705)
+    b = HandwrittenData.from_pointlist(a.get_pointlist(), formula_id=1)
+    b.compact()
+    nose.tools.assert_equal(a.get_fingerprint(), b.get_fingerprint())
+    nose.tools.assert_equal(len(a.get_fingerprint()), 40)
+    c = testhelper.get_symbol_as_handwriting(292934)
+    assert a.get_fingerprint() != c.get_fingerprint()
+    # A tiny change is only ignored with quantization
+    points = a.get_point_array().copy()
+    points[0, 0] -= 0.1
+    b.set_point_array(points, a.get_stroke_offsets())
+    assert a.get_fingerprint() != b.get_fingerprint()
+    nose.tools.assert_equal(a.get_fingerprint(quantization=(1, 1, 10)),
+                            b.get_fingerprint(quantization=(1, 1, 10)))
@@ -4,6 +4,7 @@
 import nose
 import os
 import shutil
+import tempfile
 
 # hwrt modules
 import hwrt.preprocess_dataset as preprocess_dataset
@@ -40,3 +41,147 @@ def get_parameters_test():
     small = os.path.join(utils.get_project_root(),
                          "preprocessed/small-baseline")
     preprocess_dataset.get_parameters(small)
+
+
+def parallel_preprocessing_test():
+    d = os.path.dirname(__file__)
+    source = os.path.join(d, 'data/unittests-tiny-raw.pickle')
+    target = tempfile.mkdtemp()
+    queue = [preprocessing.ScaleAndShift(),
+             preprocessing.SpaceEvenly(number=20)]
+    try:
+        outputs = []
+        for workers in [1, 2]:
+            outputpath = os.path.join(target, "%i.pickle" % workers)
+            preprocess_dataset.create_preprocessed_dataset(source, outputpath,
+                                                           queue,
+                                                           workers=workers,
+                                                           chunksize=3)
+            with open(outputpath, 'rb') as f:
+                outputs.append(f.read())
+        nose.tools.assert_equal(outputs[0], outputs[1])
+    finally:
+        shutil.rmtree(target)
+
+
+def streaming_preprocessing_test():
+    d = os.path.dirname(__file__)
+    source = os.path.join(d, 'data/unittests-tiny-raw.pickle')
+    target = tempfile.mkdtemp()
+    queue = [preprocessing.ScaleAndShift()]
+    try:
+        raw = utils.load_dataset(source)
+        recordings = raw.pop('handwriting_datasets')
+        stream = os.path.join(target, "raw.pickle")
+        utils.write_dataset_stream(stream, raw, [recordings[:10],
+                                                 recordings[10:]])
+        outputpath = os.path.join(target, "data.pickle")
+        preprocess_dataset.create_preprocessed_dataset(stream, outputpath,
+                                                       queue, batch_size=7)
+        metadata, batches = utils.iter_dataset(outputpath)
+        nose.tools.assert_equal(metadata['formula_id2latex'],
+                                raw['formula_id2latex'])
+        nose.tools.assert_equal(len(metadata['preprocessing_queue']), 1)
+        batches = list(batches)
+        nose.tools.assert_true(all(len(batch) <= 7 for batch in batches))
+        preprocessed = [recording for batch in batches for recording in batch]
+        nose.tools.assert_equal(len(preprocessed), len(recordings))
+        for recording in preprocessed:
+            handwriting = recording['handwriting']
+            nose.tools.assert_almost_equal(max(handwriting.get_width(),
+                                               handwriting.get_height()), 1)
+    finally:
+        shutil.rmtree(target)
+
+
+class CountingScaleAndShift(preprocessing.ScaleAndShift):
+    """ScaleAndShift which counts the recordings it was applied to."""
+    calls = 0
+
+    def apply_arrays(self, stroke_arrays):
+        CountingScaleAndShift.calls += 1
+        preprocessing.ScaleAndShift.apply_arrays(self, stroke_arrays)
+
+
+def incremental_preprocessing_test():
+    d = os.path.dirname(__file__)
+    source = os.path.join(d, 'data/unittests-tiny-raw.pickle')
+    target = tempfile.mkdtemp()
+    queue = [CountingScaleAndShift()]
+    try:
+        raw = utils.load_dataset(source)
+        recordings = raw.pop('handwriting_datasets')
+        old_raw = os.path.join(target, "old.pickle")
+        new_raw = os.path.join(target, "new.pickle")
+        utils.write_dataset_stream(old_raw, raw, [recordings[:-10]])
+        utils.write_dataset_stream(new_raw, raw, [recordings])
+        outputpath = os.path.join(target, "data.pickle")
+        full_outputpath = os.path.join(target, "full.pickle")
+        preprocess_dataset.create_preprocessed_dataset(old_raw, outputpath,
+                                                       queue,
+                                                       incremental=True)
+        CountingScaleAndShift.calls = 0
+        preprocess_dataset.create_preprocessed_dataset(new_raw, outputpath,
+                                                       queue,
+                                                       incremental=True)
+        nose.tools.assert_equal(CountingScaleAndShift.calls, 10)
+        preprocess_dataset.create_preprocessed_dataset(new_raw,
+                                                       full_outputpath,
+                                                       queue,
+                                                       incremental=True)
+        with open(outputpath, 'rb') as f1, open(full_outputpath, 'rb') as f2:
+            nose.tools.assert_equal(f1.read(), f2.read())
+    finally:
+        shutil.rmtree(target)
+
+
+def incremental_streaming_preprocessing_test():
+    d = os.path.dirname(__file__)
+    source = os.path.join(d, 'data/unittests-tiny-raw.pickle')
+    target = tempfile.mkdtemp()
+    queue = [CountingScaleAndShift()]
+    try:
+        raw = utils.load_dataset(source)
+        recordings = raw.pop('handwriting_datasets')
+        old_raw = os.path.join(target, "old.pickle")
+        new_raw = os.path.join(target, "new.pickle")
+        utils.write_dataset_stream(old_raw, raw, [recordings[:-10]])
+        utils.write_dataset_stream(new_raw, raw, [recordings[:50],
+                                                  recordings[50:]])
+        outputpath = os.path.join(target, "data.pickle")
+        full_outputpath = os.path.join(target, "full.pickle")
+        preprocess_dataset.create_preprocessed_dataset(old_raw, outputpath,
+                                                       queue, batch_size=30,
+                                                       incremental=True)
+        CountingScaleAndShift.calls = 0
+        preprocess_dataset.create_preprocessed_dataset(new_raw, outputpath,
+                                                       queue, batch_size=30,
+                                                       incremental=True)
+        nose.tools.assert_equal(CountingScaleAndShift.calls, 10)
+        preprocess_dataset.create_preprocessed_dataset(new_raw,
+                                                       full_outputpath,
+                                                       queue, batch_size=30,
+                                                       incremental=True)
+        with open(outputpath, 'rb') as f1, open(full_outputpath, 'rb') as f2:
+            nose.tools.assert_equal(f1.read(), f2.read())
+        nose.tools.assert_equal(sorted(os.listdir(target)),
+                                ['data.pickle', 'full.pickle', 'new.pickle',
+                                 'old.pickle'])
+    finally:
+        shutil.rmtree(target)
+
+
+def fingerprints_only_incremental_test():
+    d = os.path.dirname(__file__)
+    source = os.path.join(d, 'data/unittests-tiny-raw.pickle')
+    target = tempfile.mkdtemp()
+    try:
+        outputpath = os.path.join(target, "data.pickle")
+        preprocess_dataset.create_preprocessed_dataset(
+            source, outputpath, [preprocessing.ScaleAndShift()])
+        preprocessed = utils.load_dataset(outputpath)
+        nose.tools.assert_false(any('raw_fingerprint' in raw_dataset
+                                    for raw_dataset in
+                                    preprocessed['handwriting_datasets']))
+    finally:
+        shutil.rmtree(target)
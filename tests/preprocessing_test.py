@@ -150,3 +150,185 @@ def space_evenly_per_stroke_test_all():
         s = a.get_pointlist()
         print(s)
         assert len(s) > 0
+
+
+def preprocessing_queue_test():
+    algorithms = [preprocessing.ScaleAndShift(),
+                  preprocessing.StrokeConnect(),
+                  preprocessing.DouglasPeucker(epsilon=0.2),
+                  preprocessing.RemoveDots(),
+                  preprocessing.DotReduction(threshold=0.05),
+                  preprocessing.WeightedAverageSmoothing(),
+                  preprocessing.SpaceEvenlyPerStroke(number=20),
+                  preprocessing.SpaceEvenly(number=100)]
+    queue = preprocessing.PreprocessingQueue(algorithms)
+    nose.tools.assert_equal(len(queue), len(algorithms))
+    for a in testhelper.get_all_symbols_as_handwriting():
+        expected = HandwrittenData(a.raw_data_json)
+        for algorithm in algorithms:
+            # Every algorithm stores its result in the recording
+            algorithm(expected)
+        queue(a)
+        nose.tools.assert_equal(a.get_pointlist(), expected.get_pointlist())
+
+
+def preprocessing_queue_fallback_test():
+    class ReverseStrokes(object):
+        """An algorithm without apply_arrays, e.g. from a plugin."""
+        def __call__(self, hwr_obj):
+            hwr_obj.set_pointlist(hwr_obj.get_pointlist()[::-1])
+
+    a = testhelper.get_symbol_as_handwriting(292934)
+    expected = a.get_pointlist()[::-1]
+    a.preprocessing([preprocessing.RemoveDuplicateTime(), ReverseStrokes()])
+    nose.tools.assert_equal(a.get_pointlist(), expected)
+
+
+def ScaleAndShift_batch_test():
+    from hwrt.recording_batch import RecordingBatch
+    for algorithm in [preprocessing.ScaleAndShift(),
+                      preprocessing.ScaleAndShift(center=True,
+                                                  center_other=True),
+                      preprocessing.ScaleAndShift(max_width=2.,
+                                                  max_height=0.5,
+                                                  width_add=1)]:
+        recordings = testhelper.get_all_symbols_as_handwriting()
+        batch = algorithm.apply_batch(
+            RecordingBatch.from_recordings(recordings))
+        nose.tools.assert_equal(len(batch), len(recordings))
+        for i, recording in enumerate(recordings):
+            algorithm(recording)
+            nose.tools.assert_equal(batch.get_points(i).tolist(),
+                                    recording.get_point_array().tolist())
+
+
+def space_evenly_pen_down_test():
+    a = HandwrittenData('[[{"x":0, "y":0, "time": 0}, '
+                        '{"x":10, "y":0, "time": 10}], '
+                        '[{"x":20, "y":0, "time": 20}, '
+                        '{"x":30, "y":0, "time": 30}]]')
+    preprocessing.SpaceEvenly(number=7)(a)
+    s = a.get_pointlist()
+    nose.tools.assert_equal([p['time'] for p in s[0]],
+                            [0, 5, 10, 10, 15, 20, 20, 25, 30])
+    nose.tools.assert_equal([p['pen_down'] for p in s[0]],
+                            [True, True, True, False, False, True, False,
+                             True, True])
+    nose.tools.assert_equal([p['x'] for p in s[0]],
+                            [0, 5, 10, 10, 15, 20, 20, 25, 30])
+
+
+def space_evenly_overlapping_strokes_test():
+    # The second stroke starts before the first one ends
+    a = HandwrittenData('[[{"x":0, "y":0, "time": 0}, '
+                        '{"x":10, "y":0, "time": 10}], '
+                        '[{"x":20, "y":0, "time": 5}, '
+                        '{"x":30, "y":0, "time": 15}]]')
+    preprocessing.SpaceEvenly(number=4)(a)
+    s = a.get_pointlist()
+    nose.tools.assert_equal([p['time'] for p in s[0]], [0, 5, 5, 10, 10, 15])
+    nose.tools.assert_equal([p['pen_down'] for p in s[0]],
+                            [True, True, True, True, True, True])
+
+
+def space_evenly_per_stroke_scipy_test():
+    from scipy.interpolate import interp1d
+    for kind in ['cubic', 'quadratic', 'linear']:
+        algorithm = preprocessing.SpaceEvenlyPerStroke(number=20, kind=kind)
+        for a in testhelper.get_all_symbols_as_handwriting():
+            strokes = a.get_sorted_pointlist()
+            algorithm(a)
+            for stroke, new_stroke in zip(strokes, a.get_pointlist()):
+                if len(stroke) < 2:
+                    continue
+                t = [p['time'] for p in stroke]
+                if len(stroke) <= 3 or len(set(t)) < len(t):
+                    stroke_kind = 'linear'
+                else:
+                    stroke_kind = kind
+                fx = interp1d(t, [p['x'] for p in stroke], stroke_kind)
+                fy = interp1d(t, [p['y'] for p in stroke], stroke_kind)
+                for p in new_stroke:
+                    nose.tools.assert_almost_equal(p['x'], fx(p['time']))
+                    nose.tools.assert_almost_equal(p['y'], fy(p['time']))
+
+
+def space_evenly_per_stroke_same_time_test():
+    # A spline is not possible, so the stroke is interpolated linearly
+    a = HandwrittenData('[[{"x":0, "y":0, "time": 0}, '
+                        '{"x":10, "y":0, "time": 10}, '
+                        '{"x":10, "y":10, "time": 10}, '
+                        '{"x":20, "y":20, "time": 20}]]')
+    preprocessing.SpaceEvenlyPerStroke(number=5, kind='cubic')(a)
+    s = a.get_pointlist()
+    nose.tools.assert_equal([(p['x'], p['y'], p['time']) for p in s[0]],
+                            [(0, 0, 0), (5, 0, 5), (10, 10, 10),
+                             (15, 15, 15), (20, 20, 20)])
+
+
+def remove_duplicate_time_test():
+    a = HandwrittenData('[[{"x":0, "y":0, "time":0}, {"x":1, "y":0, "time":0},'
+                        '  {"x":2, "y":0, "time":1}],'
+                        ' [{"x":3, "y":0, "time":1}],'
+                        ' [{"x":4, "y":0, "time":2}]]')
+    preprocessing.RemoveDuplicateTime()(a)
+    nose.tools.assert_equal(a.get_pointlist(),
+                            [[{'x': 0, 'y': 0, 'time': 0},
+                              {'x': 2, 'y': 0, 'time': 1}],
+                             [{'x': 4, 'y': 0, 'time': 2}]])
+
+
+def dot_reduction_test():
+    # The bounding box diagonal of the first stroke is above the threshold,
+    # but all points are closer to each other than the threshold
+    a = HandwrittenData('[[{"x":0, "y":0, "time":0}, {"x":4, "y":2, "time":1},'
+                        '  {"x":2, "y":4, "time":2}],'
+                        ' [{"x":0, "y":0, "time":3},'
+                        '  {"x":5, "y":0, "time":4}],'
+                        ' [{"x":0, "y":0, "time":5},'
+                        '  {"x":3, "y":4, "time":6}]]')
+    preprocessing.DotReduction(threshold=5)(a)
+    nose.tools.assert_equal(a.get_pointlist(),
+                            [[{'x': 2, 'y': 2, 'time': 1}],
+                             [{'x': 0, 'y': 0, 'time': 3},
+                              {'x': 5, 'y': 0, 'time': 4}],
+                             [{'x': 0, 'y': 0, 'time': 5},
+                              {'x': 3, 'y': 4, 'time': 6}]])
+
+
+def weighted_average_smoothing_long_kernel_test():
+    a = HandwrittenData('[[{"x":0, "y":0, "time":0}, {"x":1, "y":0, "time":1},'
+                        '  {"x":2, "y":0, "time":2}, {"x":3, "y":0, "time":3},'
+                        '  {"x":10, "y":0, "time":4}],'
+                        ' [{"x":0, "y":0, "time":5},'
+                        '  {"x":1, "y":0, "time":6}]]')
+    preprocessing.WeightedAverageSmoothing(theta=[1, 1, 1, 1, 1])(a)
+    expectation = [[{'x': 0, 'y': 0, 'time': 0},
+                    {'x': 1, 'y': 0, 'time': 1},
+                    {'x': 3.2, 'y': 0, 'time': 2},
+                    {'x': 5, 'y': 0, 'time': 3},
+                    {'x': 10, 'y': 0, 'time': 4}],
+                   [{'x': 0, 'y': 0, 'time': 5},
+                    {'x': 1, 'y': 0, 'time': 6}]]
+    assert testhelper.compare_pointlists(a.get_pointlist(), expectation), \
+        "Got %s" % a.get_pointlist()
+
+
+def preprocessing_profile_test():
+    profile = preprocessing.PreprocessingProfile()
+    queue = [preprocessing.ScaleAndShift(),
+             preprocessing.SpaceEvenly(number=20)]
+    for _ in range(2):
+        a = testhelper.get_symbol_as_handwriting(292934)
+        point_count = len(a.get_point_array())
+        a.preprocessing(queue, profile)
+    nose.tools.assert_equal(
+        [(key, entry[0], entry[2], entry[3])
+         for key, entry in sorted(profile.entries.items())],
+        [((0, 'ScaleAndShift'), 2, 2 * point_count, 2 * point_count),
+         ((1, 'SpaceEvenly'), 2, 2 * point_count, 40)])
+    other = preprocessing.PreprocessingProfile()
+    other.merge(profile)
+    other.merge(profile)
+    nose.tools.assert_equal(other.entries[(1, 'SpaceEvenly')][0], 4)
+    nose.tools.assert_equal(len(other.get_table().split("\n")), 3)
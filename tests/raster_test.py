@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import nose
+import numpy
+
+# hwrt modules
+from hwrt import raster
+
+
+# Tests
+def get_line_pixels_test():
+    line_index, xs, ys = raster.get_line_pixels([0, 5, 2], [0, 1, 3],
+                                                [4, 3, 2], [2, 6, 3])
+    nose.tools.assert_equal(line_index.tolist(),
+                            [0, 0, 0, 0, 0,
+                             1, 1, 1, 1, 1, 1,
+                             2])
+    nose.tools.assert_equal(list(zip(xs.tolist(), ys.tolist())),
+                            [(0, 0), (1, 1), (2, 1), (3, 2), (4, 2),
+                             (5, 1), (5, 2), (4, 3), (4, 4), (3, 5), (3, 6),
+                             (2, 3)])
+
+
+def draw_lines_test():
+    canvas = numpy.zeros((3, 3), dtype=numpy.uint8)
+    raster.draw_lines(canvas, [-1, 0], [-1, 2], [3, 0], [3, 2])
+    nose.tools.assert_equal(canvas.tolist(), [[255, 0, 0],
+                                              [0, 255, 0],
+                                              [255, 0, 255]])
+
+
+def draw_lines_layer_test():
+    canvas = numpy.zeros((2, 2, 2), dtype=numpy.uint8)
+    raster.draw_lines(canvas, [0, 1], [0, 0], [1, 1], [0, 1], value=1,
+                      layer=[1, 0])
+    nose.tools.assert_equal(canvas.tolist(), [[[0, 1], [0, 1]],
+                                              [[1, 1], [0, 0]]])
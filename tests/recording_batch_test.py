@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import nose
+import numpy
+import tests.testhelper as testhelper
+
+# hwrt modules
+from hwrt.handwritten_data import HandwrittenData
+from hwrt.recording_batch import RecordingBatch
+
+
+# Tests
+def from_recordings_test():
+    recordings = testhelper.get_all_symbols_as_handwriting()
+    batch = RecordingBatch.from_recordings(recordings)
+    nose.tools.assert_equal(len(batch), len(recordings))
+    for i, recording in enumerate(recordings):
+        nose.tools.assert_equal(batch.get_points(i).tolist(),
+                                recording.get_point_array().tolist())
+        nose.tools.assert_equal(batch.get_stroke_offsets(i).tolist(),
+                                recording.get_stroke_offsets().tolist())
+        assert numpy.shares_memory(batch.get_points(i), batch.points)
+
+
+def from_handwriting_datasets_test():
+    raw_datasets = testhelper.get_raw_datasets()
+    batch = RecordingBatch.from_handwriting_datasets(raw_datasets)
+    nose.tools.assert_equal(len(batch), len(raw_datasets))
+    nose.tools.assert_equal(batch.get_point_counts().sum(),
+                            len(batch.points))
+    nose.tools.assert_equal(len(batch.get_recording_index()),
+                            len(batch.points))
+
+
+def empty_batch_test():
+    batch = RecordingBatch.from_recordings([])
+    nose.tools.assert_equal(len(batch), 0)
+    nose.tools.assert_equal(batch.points.shape, (0, 3))
+
+
+def update_recordings_test():
+    a = HandwrittenData('[[{"x": 1, "y": 2, "time": 3}], '
+                        '[{"x": 4, "y": 5, "time": 6}]]')
+    b = HandwrittenData('[[{"x": 7, "y": 8, "time": 9, "pen_down": true}]]')
+    batch = RecordingBatch(batch_points(a, b) * 2,
+                           [0, 1, 2, 3], [0, 2, 3], [-1, -1, 1])
+    batch.update_recordings([a, b])
+    nose.tools.assert_equal(a.get_pointlist(),
+                            [[{'x': 2, 'y': 4, 'time': 6}],
+                             [{'x': 8, 'y': 10, 'time': 12}]])
+    nose.tools.assert_equal(b.get_pointlist(),
+                            [[{'x': 14, 'y': 16, 'time': 18,
+                               'pen_down': True}]])
+
+
+def batch_points(*recordings):
+    return RecordingBatch.from_recordings(list(recordings)).points
@@ -3,7 +3,7 @@
 
 """Tests for the segmentation subpackage."""
 
-# import nose
+import nose
 import tests.testhelper as testhelper
 
 # hwrt modules
@@ -48,3 +48,17 @@ def get_writemath_results_test():
 # def p_strokes_test():
 #     nose.tools.assert_greater_equal(1.0, segmentation.p_strokes('A', 3))
 #     nose.tools.assert_greater_equal(segmentation.p_strokes('A', 3), 0.0)
+
+
+def get_strokes_distance_test():
+    """A dot has the distance of a point to the other stroke."""
+    stroke1 = [{'x': 0, 'y': 0, 'time': 0}, {'x': 2, 'y': 0, 'time': 1}]
+    stroke2 = [{'x': 1, 'y': 3, 'time': 2}]
+    stroke3 = [{'x': 1, 'y': -1, 'time': 3}, {'x': 1, 'y': 5, 'time': 4}]
+    nose.tools.assert_equal(segmentation.get_strokes_distance(stroke1,
+                                                              stroke2), 3)
+    nose.tools.assert_equal(segmentation.get_strokes_distance(stroke1,
+                                                              stroke3), 0)
+    nose.tools.assert_equal(
+        segmentation.get_median_stroke_distance([stroke1, stroke2, stroke3]),
+        0)
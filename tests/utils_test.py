@@ -9,6 +9,8 @@ import os
 import argparse
 import pkg_resources
 import json
+import shutil
+import tempfile
 
 # hwrt modules
 import hwrt
@@ -34,6 +36,7 @@ def execution_test():
     nose.tools.assert_equal(utils.get_readable_time(25*1000*60*60+3),
                             "25h, 0 minutes 0s 3ms")
     utils.print_status(3, 1, 123)
+    utils.print_status(None, 1, 123)
     utils.get_nntoolkit()
     utils.get_database_config_file()
     utils.get_database_configuration()
@@ -215,3 +218,28 @@ def evaluate_model_single_recording_preloaded_test():
     # data['model'] = model
     # data['output_semantics'] = output_semantics
     # utils.evaluate_model_single_recording_preloaded(**data)
+
+
+def dataset_stream_test():
+    """Test if a record stream is read like a single pickled dictionary."""
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "data.pickle")
+        recordings = [{'id': i, 'handwriting': None} for i in range(5)]
+        count = utils.write_dataset_stream(path,
+                                           {'formula_id2latex': {1: 'A'}},
+                                           [recordings[:3], recordings[3:]])
+        nose.tools.assert_equal(count, 5)
+        metadata, batches = utils.iter_dataset(path)
+        nose.tools.assert_equal(metadata, {'formula_id2latex': {1: 'A'}})
+        nose.tools.assert_equal([len(batch) for batch in batches], [3, 2])
+        nose.tools.assert_equal(utils.load_dataset(path),
+                                {'formula_id2latex': {1: 'A'},
+                                 'handwriting_datasets': recordings})
+    finally:
+        shutil.rmtree(folder)
+
+
+def regroup_recordings_test():
+    batches = utils.regroup_recordings(iter(range(7)), 3)
+    nose.tools.assert_equal(list(batches), [[0, 1, 2], [3, 4, 5], [6]])
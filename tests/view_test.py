@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 
 from nose.plugins.skip import SkipTest
+import nose
 import shutil
 import os
+import tempfile
 
 # hwrt modules
 import hwrt.view as view
@@ -43,3 +45,24 @@ def execute_main_test():
     # with patch('sys.exit') as exit_mock:
     #     view._get_description('.')
     #     assert exit_mock.called
+
+
+def record_stream_test():
+    """Recordings of a record stream can be found and listed."""
+    d = os.path.dirname(__file__)
+    raw = utils.load_dataset(os.path.join(d,
+                                          'data/unittests-tiny-raw.pickle'))
+    recordings = raw.pop('handwriting_datasets')
+    target = tempfile.mkdtemp()
+    try:
+        stream = os.path.join(target, "raw.pickle")
+        utils.write_dataset_stream(stream, raw, [recordings[:10],
+                                                 recordings[10:]])
+        raw_data_id = recordings[-1]['handwriting'].raw_data_id
+        handwriting = view._get_data_from_rawfile(stream, raw_data_id)
+        nose.tools.assert_equal(handwriting.raw_data_id, raw_data_id)
+        nose.tools.assert_equal(view._get_data_from_rawfile(stream, -1),
+                                None)
+        view._list_ids(stream)
+    finally:
+        shutil.rmtree(target)